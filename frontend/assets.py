@@ -0,0 +1,211 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # brotli variants are optional
+    brotli = None
+
+# files named like towns.<16 hex digit content hash>.json never change
+VERSIONED_ASSET = re.compile(r"\.([0-9a-f]{16})\.")
+# files (and compressed variants) up to this size are kept in memory, larger
+# ones are streamed from disk
+MEMORY_BYTES = 256 * 1024
+COMPRESSIBLE = re.compile(r"^(text/|application/(javascript|json|xml)|image/svg\+xml)")
+CHUNK_SIZE = 64 * 1024
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+@dataclass
+class Variant:
+    encoding: str
+    size: int
+    content: bytes = None
+    # a pre-compressed file next to the asset, e.g. towns.<hash>.json.gz
+    path: str = None
+
+
+@dataclass
+class Asset:
+    path: str
+    content_type: str
+    etag: str
+    size: int
+    modified: float
+    stamp: tuple
+    versioned: bool
+    content: bytes = None
+    variants: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_path(cls, path):
+        stat = os.stat(path)
+        name = os.path.basename(path)
+        content_type = guess_content_type(name)
+
+        digest = hashlib.blake2b(digest_size=8)
+        keep = stat.st_size <= MEMORY_BYTES
+        chunks = []
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                if keep:
+                    chunks.append(chunk)
+
+        asset = cls(
+            path=path,
+            content_type=content_type,
+            etag=digest.hexdigest(),
+            size=stat.st_size,
+            modified=stat.st_mtime,
+            stamp=(stat.st_mtime_ns, stat.st_size),
+            versioned=VERSIONED_ASSET.search(name) is not None,
+            content=b"".join(chunks) if keep else None,
+        )
+        for encoding, suffix in ENCODINGS:
+            try:
+                variant = os.stat(path + suffix)
+            except FileNotFoundError:
+                continue
+            # written by compress_assets for an earlier version of the file
+            if variant.st_mtime_ns < stat.st_mtime_ns:
+                continue
+            content = None
+            if variant.st_size <= MEMORY_BYTES:
+                with open(path + suffix, "rb") as file:
+                    content = file.read()
+            asset.variants[encoding] = Variant(
+                encoding, variant.st_size, content, path=path + suffix
+            )
+        return asset
+
+
+def guess_content_type(name):
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def compress(encoding, content):
+    if encoding == "gzip":
+        return gzip.compress(content, 9, mtime=0)
+    if brotli:
+        return brotli.compress(content)
+    return None
+
+
+def compress_assets(directory):
+    """
+    Writes .br (when brotli is installed) and .gz variants next to each text
+    file in `directory` that has none newer than itself, keeping those that
+    save at least a tenth. Run once per build so workers never compress.
+    Returns the names of the variants written.
+    """
+    written = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if (
+            is_variant(name)
+            or not os.path.isfile(path)
+            or not COMPRESSIBLE.match(guess_content_type(name))
+        ):
+            continue
+        modified = os.stat(path).st_mtime_ns
+        content = None
+        for encoding, suffix in ENCODINGS:
+            target = path + suffix
+            if os.path.isfile(target) and os.stat(target).st_mtime_ns >= modified:
+                continue
+            if content is None:
+                with open(path, "rb") as file:
+                    content = file.read()
+            compressed = compress(encoding, content)
+            # not worth a Content-Encoding unless it saves a tenth
+            if compressed is None or len(compressed) >= 0.9 * len(content):
+                if os.path.isfile(target):
+                    os.remove(target)
+                continue
+            with open(f"{target}.tmp", "wb") as file:
+                file.write(compressed)
+            os.replace(f"{target}.tmp", target)
+            written.append(name + suffix)
+    return written
+
+
+def is_variant(name):
+    base, suffix = os.path.splitext(name)
+    return suffix in (".gz", ".br") and os.path.splitext(base)[1] != ""
+
+
+class AssetIndex:
+    """
+    The built frontend files held ready to serve: content hashes for ETags,
+    the gzip and brotli variants compress_assets wrote next to them, and the
+    content of small files such as index.html. Built once per worker; each
+    request stats its file and an entry is rebuilt whenever the file on disk
+    has changed.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.assets = {}
+        self._lock = threading.Lock()
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if not is_variant(name) and os.path.isfile(
+                    os.path.join(directory, name)
+                ):
+                    self.assets[name] = Asset.from_path(os.path.join(directory, name))
+
+    def __len__(self):
+        return len(self.assets)
+
+    def get(self, name):
+        """
+        The asset named `name`, or None if there is no such file. Compressed
+        variants are only served as the Content-Encoding of their asset.
+        """
+        if is_variant(name):
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            stat = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            self.assets.pop(name, None)
+            return None
+
+        asset = self.assets.get(name)
+        if asset is None or asset.stamp != (stat.st_mtime_ns, stat.st_size):
+            if not os.path.isfile(path):
+                return None
+            asset = Asset.from_path(path)
+            with self._lock:
+                self.assets[name] = asset
+        return asset
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_asset_index():
+    global _index
+    directory = settings.FRONTEND_DIST_DIR
+    if _index is None or _index.directory != directory:
+        with _lock:
+            if _index is None or _index.directory != directory:
+                _index = AssetIndex(directory)
+    return _index
+
+
+def invalidate_asset_index():
+    global _index
+    _index = None
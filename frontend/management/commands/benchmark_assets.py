@@ -0,0 +1,123 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse, HttpResponseNotFound
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from frontend.assets import compress_assets, get_asset_index, invalidate_asset_index
+from frontend.views import Assets, Home
+
+
+def legacy_home(request):
+    with open(os.path.join(settings.FRONTEND_DIST_DIR, "index.html")) as file:
+        return HttpResponse(file.read())
+
+
+def legacy_assets(request, filename):
+    """The asset view this replaced: every hit reads the whole file into memory."""
+    path = os.path.join(settings.FRONTEND_DIST_DIR, filename)
+    if not os.path.isfile(path):
+        return HttpResponseNotFound()
+    with open(path, "rb") as file:
+        return HttpResponse(file.read())
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds and compresses a synthetic frontend dist (index.html, a JavaScript "
+        "bundle and a video) and times serving it with the asset views against the previous "
+        "views, which read every file into memory on every request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=200)
+        parser.add_argument("--bundle-kb", type=int, default=1024)
+        parser.add_argument("--video-mb", type=int, default=20)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        try:
+            self.build_dist(directory, options["bundle_kb"], options["video_mb"])
+            with override_settings(FRONTEND_DIST_DIR=directory):
+                self.run(options["samples"])
+        finally:
+            shutil.rmtree(directory)
+            invalidate_asset_index()
+
+    @staticmethod
+    def build_dist(directory, bundle_kb, video_mb):
+        line = b"export const route = (path) => fetch(`/api/${path}`).then((r) => r.json());\n"
+        files = {
+            "index.html": b"<!DOCTYPE html><html><head><script src='/bundle.js'></script></head></html>",
+            "bundle.js": line * (bundle_kb * 1024 // len(line)),
+            "video.mov": os.urandom(video_mb * 1024 * 1024),
+        }
+        for name, content in files.items():
+            with open(os.path.join(directory, name), "wb") as file:
+                file.write(content)
+        compress_assets(directory)
+
+    def run(self, samples):
+        factory = RequestFactory()
+        invalidate_asset_index()
+        start = time.perf_counter()
+        get_asset_index()
+        self.stdout.write(
+            f"asset index built in {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+
+        home, assets = Home.as_view(), Assets.as_view()
+        bundle_etag = assets(factory.get("/bundle.js"), filename="bundle.js")["ETag"]
+        cases = (
+            ("index.html", {}, "/", None),
+            ("bundle.js", {}, "/bundle.js", "bundle.js"),
+            (
+                "bundle.js gzip",
+                {"HTTP_ACCEPT_ENCODING": "gzip, br"},
+                "/bundle.js",
+                "bundle.js",
+            ),
+            (
+                "bundle.js revalidated",
+                {"HTTP_IF_NONE_MATCH": bundle_etag},
+                "/bundle.js",
+                "bundle.js",
+            ),
+            ("video.mov", {}, "/video.mov", "video.mov"),
+            (
+                "video.mov 1MB range",
+                {"HTTP_RANGE": "bytes=0-1048575"},
+                "/video.mov",
+                "video.mov",
+            ),
+        )
+        for label, headers, path, filename in cases:
+            request = factory.get(path, **headers)
+            if filename is None:
+                old = self.measure(samples, lambda: legacy_home(request))
+                new = self.measure(samples, lambda: home(request))
+            else:
+                old = self.measure(samples, lambda: legacy_assets(request, filename))
+                new = self.measure(samples, lambda: assets(request, filename=filename))
+            self.stdout.write(
+                f"{label:>22}: before p50 {old[0] * 1000:8.3f}ms {old[1]:>10} bytes, "
+                f"after p50 {new[0] * 1000:8.3f}ms {new[1]:>10} bytes"
+            )
+
+    @staticmethod
+    def measure(samples, respond):
+        """p50 seconds to build and consume a response, and the bytes it sent."""
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            response = respond()
+            sent = sum(len(chunk) for chunk in response)
+            response.close()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings), sent
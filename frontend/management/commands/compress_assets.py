@@ -0,0 +1,28 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from frontend.assets import brotli, compress_assets
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes gzip and brotli variants next to the built frontend files, which "
+        "the asset views serve to clients that accept them. Run after each build."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directory", default=None)
+
+    def handle(self, *args, **options):
+        directory = options["directory"] or settings.FRONTEND_DIST_DIR
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} does not exist, build the frontend first")
+        written = compress_assets(directory)
+
+        self.stdout.write(f"Wrote {len(written)} compressed variants in {directory}")
+        if brotli is None:
+            self.stderr.write(
+                "brotli is not installed, only gzip variants were written"
+            )
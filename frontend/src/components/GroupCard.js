@@ -1,7 +1,7 @@
 import React from 'react'
 import Auth from '../lib/Auth'
 
-const GroupCard = ({ group, goToGroupProfile, sendRequest }) => (
+const GroupCard = ({ group, isMember, isRequested, goToGroupProfile, sendRequest }) => (
   <div id="group-card" className="column is-one-fifth-desktop is-one-quarter-tablet is-half-mobile">
     <div className="card">
 
@@ -14,7 +14,7 @@ const GroupCard = ({ group, goToGroupProfile, sendRequest }) => (
             </figure>
           </div>
 
-          {group.owner.id === Auth.getUserId() ? <div className="media-right">
+          {group.owner === Auth.getUserId() ? <div className="media-right">
             <i className="fas fa-crown is-size-5" />
           </div> : <></>
           }
@@ -28,11 +28,9 @@ const GroupCard = ({ group, goToGroupProfile, sendRequest }) => (
         </div>
 
         <div className="media">
-          {group.members.map((member, i) => {
-            return <figure className="image is-48x48 member-image" key={i}>
-              <img className="is-rounded" src={member.image} alt="member profile image" />
-            </figure>
-          })}
+          <p className="text">
+            <i className="fas fa-users" /> {group.member_count}
+          </p>
         </div>
       </div>
 
@@ -49,18 +47,7 @@ const GroupCard = ({ group, goToGroupProfile, sendRequest }) => (
           />
         </a>
 
-        {!group.requests
-          .reduce((list, member) => {
-            list.push(member.id)
-            return list
-          }, [])
-          .includes(Auth.getUserId()) &&
-          !group.members
-            .reduce((list, member) => {
-              list.push(member.id)
-              return list
-            }, [])
-            .includes(Auth.getUserId()) ? <a 
+        {!isRequested && !isMember ? <a 
             className="card-footer-item"
             onClick={(e) => sendRequest(e)}
             id={group.id}   
@@ -72,12 +59,7 @@ const GroupCard = ({ group, goToGroupProfile, sendRequest }) => (
           </a> : <></>
         }
 
-        {group.requests
-          .reduce((list, member) => {
-            list.push(member.id)
-            return list
-          }, [])
-          .includes(Auth.getUserId()) ? <a 
+        {isRequested ? <a 
             className="card-footer-item pending"
           >
             <i 
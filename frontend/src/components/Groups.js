@@ -13,6 +13,10 @@ const Groups = (props) => {
   })
 
   const [groups, setGroups] = useState([])
+  const [next, setNext] = useState(null)
+  const [search, setSearch] = useState('')
+  const [joined, setJoined] = useState([])
+  const [requested, setRequested] = useState([])
   const [errors, setErrors] = useState('')
   const [newGroupModal, setnewGroupModal] = useState(false)
   const [details, setDetails] = useState({
@@ -20,19 +24,30 @@ const Groups = (props) => {
     description: ''
   })
 
+  // the directory is cursor paginated: the first page is replaced on every
+  // search, and the next cursor appends the following page
+  function fetchGroupData(url) {
+    axios.get(url || `/api/groups/?search=${encodeURIComponent(search)}`, {
+      headers: { Authorization: `Bearer ${Auth.getToken()}` }
+    })
+      .then(resp => {
+        setGroups(url ? groups.concat(resp.data.results) : resp.data.results)
+        setNext(resp.data.next)
+      })
+      .catch(err => {
+        console.log(err)
+        setErrors({ ...errors, ...err })
+      })
+  }
 
-
-  function fetchGroupData() {
-    axios.get('/api/groups/', {
+  // directory entries only carry counts, so membership comes from the profile
+  function fetchMembership() {
+    axios.get('/api/profile', {
       headers: { Authorization: `Bearer ${Auth.getToken()}` }
     })
       .then(resp => {
-        const data = resp.data.sort(function (a, b) {
-          if (a.id < b.id) { return -1 }
-          if (a.id > b.id) { return 1 }
-          return 0
-        })
-        setGroups(data)
+        setJoined(resp.data.groups_joined.map(group => ({ ...group, member_count: group.members.length })))
+        setRequested(resp.data.groups_requested.map(group => group.id))
       })
       .catch(err => {
         console.log(err)
@@ -41,9 +56,16 @@ const Groups = (props) => {
   }
 
   useEffect(() => {
-    fetchGroupData()
+    fetchMembership()
   }, [])
 
+  useEffect(() => {
+    fetchGroupData()
+  }, [search])
+
+  const joinedIds = joined.map(group => group.id)
+  const otherGroups = groups.filter(group => !joinedIds.includes(group.id))
+
   const handleChange = (e) => {
     const data = { ...details, [e.target.name]: e.target.value }
     setDetails({ ...data })
@@ -76,7 +98,7 @@ const Groups = (props) => {
     })
       .then(resp => {
         // console.log(resp)
-        fetchGroupData()
+        fetchMembership()
         notify('Membership requested!')
       })
       .catch(err => {
@@ -113,36 +135,19 @@ const Groups = (props) => {
           <div className="subtitle">
             Groups you belong to
           </div>
-          {groups
-            .filter((group) => {
-              return group.members
-                .reduce((list, member) => {
-                  list.push(member.id)
-                  return list
-                }, [])
-                .includes(Auth.getUserId())
-            })
-            .length === 0 ? <div className="is-size-5 no-groups">You haven&apos;t joined any groups yet!</div> : <></>}
+          {joined.length === 0 ? <div className="is-size-5 no-groups">You haven&apos;t joined any groups yet!</div> : <></>}
 
           <div className="columns is-mobile is-multiline">
-
-            {groups
-              .filter((group) => {
-                return group.members
-                  .reduce((list, member) => {
-                    list.push(member.id)
-                    return list
-                  }, [])
-                  .includes(Auth.getUserId())
-              })
-              .map((group, i) => {
-                return <GroupCard
-                  key={i}
-                  group={group}
-                  goToGroupProfile={(e) => goToGroupProfile(e)}
-                  sendRequest={(e) => sendRequest(e)}
-                />
-              })}
+            {joined.map((group, i) => {
+              return <GroupCard
+                key={i}
+                group={group}
+                isMember={true}
+                isRequested={false}
+                goToGroupProfile={(e) => goToGroupProfile(e)}
+                sendRequest={(e) => sendRequest(e)}
+              />
+            })}
           </div>
         </div>
 
@@ -151,37 +156,40 @@ const Groups = (props) => {
             All other groups
           </div>
 
-          {groups
-            .filter((group) => {
-              return !group.members
-                .reduce((list, member) => {
-                  list.push(member.id)
-                  return list
-                }, [])
-                .includes(Auth.getUserId())
-            })
-            .length === 0 ? <div className="is-size-5 no-groups">No other groups to display</div> : <></>}
+          <div className="field">
+            <div className="control has-icons-left">
+              <input
+                className="input"
+                type="text"
+                placeholder="Search groups"
+                value={search}
+                onChange={(e) => setSearch(e.target.value)}
+              />
+              <span className="icon is-small is-left">
+                <i className="fas fa-search"></i>
+              </span>
+            </div>
+          </div>
+
+          {otherGroups.length === 0 ? <div className="is-size-5 no-groups">No other groups to display</div> : <></>}
 
           <div className="columns is-mobile is-multiline">
-            {groups
-              .filter((group) => {
-                return !group.members
-                  .reduce((list, member) => {
-                    list.push(member.id)
-                    return list
-                  }, [])
-                  .includes(Auth.getUserId())
-              })
-              .map((group, i) => {
-                return <GroupCard
-                  key={i}
-                  group={group}
-                  goToGroupProfile={(e) => goToGroupProfile(e)}
-                  sendRequest={(e) => sendRequest(e)}
-                />
-              })}
+            {otherGroups.map((group, i) => {
+              return <GroupCard
+                key={i}
+                group={group}
+                isMember={false}
+                isRequested={requested.includes(group.id)}
+                goToGroupProfile={(e) => goToGroupProfile(e)}
+                sendRequest={(e) => sendRequest(e)}
+              />
+            })}
           </div>
 
+          {next ? <button className="button is-link is-outlined" onClick={() => fetchGroupData(next)}>
+            Load more groups
+          </button> : <></>}
+
           <div className={newGroupModal === true ? 'modal is-active' : 'modal'}>
             <div className="modal-background" onClick={toggleModal}></div>
             <div className="modal-content">
@@ -16,23 +16,10 @@ const Hero = (props) => {
   const [errors, setErrors] = useState('')
 
   function fetchTownData() {
-    axios.get('/api/towns')
+    axios.get('/api/towns/countries')
       .then(resp => {
-        // console.log('RESPONSE')
-        const data = resp.data
-          .reduce((countries, town) => {
-            if (countries[town.iso2]) {
-              countries[town.iso2] = countries[town.iso2].concat(town.visitors)
-            } else {
-              countries[town.iso2] = town.visitors
-            }
-            return countries
-          }, {})
-        const uniqueVisitors = {}
-        Object.keys(data).forEach((country) => {
-          uniqueVisitors[country] = (new Set(data[country])).size
-        })
-        setCountriesData(uniqueVisitors)
+        // distinct visitors per country code
+        setCountriesData(resp.data)
       })
       .catch(err => {
         console.log(err)
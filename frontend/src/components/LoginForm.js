@@ -31,7 +31,7 @@ const Login = ({ props }) => {
     e.preventDefault()
     axios.post('/api/login', login.data)
       .then(resp => {
-        Auth.setToken(resp.data.token)
+        Auth.setToken(resp.data.token, resp.data.refresh)
         notify(resp.data.message)
         props.history.push('/city_selection')
         setUserLogin(resp.data)
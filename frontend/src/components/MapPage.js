@@ -12,42 +12,30 @@ const MapPage = () => {
   const [infoLevel, setInfoLevel] = useState('platform')
 
   function fetchTownData() {
-    axios.get('/api/towns')
+    axios.get('/api/towns/countries')
       .then(resp => {
-        // console.log('RESPONSE')
-        computePlatformData(resp.data)
-        computeUserData(resp.data)
+        // distinct visitors per country code
+        setPlatformData(resp.data)
       })
       .catch(err => {
         console.log(err)
         setErrors({ ...errors, ...err })
       })
-  }
-
-  function computePlatformData(towns) {
-    // console.log('computing platform country data...')
-    const data = towns
-      .reduce((countries, town) => {
-        if (countries[town.iso2]) {
-          countries[town.iso2] = countries[town.iso2].concat(town.visitors)
-        } else {
-          countries[town.iso2] = town.visitors
-        }
-        return countries
-      }, {})
-    const uniqueVisitors = {}
-    Object.keys(data).forEach((country) => {
-      uniqueVisitors[country] = (new Set(data[country])).size
+    axios.get('/api/profile', {
+      headers: { Authorization: `Bearer ${Auth.getToken()}` }
     })
-    setPlatformData(uniqueVisitors)
+      .then(resp => {
+        computeUserData(resp.data.towns)
+      })
+      .catch(err => {
+        console.log(err)
+        setErrors({ ...errors, ...err })
+      })
   }
 
   function computeUserData(towns) {
     // console.log('computing user country data...')
     const data = towns
-      .filter((town) => {
-        return town.visitors.includes(Auth.getUserId())
-      })
       .reduce((countries, town) => {
         if (countries[town.iso2]) {
           countries[town.iso2] += 1
@@ -1,27 +1,94 @@
+import axios from 'axios'
+
 class Auth {
-  static setToken(token) {
+  static setToken(token, refresh) {
     localStorage.setItem('token', token)
+    if (refresh) localStorage.setItem('refresh', refresh)
   }
 
   static getToken() {
     return localStorage.getItem('token')
   }
 
+  static getRefreshToken() {
+    return localStorage.getItem('refresh')
+  }
+
   static logout() {
+    const token = this.getToken()
+    const refresh = this.getRefreshToken()
     localStorage.removeItem('token')
+    localStorage.removeItem('refresh')
+    if (!token) return Promise.resolve()
+    // revoke both tokens server side, the user is logged out locally either way
+    return axios.post('/api/logout', { refresh }, {
+      headers: { Authorization: `Bearer ${token}` },
+      skipRefresh: true
+    }).catch(() => {})
   }
 
-  static getUserId() {
-    const token = this.getToken()
-    if (!token) return false
+  static getPayload(token) {
+    if (!token) return null
     const parts = token.split('.')
-    return JSON.parse(atob(parts[1])).sub
+    return JSON.parse(atob(parts[1]))
+  }
+
+  static getUserId() {
+    const payload = this.getPayload(this.getToken())
+    if (!payload) return false
+    return payload.sub
+  }
+
+  static isExpired(token) {
+    const payload = this.getPayload(token)
+    return !payload || payload.exp * 1000 <= Date.now()
   }
 
   static isAuthorized() {
-    return this.getToken()
+    // an expired access token is still good for a session while the refresh
+    // token can swap it for a new one
+    return this.getToken() && (!this.isExpired(this.getToken()) || !this.isExpired(this.getRefreshToken()))
   }
 
+  // refresh tokens are single use, so concurrent requests share one refresh
+  static refresh() {
+    if (!this.pendingRefresh) {
+      this.pendingRefresh = axios.post('/api/token/refresh', { refresh: this.getRefreshToken() }, { skipRefresh: true })
+        .then(resp => {
+          this.setToken(resp.data.token, resp.data.refresh)
+          return resp.data.token
+        })
+        .catch(err => {
+          localStorage.removeItem('token')
+          localStorage.removeItem('refresh')
+          throw err
+        })
+        .finally(() => {
+          this.pendingRefresh = null
+        })
+    }
+    return this.pendingRefresh
+  }
 }
 
-export default Auth
\ No newline at end of file
+// an expired access token is refused with 403 "Token expired": swap the
+// refresh token for a new pair and retry the request once
+axios.interceptors.response.use(null, err => {
+  const config = err.config
+  const response = err.response
+  if (
+    !config || config.skipRefresh || config.retried ||
+    !response || response.status !== 403 ||
+    !response.data || response.data.message !== 'Token expired' ||
+    !Auth.getRefreshToken()
+  ) {
+    return Promise.reject(err)
+  }
+  return Auth.refresh().then(token => {
+    config.retried = true
+    config.headers.Authorization = `Bearer ${token}`
+    return axios(config)
+  })
+})
+
+export default Auth
@@ -14,7 +14,8 @@ export const handlers = [
             ctx.status(200),
             ctx.json({
                 'detail': 'Welcome Amanda!',
-                'token': 'a long, totally legit token'
+                'token': 'a long, totally legit token',
+                'refresh': 'a longer, equally legit token'
             }))
     })
 ]
\ No newline at end of file
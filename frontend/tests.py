@@ -1,3 +1,179 @@
-from django.test import TestCase
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from frontend.assets import compress_assets, get_asset_index, invalidate_asset_index
+
+
+class AssetTestData(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(FRONTEND_DIST_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        invalidate_asset_index()
+
+        self.bundle = b"console.log('globetripper');\n" * 2000
+        self.video = os.urandom(300 * 1024)
+        self.write("index.html", b"<html><body>globetripper</body></html>")
+        self.write("bundle.js", self.bundle)
+        self.write("arrow.mov", self.video)
+
+    def write(self, name, content):
+        with open(os.path.join(self.directory, name), "wb") as file:
+            file.write(content)
+
+    def get(self, name, **headers):
+        return self.client.get(reverse("assets", args=[name]), **headers)
+
+
+class TestHome(AssetTestData):
+    def test_index_is_served_from_memory(self):
+        get_asset_index()
+
+        with mock.patch("builtins.open") as opened:
+            response = self.client.get(reverse("home"))
+
+        opened.assert_not_called()
+        self.assertEqual(response.content, b"<html><body>globetripper</body></html>")
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+    def test_rebuilt_index_is_picked_up(self):
+        self.client.get(reverse("home"))
+        self.write("index.html", b"<html>new build</html>")
+
+        self.assertEqual(
+            self.client.get(reverse("home")).content, b"<html>new build</html>"
+        )
+
+    def test_missing_index(self):
+        os.remove(os.path.join(self.directory, "index.html"))
+
+        self.assertEqual(self.client.get(reverse("home")).status_code, 404)
+
+
+class TestAssets(AssetTestData):
+    def test_content_type_and_validators(self):
+        response = self.get("bundle.js")
+
+        self.assertIn("javascript", response["Content-Type"])
+        self.assertEqual(response.content, self.bundle)
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_workers_do_not_compress(self):
+        response = self.get("bundle.js", HTTP_ACCEPT_ENCODING="gzip, br")
+
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response.content, self.bundle)
+
+    def test_compress_command_writes_variants_of_text_files(self):
+        call_command("compress_assets", stdout=StringIO(), stderr=StringIO())
+
+        self.assertTrue(os.path.isfile(os.path.join(self.directory, "bundle.js.gz")))
+        self.assertFalse(os.path.isfile(os.path.join(self.directory, "arrow.mov.gz")))
+        self.assertEqual(compress_assets(self.directory), [])
+
+    def test_compress_command_needs_a_build(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "compress_assets",
+                directory=os.path.join(self.directory, "missing"),
+                stdout=StringIO(),
+            )
+
+    def test_variants_older_than_their_file_are_ignored(self):
+        compress_assets(self.directory)
+        stamp = os.stat(os.path.join(self.directory, "bundle.js")).st_mtime_ns
+        self.write("bundle.js", b"console.log('rebuilt');\n" * 2000)
+        os.utime(os.path.join(self.directory, "bundle.js"), ns=(stamp + 10**9,) * 2)
+
+        response = self.get("bundle.js", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(compress_assets(self.directory)[-1], "bundle.js.gz")
+
+    def test_compressed_variants_are_precomputed(self):
+        compress_assets(self.directory)
+        response = self.get("bundle.js", HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), self.bundle)
+        self.assertLess(len(response.content), len(self.bundle) / 10)
+        self.assertNotEqual(response["ETag"], self.get("bundle.js")["ETag"])
+
+    def test_refused_encodings_are_not_used(self):
+        response = self.get("bundle.js", HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_conditional_requests(self):
+        compress_assets(self.directory)
+        etag = self.get("bundle.js", HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+
+        cached = self.get(
+            "bundle.js", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag
+        )
+        stale = self.get("bundle.js", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], etag)
+        self.assertEqual(stale.status_code, 200)
+
+    def test_large_files_are_streamed(self):
+        response = self.get("arrow.mov")
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "video/quicktime")
+        self.assertEqual(int(response["Content-Length"]), len(self.video))
+        self.assertEqual(b"".join(response.streaming_content), self.video)
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_byte_ranges(self):
+        response = self.get("arrow.mov", HTTP_RANGE="bytes=1000-1999")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            response["Content-Range"], f"bytes 1000-1999/{len(self.video)}"
+        )
+        self.assertEqual(response["Content-Length"], "1000")
+        self.assertEqual(b"".join(response.streaming_content), self.video[1000:2000])
+
+    def test_suffix_and_open_ended_ranges(self):
+        suffix = self.get("arrow.mov", HTTP_RANGE="bytes=-10")
+        rest = self.get("bundle.js", HTTP_RANGE=f"bytes={len(self.bundle) - 5}-")
+
+        self.assertEqual(b"".join(suffix.streaming_content), self.video[-10:])
+        self.assertEqual(rest.status_code, 206)
+        self.assertEqual(rest.content, self.bundle[-5:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get("arrow.mov", HTTP_RANGE=f"bytes={len(self.video)}-")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.video)}")
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.get("arrow.mov", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_asset(self):
+        self.assertEqual(self.get("missing.js").status_code, 404)
+
+    def test_variants_are_not_served_directly(self):
+        compress_assets(self.directory)
+
+        self.assertEqual(self.get("bundle.js.gz").status_code, 404)
+        self.assertEqual(self.get("index.html.gz").status_code, 404)
@@ -1,22 +1,167 @@
-import os
+import re
+
+from django.http import FileResponse, HttpResponse, HttpResponseNotFound
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.views.generic import View
-from django.http import HttpResponse, HttpResponseNotFound
 
+from .assets import CHUNK_SIZE, get_asset_index
 
-class Home(View):
-    def get(self, _request):
-        with open(
-            os.path.join(os.path.dirname(__file__), "dist", "index.html")
-        ) as file:
-            return HttpResponse(file.read())
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+QUALITY = re.compile(r"q=([0-9.]+)")
 
 
-class Assets(View):
-    def get(self, _request, filename):
-        path = os.path.join(os.path.dirname(__file__), "dist", filename)
+def accepted_encodings(header):
+    """The content codings an Accept-Encoding header allows, e.g. not "gzip;q=0"."""
+    qualities = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        quality = QUALITY.search(params)
+        try:
+            qualities[coding.strip().lower()] = (
+                float(quality.group(1)) if quality else 1.0
+            )
+        except ValueError:
+            continue
+    wildcard = qualities.get("*", 0)
+    return {coding for coding in ("br", "gzip") if qualities.get(coding, wildcard) > 0}
+
+
+def byte_range(header, size):
+    """
+    The (start, end) of a single "bytes=" range, end inclusive, None when the
+    header should be ignored, or False when the range can't be satisfied.
+    """
+    match = BYTE_RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        # malformed or several ranges, so the whole file is sent
+        return None
+    start, end = match.groups()
+    if not start:
+        length = int(end)
+        return (max(size - length, 0), size - 1) if length and size else False
+    start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class AssetResponse(FileResponse):
+    block_size = CHUNK_SIZE
+
+
+class FileRange:
+    """Reads `length` bytes of a file from `start`, for a FileResponse."""
+
+    def __init__(self, path, start, length):
+        self.file = open(path, "rb")
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def serve(request, asset):
+    """
+    Responds with `asset`, answering conditional requests with 304, Range
+    requests with 206 and picking the brotli or gzip variant when accepted.
+    """
+    range_header = request.META.get("HTTP_RANGE")
+    variant = None
+    if not range_header:
+        encodings = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        variant = next(
+            (
+                asset.variants[e]
+                for e in ("br", "gzip")
+                if e in encodings and e in asset.variants
+            ),
+            None,
+        )
+    etag = f'"{asset.etag}-{variant.encoding}"' if variant else f'"{asset.etag}"'
 
-        if os.path.isfile(path):
-            with open(path, "rb") as file:
-                return HttpResponse(file.read())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(asset.modified)
+    )
+    if response is None:
+        response = content_response(request, asset, variant, range_header, etag)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(asset.modified)
+    if asset.variants:
+        response["Vary"] = "Accept-Encoding"
+    if asset.versioned:
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        # cached, but checked with the ETag before every use
+        response["Cache-Control"] = "no-cache"
+    return response
+
+
+def content_response(request, asset, variant, range_header, etag):
+    if variant:
+        if variant.content is not None:
+            response = HttpResponse(variant.content, content_type=asset.content_type)
         else:
+            response = AssetResponse(
+                open(variant.path, "rb"), content_type=asset.content_type
+            )
+        response["Content-Encoding"] = variant.encoding
+        return response
+
+    if_range = request.META.get("HTTP_IF_RANGE")
+    selected = byte_range(range_header, asset.size) if range_header else None
+    if if_range is not None and if_range != etag:
+        selected = None
+
+    if selected is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{asset.size}"
+    elif selected:
+        start, end = selected
+        length = end - start + 1
+        if asset.content is not None:
+            response = HttpResponse(
+                asset.content[start : end + 1],
+                status=206,
+                content_type=asset.content_type,
+            )
+        else:
+            response = AssetResponse(
+                FileRange(asset.path, start, length),
+                status=206,
+                content_type=asset.content_type,
+            )
+            response["Content-Length"] = length
+        response["Content-Range"] = f"bytes {start}-{end}/{asset.size}"
+    elif asset.content is not None:
+        response = HttpResponse(asset.content, content_type=asset.content_type)
+    else:
+        response = AssetResponse(
+            open(asset.path, "rb"), content_type=asset.content_type
+        )
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+class Home(View):
+    def get(self, request):
+        asset = get_asset_index().get("index.html")
+        if asset is None:
+            return HttpResponseNotFound()
+        return serve(request, asset)
+
+
+class Assets(View):
+    def get(self, request, filename):
+        asset = get_asset_index().get(filename)
+        if asset is None:
             return HttpResponseNotFound()
+        return serve(request, asset)
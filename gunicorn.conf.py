@@ -0,0 +1,96 @@
+"""
+Production serving profile for `gunicorn project.wsgi`, read from the
+environment so the Procfile stays the same everywhere:
+
+WEB_CONCURRENCY               worker processes (2 x cores + 1)
+GUNICORN_THREADS              threads per worker (4), 1 for sync workers
+GUNICORN_TIMEOUT              seconds before a silent worker is killed (30)
+GUNICORN_GRACEFUL_TIMEOUT     seconds workers get to finish on restart (30)
+GUNICORN_MAX_REQUESTS         requests before a worker is recycled (1000, 0 never)
+GUNICORN_MAX_REQUESTS_JITTER  random extra requests so workers recycle apart (100)
+GUNICORN_PRELOAD              "1" imports the app once before forking
+
+Workers need caches they all share, since response caching, revocations and
+login throttles are coordinated through them, so this profile defaults
+CACHE_BACKEND to Django's database cache and creates its tables at startup.
+Startup is refused if CACHE_BACKEND is set to the per-process LocMemCache
+with WEB_CONCURRENCY above 1.
+
+NUM_PROXIES must say how many proxies append to X-Forwarded-For in front of
+gunicorn (0 for none), since login throttles key on the client address it
+gives. It defaults to 1 on Heroku (where DYNO is set), for its router, and
+startup is refused anywhere else it is left unset.
+
+`kill -HUP <master pid>` reloads the config and starts new workers before
+stopping the old ones gracefully; TTIN/TTOU add or remove a worker.
+"""
+
+import multiprocessing
+import os
+
+# read by project/settings.py in the workers
+os.environ.setdefault("CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache")
+if "DYNO" in os.environ:
+    os.environ.setdefault("NUM_PROXIES", "1")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "") == "1"
+# heartbeat files on a RAM disk, where one exists, so a slow disk can't get
+# healthy workers killed
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+    from django.conf import settings
+
+    backend = settings.CACHES["default"]["BACKEND"]
+    if server.cfg.workers > 1 and backend.endswith("LocMemCache"):
+        raise RuntimeError(
+            f"{server.cfg.workers} workers would each keep their own {backend}, "
+            "set CACHE_BACKEND to a shared cache or WEB_CONCURRENCY=1"
+        )
+    if "NUM_PROXIES" not in os.environ:
+        raise RuntimeError(
+            "set NUM_PROXIES to the number of proxies in front of gunicorn (0 for "
+            "none), login throttles would otherwise key on the wrong address"
+        )
+
+    import django
+    from django.core.management import call_command
+    from django.db import connections
+
+    django.setup()
+    # a no-op for tables that exist, and for backends other than the database
+    call_command("createcachetable")
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    # connections opened while preloading belong to the master, never share them
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # hash the frontend build and load its small files before the first request
+    from frontend.assets import get_asset_index
+
+    get_asset_index()
@@ -0,0 +1,185 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from travels.response_cache import cache_metrics
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+
+
+def fingerprint(sql):
+    """Groups queries that differ only in their parameters, e.g. IN lists of any length."""
+    return IN_LIST.sub("(...)", sql)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def app_time(self, total_ms):
+        """Seconds spent outside the database and the renderer."""
+        return max(total_ms / 1000 - self.db_time - self.render_time, 0.0)
+
+    def repeated_queries(self, limit=3):
+        fingerprints = Counter()
+        for sql, count in self.statements.items():
+            fingerprints[fingerprint(sql)] += count
+        return [
+            (sql, count) for sql, count in fingerprints.most_common(limit) if count > 1
+        ]
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def as_dict(self):
+        labels = [f"le_{bound}" for bound in self.bounds] + ["inf"]
+        return {
+            "count": sum(self.counts),
+            "sum": round(self.total, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class RequestMetrics:
+    """Duration and query count histograms per view, kept for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.views = {}
+
+    def record(self, view, duration_ms, queries):
+        with self._lock:
+            if view not in self.views:
+                self.views[view] = (
+                    Histogram(DURATION_BUCKETS_MS),
+                    Histogram(QUERY_BUCKETS),
+                )
+            durations, query_counts = self.views[view]
+            durations.add(duration_ms)
+            query_counts.add(queries)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {"duration_ms": durations.as_dict(), "queries": queries.as_dict()}
+                for view, (durations, queries) in sorted(self.views.items())
+            }
+
+
+request_metrics = RequestMetrics()
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in with the REQUEST_PROFILING setting. Counts and times every query a
+    request runs and the time TimedJSONRenderer spends rendering; the rest,
+    "app", is view and serializer code. Reports them in a Server-Timing header
+    and the request metrics histograms. Requests slower than
+    REQUEST_PROFILING_SLOW_MS are logged with their most repeated queries.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = request.profile = RequestProfile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        view = self.view_name(request)
+        request_metrics.record(view, total_ms, profile.queries)
+        response["Server-Timing"] = ", ".join(
+            (
+                f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries"',
+                f"app;dur={profile.app_time(total_ms) * 1000:.1f}",
+                f"render;dur={profile.render_time * 1000:.1f}",
+                f"total;dur={total_ms:.1f}",
+            )
+        )
+        if total_ms >= settings.REQUEST_PROFILING_SLOW_MS:
+            self.log_slow_request(request, view, total_ms, profile)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unresolved"
+        return match.view_name or match._func_path
+
+    @staticmethod
+    def log_slow_request(request, view, total_ms, profile):
+        repeated = "".join(
+            f"\n  {count}x {sql}" for sql, count in profile.repeated_queries()
+        )
+        logger.warning(
+            "Slow request %s %s (%s): %.1fms, %d queries in %.1fms, app %.1fms, "
+            "render %.1fms%s",
+            request.method,
+            request.path,
+            view,
+            total_ms,
+            profile.queries,
+            profile.db_time * 1000,
+            profile.app_time(total_ms) * 1000,
+            profile.render_time * 1000,
+            repeated,
+        )
+
+
+class RequestMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {
+                "slow_ms": settings.REQUEST_PROFILING_SLOW_MS,
+                "views": request_metrics.snapshot(),
+                "response_cache": cache_metrics.snapshot(),
+            }
+        )
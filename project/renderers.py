@@ -0,0 +1,21 @@
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    Adds the time spent rendering to the request's profile, when
+    RequestProfilingMiddleware has given it one.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        request = (renderer_context or {}).get("request")
+        profile = getattr(request, "profile", None)
+        if profile is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            profile.render_time += time.perf_counter() - start
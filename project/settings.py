@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "project.instrumentation.RequestProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -88,6 +89,9 @@ DATABASES = {
         "NAME": os.getenv("DB_NAME"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        # seconds each worker thread keeps its connection open, 0 closes it
+        # after every request
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0)),
     }
 }
 
@@ -111,6 +115,28 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# PBKDF2 work factor, Django's default unless PASSWORD_HASH_ITERATIONS is set.
+# Logins verify passwords on a pool of PASSWORD_HASH_WORKERS threads with room
+# for PASSWORD_HASH_QUEUE more waiting, past which they are answered with a
+# 503 rather than left to pile up on the CPU.
+PASSWORD_HASHERS = [
+    "users.hashers.ConfigurablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", 150000))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 2 * PASSWORD_HASH_WORKERS))
+
+# Login attempts are limited by token buckets per client IP and per email, held
+# in LOGIN_THROTTLE_CACHE (per process unless that cache is shared). "10/min"
+# allows a burst of 10 and refills one every 6 seconds.
+LOGIN_THROTTLE_CACHE = "throttle"
+LOGIN_THROTTLE_RATES = {
+    "ip": os.getenv("LOGIN_THROTTLE_IP", "30/min"),
+    "email": os.getenv("LOGIN_THROTTLE_EMAIL", "10/min"),
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
@@ -130,20 +156,87 @@ USE_TZ = False
 
 STATIC_URL = "/static/"
 
+# webpack build output, served by frontend.views along with the town catalogue
+FRONTEND_DIST_DIR = os.path.join(BASE_DIR, "frontend", "dist")
+
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        # a JSONRenderer that reports its time to REQUEST_PROFILING
+        "project.renderers.TimedJSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "users.authentication.JWTAuthentication",
-        "rest_framework.authentication.BasicAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 100,
+    # proxies in front of the app that append to X-Forwarded-For, so throttles
+    # key on the client address and not on a header the client can set itself;
+    # gunicorn.conf.py sets 1 on Heroku and requires it anywhere else
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 0)),
 }
 
 AUTH_USER_MODEL = "users.User"
 
+# With JWT_LAZY_USER a token's user is only loaded once a view uses more than
+# its id, and then from a per-worker cache kept for USER_CACHE_SECONDS (0 turns
+# the cache off). Saving or deleting a user drops it from this worker's cache,
+# other workers see the change once their copy expires.
+JWT_LAZY_USER = os.getenv("JWT_LAZY_USER", "1") == "1"
+
+# Login returns a short-lived access token and a longer-lived refresh token,
+# which POST /api/token/refresh exchanges (once) for a new pair.
+JWT_ACCESS_TOKEN_SECONDS = int(os.getenv("JWT_ACCESS_TOKEN_SECONDS", 60 * 60))
+JWT_REFRESH_TOKEN_SECONDS = int(
+    os.getenv("JWT_REFRESH_TOKEN_SECONDS", 14 * 24 * 60 * 60)
+)
+USER_CACHE_SECONDS = float(os.getenv("USER_CACHE_SECONDS", 30))
+
 # django_heroku.settings(locals())
+
+# Platform badges (most countries, cities, capitals, awards) are recalculated
+# after user saves. "async" coalesces saves within the debounce window into one
+# background run, "sync" recalculates inline and "off" disables it.
+PLATFORM_BADGES_MODE = os.getenv("PLATFORM_BADGES_MODE", "async")
+PLATFORM_BADGES_DEBOUNCE_SECONDS = float(
+    os.getenv("PLATFORM_BADGES_DEBOUNCE_SECONDS", 5)
+)
+
+# Per-request query counts, DB and serializer timings, reported in Server-Timing
+# headers and at /api/metrics/requests. Requests slower than
+# REQUEST_PROFILING_SLOW_MS are logged with their most repeated queries.
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "") == "1"
+REQUEST_PROFILING_SLOW_MS = float(os.getenv("REQUEST_PROFILING_SLOW_MS", 500))
+
+# Rendered responses of the read-mostly town, badge and group endpoints are
+# cached until a signal invalidates them. Workers need a shared CACHE_BACKEND so
+# invalidations, revocations and login throttles reach every one of them;
+# gunicorn.conf.py defaults it to the database cache, leaving this per-process
+# default to runserver and the tests. A timeout of 0 disables the response cache.
+#
+# Login throttle buckets and the version stamps of the revocation list and badge
+# catalogue each get a cache of their own, so filling the response cache can
+# never evict them. With the database cache each LOCATION is a table.
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", "cache_table"),
+    },
+    "throttle": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("THROTTLE_CACHE_LOCATION", "throttle_cache_table"),
+        # a bucket per client address and email, so room for many clients
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+    "versions": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("VERSION_CACHE_LOCATION", "version_cache_table"),
+    },
+}
+VERSION_CACHE = "versions"
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300))
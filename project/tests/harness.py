@@ -0,0 +1,185 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import factory.random
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, get_resolver
+from rest_framework.test import APIClient
+
+from travels.models import Badge, Group
+from travels.tests.factories import BadgeFactory, TownFactory
+from users.tests.factories import UserFactory
+from users.tokens import issue_tokens
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), "budgets.json")
+PASSWORD = "budgetpassword1"
+
+
+def load_budgets(path=BUDGET_FILE):
+    with open(path) as file:
+        return json.load(file)
+
+
+def url_routes(patterns=None, prefix=""):
+    """Every route pattern in the URL conf, leaving out DRF's format suffix copies."""
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from url_routes(pattern.url_patterns, route)
+        elif "<format>" not in route:
+            yield route
+
+
+def seed(users=5, towns=50, visits=10, groups=2, rng=None):
+    """
+    Builds a dataset shaped like production: the full badge table, a town
+    catalogue, travellers who have added visits through the badge pipeline and
+    groups with members and pending requests. The last user is left out of
+    every group.
+    """
+    rng = rng or random.Random(0)
+    factory.random.reseed_random(0)
+    for badge_id in range(1, 218):
+        BadgeFactory(id=badge_id)
+    catalogue = TownFactory.create_batch(towns)
+    travellers = UserFactory.create_batch(users)
+    for traveller in travellers:
+        traveller.set_password(PASSWORD)
+        traveller.add_visits(*rng.sample(catalogue, min(visits, towns)))
+    for i in range(groups):
+        group = Group.objects.create(
+            name=f"group {i}", description="seeded", owner=travellers[i % users]
+        )
+        group.members.add(*travellers[: max(users - 2, 1)])
+        group.requests.add(travellers[-2])
+    return {
+        "user": travellers[0],
+        "outsider": travellers[-1],
+        "town": catalogue[0],
+        "group": Group.objects.first(),
+        "badge": Badge.objects.first(),
+    }
+
+
+def fill(value, placeholders):
+    """Substitutes "{name}" placeholders in a request path or body."""
+    if isinstance(value, dict):
+        return {key: fill(item, placeholders) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, placeholders) for item in value]
+    if isinstance(value, str):
+        if value.startswith("{") and value[1:-1] in placeholders:
+            return placeholders[value[1:-1]]
+        return value.format(**placeholders)
+    return value
+
+
+class Rollback(Exception):
+    pass
+
+
+class EndpointBudgetMixin:
+    """
+    Seeds a dataset at `scale`, makes every request listed in the budget file
+    and fails if any of them runs more queries, or takes longer, than its
+    budget. Query budgets hold at every scale, so a request whose queries grow
+    with the data fails at the larger one. Mix into an APITestCase and set
+    `scale`. Set ENDPOINT_BUDGET_REPORT to a path to have the measurements
+    written there, e.g. when updating budgets.json.
+    """
+
+    scale = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.dist_dir = tempfile.mkdtemp()
+        for name, content in (("index.html", "<html></html>"), ("bundle.js", "//")):
+            with open(os.path.join(cls.dist_dir, name), "w") as file:
+                file.write(content)
+        cls.dist_override = override_settings(FRONTEND_DIST_DIR=cls.dist_dir)
+        cls.dist_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dist_override.disable()
+        shutil.rmtree(cls.dist_dir)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.budgets = load_budgets()
+        cls.objects = seed(**cls.budgets["scales"][cls.scale])
+
+    def request(self, entry):
+        placeholders = {name: obj.pk for name, obj in self.objects.items()}
+        user = self.objects["user"]
+        placeholders.update(
+            (field, getattr(user, field))
+            for field in ("email", "username", "first_name", "last_name")
+        )
+        placeholders["refresh"] = issue_tokens(user.pk)["refresh"]
+        client = APIClient()
+        if entry.get("auth"):
+            client.force_authenticate(self.objects[entry["auth"]])
+        return getattr(client, entry["method"])(
+            fill(entry["path"], placeholders),
+            fill(entry.get("data", {}), placeholders),
+            format="json",
+        )
+
+    def measure(self, entry):
+        """Runs one request inside a rolled back transaction."""
+        try:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = self.request(entry)
+                    if getattr(response, "streaming", False):
+                        b"".join(response.streaming_content)
+                    elapsed = (time.perf_counter() - start) * 1000
+                raise Rollback
+        except Rollback:
+            pass
+        return response, len(queries), elapsed
+
+    def test_every_route_has_a_budget(self):
+        covered = {entry["route"] for entry in self.budgets["endpoints"]}
+        covered |= set(self.budgets["skipped"])
+        missing = [
+            route
+            for route in url_routes()
+            if route not in covered and not route.startswith("admin/")
+        ]
+        self.assertEqual(missing, [], "routes missing from budgets.json")
+
+    def test_endpoints_within_budget(self):
+        report = []
+        for entry in self.budgets["endpoints"]:
+            label = f"{entry['method'].upper()} {entry['path']}"
+            response, queries, elapsed = self.measure(entry)
+            report.append(
+                {
+                    "endpoint": label,
+                    "status": response.status_code,
+                    "queries": queries,
+                    "ms": round(elapsed, 2),
+                }
+            )
+            with self.subTest(label):
+                self.assertEqual(response.status_code, entry.get("status", 200))
+                self.assertLessEqual(queries, entry["queries"], "queries")
+                self.assertLessEqual(
+                    elapsed, entry.get("ms", self.budgets["default_ms"]), "ms"
+                )
+
+        report_path = os.getenv("ENDPOINT_BUDGET_REPORT")
+        if report_path:
+            with open(f"{report_path}.{self.scale}.json", "w") as file:
+                json.dump(report, file, indent=2)
@@ -0,0 +1,11 @@
+from rest_framework.test import APITestCase
+
+from project.tests.harness import EndpointBudgetMixin
+
+
+class TestSmallScaleBudgets(EndpointBudgetMixin, APITestCase):
+    scale = "small"
+
+
+class TestMediumScaleBudgets(EndpointBudgetMixin, APITestCase):
+    scale = "medium"
@@ -0,0 +1,81 @@
+from django.test import override_settings
+from django.urls import path
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from rest_framework.views import APIView
+
+from project.instrumentation import fingerprint, request_metrics
+from travels.models import Town
+from travels.tests.factories import TownFactory
+from users.tests.factories import UserFactory
+
+
+class NPlusOneView(APIView):
+    def get(self, request):
+        for pk in Town.objects.values_list("pk", flat=True):
+            Town.objects.get(pk=pk)
+        return Response({})
+
+
+urlpatterns = [path("n-plus-one/", NPlusOneView.as_view(), name="n-plus-one")]
+
+
+@override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_SLOW_MS=10000)
+class TestRequestProfiling(APITestCase):
+    def setUp(self) -> None:
+        request_metrics.reset()
+        TownFactory.create_batch(3)
+
+    def test_server_timing_reports_queries_app_and_render_time(self):
+        response = self.client.get(reverse("towns-v1-list"))
+
+        timing = response["Server-Timing"]
+        self.assertIn('desc="2 queries"', timing)
+        self.assertIn("app;dur=", timing)
+        self.assertIn("render;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+    def test_slow_requests_are_logged_with_repeated_queries(self):
+        user = UserFactory()
+        self.client.force_authenticate(user)
+
+        with override_settings(REQUEST_PROFILING_SLOW_MS=0):
+            with self.assertLogs("project.instrumentation", "WARNING") as logs:
+                self.client.get(reverse("users-v1-list"))
+
+        self.assertIn("Slow request GET /api/users/ (users-v1-list)", logs.output[0])
+
+    @override_settings(ROOT_URLCONF=__name__, REQUEST_PROFILING_SLOW_MS=0)
+    def test_slow_request_log_lists_the_most_repeated_queries(self):
+        with self.assertLogs("project.instrumentation", "WARNING") as logs:
+            self.client.get("/n-plus-one/")
+
+        lines = logs.output[0].splitlines()
+        self.assertIn("Slow request GET /n-plus-one/ (n-plus-one)", lines[0])
+        self.assertEqual(len(lines), 2)
+        self.assertRegex(lines[1], r'^  3x SELECT .* FROM "travels_town" WHERE')
+
+    def test_metrics_are_admin_only(self):
+        self.client.get(reverse("towns-v1-list"))
+        self.client.force_authenticate(UserFactory())
+        self.assertEqual(self.client.get(reverse("request-metrics")).status_code, 403)
+
+        self.client.force_authenticate(UserFactory(is_staff=True))
+        response = self.client.get(reverse("request-metrics"))
+
+        towns = response.data["views"]["towns-v1-list"]
+        self.assertEqual(towns["duration_ms"]["count"], 1)
+        self.assertEqual(towns["queries"]["buckets"]["le_2"], 1)
+
+    def test_fingerprint_collapses_in_lists(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s)'),
+        )
+
+
+class TestProfilingDisabled(APITestCase):
+    def test_no_server_timing_by_default(self):
+        response = self.client.get(reverse("towns-v1-list"))
+        self.assertNotIn("Server-Timing", response)
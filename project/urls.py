@@ -13,11 +13,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+
 from django.contrib import admin
 from django.urls import path, include
 
+from project.instrumentation import RequestMetricsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/metrics/requests", RequestMetricsView.as_view(), name="request-metrics"),
     path("api/", include("users.urls")),
     path("api/", include("travels.urls")),
     path("", include("frontend.urls")),
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TravelsConfig(AppConfig):
     name = "travels"
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,83 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from travels.models import Badge
+
+VERSION_KEY = "travels:badge-catalogue-version"
+# how long a worker trusts its catalogue before re-reading the shared version
+VERSION_CHECK_SECONDS = 1.0
+
+
+class BadgeCatalogue:
+    """
+    Every badge held in memory, looked up by id or by name. The badge table
+    only changes when badges are edited, so each worker loads it once and
+    reloads it when any worker bumps the version stamp in the shared cache.
+    """
+
+    def __init__(self, badges=()):
+        self.by_id = {badge.id: badge for badge in badges}
+        self.ids_by_name = {}
+        for badge in self.by_id.values():
+            self.ids_by_name.setdefault(badge.name, set()).add(badge.id)
+
+    @classmethod
+    def from_queryset(cls, badges):
+        return cls(list(badges))
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def ids_named(self, names):
+        return {
+            badge_id for name in names for badge_id in self.ids_by_name.get(name, ())
+        }
+
+    def existing(self, badge_ids):
+        """The given ids that belong to a badge."""
+        return {badge_id for badge_id in badge_ids if badge_id in self.by_id}
+
+
+_catalogue = None
+_version = None
+_checked = 0.0
+_lock = threading.Lock()
+
+
+def get_badge_catalogue():
+    global _catalogue, _version, _checked
+    now = time.monotonic()
+    if _catalogue is not None and now - _checked < VERSION_CHECK_SECONDS:
+        return _catalogue
+
+    version = caches[settings.VERSION_CACHE].get(VERSION_KEY)
+    with _lock:
+        if _catalogue is None or version != _version:
+            _catalogue = BadgeCatalogue.from_queryset(Badge.objects.all())
+            _version = version
+        _checked = now
+    return _catalogue
+
+
+def reload_badge_catalogue():
+    """
+    Drops this worker's catalogue and bumps the shared version so every worker
+    reloads. Only call it once badge changes are committed, or in tests.
+    """
+    global _catalogue
+    _catalogue = None
+    caches[settings.VERSION_CACHE].set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_badge_catalogue(**kwargs):
+    """
+    Reloads every worker's catalogue once the current transaction commits, and
+    not before: a worker reloading earlier would keep uncommitted badges, even
+    after a rollback.
+    """
+    transaction.on_commit(reload_badge_catalogue)
@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import json
+import os
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # brotli variants are optional
+    brotli = None
+
+CATALOGUE_FIELDS = (
+    "id",
+    "name",
+    "name_ascii",
+    "latitude",
+    "longitude",
+    "country",
+    "iso2",
+    "iso3",
+    "continent",
+    "admin_name",
+    "capital",
+    "population",
+)
+MANIFEST_NAME = "towns.manifest.json"
+
+
+def build_catalogue(towns):
+    """
+    Serialises towns column by column, e.g. {"fields": [...], "columns":
+    {"id": [...], "name": [...]}}, which compresses far better than a list of
+    objects repeating every key.
+    """
+    rows = list(towns.order_by("id").values_list(*CATALOGUE_FIELDS))
+    columns = {
+        field: [row[i] for row in rows] for i, field in enumerate(CATALOGUE_FIELDS)
+    }
+    payload = {"fields": CATALOGUE_FIELDS, "count": len(rows), "columns": columns}
+    content = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return content.encode(), len(rows)
+
+
+def export_catalogue(towns, directory=None):
+    """
+    Writes towns.<hash>.json with pre-compressed .gz (and .br, when brotli is
+    installed) variants, then points the manifest at it. Returns the manifest.
+    """
+    directory = directory or settings.FRONTEND_DIST_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    content, count = build_catalogue(towns)
+    version = hashlib.sha256(content).hexdigest()[:16]
+    filename = f"towns.{version}.json"
+    variants = {filename: content, f"{filename}.gz": gzip.compress(content, 9, mtime=0)}
+    if brotli:
+        variants[f"{filename}.br"] = brotli.compress(content)
+
+    for name, data in variants.items():
+        with open(os.path.join(directory, name), "wb") as file:
+            file.write(data)
+
+    manifest = {
+        "version": version,
+        "filename": filename,
+        "count": count,
+        "sizes": {name: len(data) for name, data in variants.items()},
+    }
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    with open(f"{manifest_path}.tmp", "w") as file:
+        json.dump(manifest, file)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    return manifest
+
+
+def prune_catalogues(keep, directory=None):
+    """Removes snapshots other than the one in `keep`. Returns the removed names."""
+    directory = directory or settings.FRONTEND_DIST_DIR
+    removed = []
+    for name in os.listdir(directory):
+        if (
+            name.startswith("towns.")
+            and name != MANIFEST_NAME
+            and not name.startswith(keep)
+        ):
+            os.remove(os.path.join(directory, name))
+            removed.append(name)
+    return removed
+
+
+_manifest = (None, None)
+
+
+def current_catalogue():
+    """The manifest of the latest snapshot, re-read only when the file changes."""
+    global _manifest
+    path = os.path.join(settings.FRONTEND_DIST_DIR, MANIFEST_NAME)
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _manifest[0] != modified:
+        with open(path) as file:
+            _manifest = (modified, json.load(file))
+    return _manifest[1]
@@ -221,3 +221,11 @@ MOST_AWARDS_ID = 217
 MOST_CAPITALS_VISITED_ID = 216
 MOST_CITIES_VISITED_ID = 215
 MOST_COUNTRIES_VISITED_ID = 214
+
+# held by a single traveller at a time, see travels.utils.recalculate_platform_badges
+PLATFORM_BADGE_IDS = (
+    MOST_COUNTRIES_VISITED_ID,
+    MOST_CITIES_VISITED_ID,
+    MOST_CAPITALS_VISITED_ID,
+    MOST_AWARDS_ID,
+)
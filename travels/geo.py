@@ -0,0 +1,96 @@
+import math
+import threading
+
+import numpy as np
+
+from travels.managers import EARTH_RADIUS_KM
+from travels.models import Town
+
+
+class TownIndex:
+    """
+    Nearest-town lookups held in memory, built once per worker from the town
+    coordinates. Towns are kept sorted by latitude, so a query only measures
+    the towns in a latitude band around the point, widening the band until it
+    is certain to contain the k nearest.
+    """
+
+    def __init__(self, rows=()):
+        rows = [row for row in rows if row[1] is not None and row[2] is not None]
+        rows.sort(key=lambda row: row[1])
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        latitudes = np.radians(np.array([row[1] for row in rows], dtype=np.float64))
+        longitudes = np.radians(np.array([row[2] for row in rows], dtype=np.float64))
+        self.latitudes = latitudes
+        self.points = np.column_stack(
+            (
+                np.cos(latitudes) * np.cos(longitudes),
+                np.cos(latitudes) * np.sin(longitudes),
+                np.sin(latitudes),
+            )
+        )
+
+    @classmethod
+    def from_queryset(cls, towns):
+        return cls(list(towns.values_list("id", "real_latitude", "real_longitude")))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nearest(self, latitude, longitude, k=1):
+        """Returns up to k (town id, distance in km) pairs, nearest first."""
+        k = min(k, len(self))
+        if k < 1:
+            return []
+
+        latitude, longitude = math.radians(latitude), math.radians(longitude)
+        target = np.array(
+            [
+                math.cos(latitude) * math.cos(longitude),
+                math.cos(latitude) * math.sin(longitude),
+                math.sin(latitude),
+            ]
+        )
+        band = math.radians(1)
+        while True:
+            start, end = np.searchsorted(
+                self.latitudes, [latitude - band, latitude + band]
+            )
+            if band >= math.pi:
+                start, end = 0, len(self)
+            if end - start >= k:
+                angles = np.arccos(np.clip(self.points[start:end] @ target, -1, 1))
+                closest = np.argpartition(angles, k - 1)[:k]
+                closest = closest[np.argsort(angles[closest])]
+                # anything outside the band is further away than `band`
+                if angles[closest[-1]] <= band or (start, end) == (0, len(self)):
+                    return [
+                        (int(self.ids[start + i]), float(angles[i] * EARTH_RADIUS_KM))
+                        for i in closest
+                    ]
+            band *= 2
+
+    def reverse_geocode(self, latitude, longitude, max_distance=50):
+        """The id of the closest town within `max_distance` km, if any."""
+        nearest = self.nearest(latitude, longitude)
+        if nearest and nearest[0][1] <= max_distance:
+            return nearest[0][0]
+        return None
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_town_index():
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = TownIndex.from_queryset(Town.objects.all())
+    return _index
+
+
+def invalidate_town_index(**kwargs):
+    global _index
+    _index = None
@@ -0,0 +1,132 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from travels.models import Group
+from users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Times podium refreshes for a group with many members, the per-save "
+        "check and the batch refresh of many groups, against ranking members in "
+        "Python. The synthetic users and groups are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--members", type=int, default=10000)
+        parser.add_argument(
+            "--groups", type=int, default=500, help="for the batch refresh"
+        )
+        parser.add_argument("--group-size", type=int, default=50)
+        parser.add_argument("--samples", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        last_id = User.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        User.objects.bulk_create(
+            User(
+                username=f"podium{last_id + i}",
+                email=f"podium{last_id + i}@example.com",
+                password="!",
+                score=self.rng.randint(0, 5000),
+            )
+            for i in range(options["members"])
+        )
+        users = list(User.objects.filter(id__gt=last_id).values_list("id", flat=True))
+        owner = users[0]
+
+        group = Group.objects.create(name="benchmark", description="-", owner_id=owner)
+        self.add_members(group.pk, users)
+
+        samples = options["samples"]
+        windowed = self.measure(samples, lambda: self.reset_and_refresh(group.pk))
+        in_python = self.measure(samples, lambda: self.rank_in_python(group))
+
+        Group.objects.refresh_podiums([group.pk])
+        group.refresh_from_db()
+        below = User.objects.filter(score__lt=group.podium_3_score, groups_joined=group)
+        below_podium = self.measure(
+            samples, lambda: Group.objects.refresh_podiums_for(below.first())
+        )
+        on_podium = self.measure(
+            samples, lambda: Group.objects.refresh_podiums_for(group.podium_1_user)
+        )
+
+        groups = Group.objects.bulk_create(
+            Group(name=f"batch {i}", description="-", owner_id=owner)
+            for i in range(options["groups"])
+        )
+        if not all(batch_group.pk for batch_group in groups):
+            groups = Group.objects.filter(name__startswith="batch ")
+        for batch_group in groups:
+            self.add_members(
+                batch_group.pk, self.rng.sample(users, options["group_size"])
+            )
+        start = time.perf_counter()
+        changed = Group.objects.refresh_podiums()
+        batch_time = time.perf_counter() - start
+
+        self.stdout.write(f"{len(users)} members in one group, {samples} samples")
+        for label, timings in (
+            ("windowed refresh", windowed),
+            ("ranked in python", in_python),
+            ("save below podium", below_podium),
+            ("save on podium", on_podium),
+        ):
+            self.stdout.write(
+                f"{label:>18}: p50 {statistics.median(timings) * 1000:.3f}ms, "
+                f"max {max(timings) * 1000:.3f}ms"
+            )
+        self.stdout.write(
+            f"batch refresh of {Group.objects.count()} groups ({changed} changed): "
+            f"{batch_time * 1000:.1f}ms"
+        )
+
+    @staticmethod
+    def add_members(group_id, user_ids):
+        Group.members.through.objects.bulk_create(
+            Group.members.through(group_id=group_id, user_id=user_id)
+            for user_id in user_ids
+        )
+
+    @staticmethod
+    def reset_and_refresh(group_id):
+        Group.objects.filter(pk=group_id).update(podium_1_user=None)
+        Group.objects.refresh_podiums([group_id])
+
+    @staticmethod
+    def rank_in_python(group):
+        members = sorted(
+            group.members.values_list("score", "id"), key=lambda m: (-m[0], m[1])
+        )
+        for place, (score, user_id) in enumerate(members[:3], start=1):
+            setattr(group, f"podium_{place}_user_id", user_id)
+            setattr(group, f"podium_{place}_score", score)
+        group.save()
+
+    @staticmethod
+    def measure(samples, operation):
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            operation()
+            timings.append(time.perf_counter() - start)
+        return timings
@@ -0,0 +1,65 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from travels.geo import TownIndex
+from travels.managers import haversine
+from travels.models import Town
+
+
+class Command(BaseCommand):
+    help = (
+        "Times k-nearest town lookups through the in-memory TownIndex against "
+        "an ORM query ordering every town by haversine distance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("-k", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        build_start = time.perf_counter()
+        index = TownIndex.from_queryset(Town.objects.all())
+        build_time = time.perf_counter() - build_start
+        if not len(index):
+            raise CommandError("No towns with coordinates to search")
+
+        rng = random.Random(options["seed"])
+        points = [
+            (rng.uniform(-60, 70), rng.uniform(-180, 180))
+            for _ in range(options["queries"])
+        ]
+        k = options["k"]
+
+        index_times, orm_times, mismatches = [], [], 0
+        for latitude, longitude in points:
+            start = time.perf_counter()
+            from_index = [
+                town_id for town_id, _ in index.nearest(latitude, longitude, k)
+            ]
+            index_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            from_orm = list(
+                Town.objects.exclude(real_latitude=None)
+                .annotate(distance=haversine(latitude, longitude))
+                .order_by("distance")
+                .values_list("id", flat=True)[:k]
+            )
+            orm_times.append(time.perf_counter() - start)
+            mismatches += from_index[:1] != from_orm[:1]
+
+        self.stdout.write(
+            f"{len(index)} towns, index built in {build_time * 1000:.1f}ms, "
+            f"{len(points)} queries with k={k}"
+        )
+        for label, timings in (("index", index_times), ("orm", orm_times)):
+            timings = sorted(timings)
+            self.stdout.write(
+                f"{label:>6}: p50 {statistics.median(timings) * 1000:.3f}ms, "
+                f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.3f}ms"
+            )
+        self.stdout.write(f"nearest town differed for {mismatches} queries")
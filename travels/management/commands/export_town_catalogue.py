@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from travels.catalogue import export_catalogue, prune_catalogues
+from travels.models import Town
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports the town catalogue as a versioned, pre-compressed JSON snapshot "
+        "served alongside the frontend assets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directory", default=None)
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Remove earlier snapshots once the new one is written.",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"] or settings.FRONTEND_DIST_DIR
+        manifest = export_catalogue(Town.objects.all(), directory)
+
+        sizes = ", ".join(f"{name} {size}B" for name, size in manifest["sizes"].items())
+        self.stdout.write(
+            f"Exported {manifest['count']} towns as version {manifest['version']}: {sizes}"
+        )
+        if options["prune"]:
+            removed = prune_catalogues(manifest["filename"], directory)
+            self.stdout.write(f"Removed {len(removed)} earlier snapshot files")
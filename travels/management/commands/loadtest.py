@@ -0,0 +1,144 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from travels.models import Group, Town
+from users.models import User
+from users.tokens import issue_tokens
+
+ROUTES = (
+    "/api/towns/",
+    "/api/towns/search/?q=lon",
+    "/api/towns/nearest/?near=51.5,-0.1&k=5",
+    "/api/badges/",
+    "/api/groups/",
+    "/api/groups/{group}/",
+    "/api/leaderboard",
+    "/api/users/",
+    "/api/users/{user}/",
+    "/api/profile",
+)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load tests a running server (e.g. gunicorn with the production profile) "
+        "that shares this database. Each main API route is requested by "
+        "--concurrency keep-alive clients for --duration seconds and its "
+        "requests/sec and latency reported. A user with some visits and a group "
+        "is created to authenticate as and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--duration", type=float, default=10)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--towns", type=int, default=20, help="visited by the user")
+        parser.add_argument(
+            "--route", action="append", help="instead of the main routes"
+        )
+        parser.add_argument("--output", help="also write the results here as JSON")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise CommandError(f"Not an http(s) URL: {options['url']}")
+
+        user = User.objects.create(
+            username="loadtest", email="loadtest@example.com", password="!"
+        )
+        try:
+            user.towns.add(
+                *Town.objects.values_list("id", flat=True)[: options["towns"]]
+            )
+            user.add_awards()
+            group = Group.objects.create(name="loadtest", description="-", owner=user)
+            group.members.add(user)
+
+            headers = {"Authorization": f"Bearer {issue_tokens(user.id)['token']}"}
+            results = []
+            for route in options["route"] or ROUTES:
+                path = url.path.rstrip("/") + route.format(user=user.id, group=group.id)
+                result = self.load(
+                    url, path, headers, options["concurrency"], options["duration"]
+                )
+                results.append(result)
+                self.report(result)
+        finally:
+            Group.objects.filter(name="loadtest", owner=user).delete()
+            user.delete()
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
+
+    @staticmethod
+    def load(url, path, headers, concurrency, duration):
+        connection_class = (
+            http.client.HTTPSConnection
+            if url.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        deadline = time.perf_counter() + duration
+        timings, failures = [], []
+        lock = threading.Lock()
+
+        def client():
+            connection = connection_class(url.hostname, url.port, timeout=30)
+            times, failed = [], []
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException) as error:
+                    connection.close()
+                    status = type(error).__name__
+                times.append(time.perf_counter() - start)
+                if status != 200:
+                    failed.append(status)
+            connection.close()
+            with lock:
+                timings.extend(times)
+                failures.extend(failed)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        return {
+            "path": path,
+            "requests": len(timings),
+            "requests_per_sec": round(len(timings) / elapsed, 1),
+            "p50_ms": round(statistics.median(timings) * 1000, 2) if timings else None,
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 2) if timings else None,
+            "failures": {
+                str(status): failures.count(status) for status in set(failures)
+            },
+        }
+
+    def report(self, result):
+        failures = ", ".join(
+            f"{n} x {status}" for status, n in result["failures"].items()
+        )
+        self.stdout.write(
+            f"{result['path']:<45} {result['requests_per_sec']:>8.1f} req/s  "
+            f"p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms"
+            + (f"  failed: {failures}" if failures else "")
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from travels.models import Group
+from travels.response_cache import GROUPS, USERS, invalidate_responses
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the podium of every group from one windowed query over all "
+        "memberships, writing back only the podiums that changed."
+    )
+
+    def handle(self, *args, **options):
+        changed = Group.objects.refresh_podiums()
+        if changed:
+            # podiums are written with bulk updates, which send no signals
+            invalidate_responses(GROUPS, USERS)
+        self.stdout.write(f"Updated the podiums of {changed} groups")
@@ -1,49 +1,318 @@
-from django.db import models
+import math
+
+from django.db import connections, models
 
 from dataclasses import dataclass
-from typing import List, Union
+from typing import FrozenSet, List, Optional, Union
 
-from django.db.models import QuerySet, Value, FloatField, Q
-from django.db.models.functions import Replace, Cast
+from django.db.models import (
+    Count,
+    ExpressionWrapper,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import (
+    ASin,
+    Coalesce,
+    Cos,
+    Least,
+    Power,
+    Radians,
+    Sin,
+    Sqrt,
+)
 
-from travels.constants import CITY_VISIT_BADGES, COUNTRY_VISIT_BADGES
+from travels.constants import (
+    CITY_VISIT_BADGES,
+    COUNTRY_VISIT_BADGES,
+    PLATFORM_BADGE_IDS,
+)
+from travels.rules import SPECIAL_BADGE_RULES, compile_rules
 
 
 class BadgeAssignmentManager(models.Manager):
-    def get_qualifying_badges(self, towns):
-        travels = Travel(towns)
-
-        queries = [
-            Q(
-                name__in=list(towns.values_list("country", flat=True).distinct())
-                + list(towns.values_list("continent", flat=True).distinct())
-            ),
-            Q(
-                id__in=[
-                    b
-                    for count, b in COUNTRY_VISIT_BADGES.items()
-                    if towns.values_list("country", flat=True).distinct().count()
-                    >= int(count)
-                ]
-                + [
-                    b
-                    for count, b in CITY_VISIT_BADGES.items()
-                    if towns.count() >= int(count)
-                ]
-            ),
-        ]
-        special_queries = award_special_targets(travels)
-
-        check = (
-            self.get_queryset().all().filter(queries[0] | queries[1] | special_queries)
+    def get_qualifying_badge_ids(self, towns, rules=SPECIAL_BADGE_RULES):
+        """Badge ids earned by visiting `towns`, resolved from the badge catalogue."""
+        from travels.badges import get_badge_catalogue
+
+        travels = TravelSnapshot.from_towns(towns, rules)
+        catalogue = get_badge_catalogue()
+
+        badge_ids = catalogue.ids_named(
+            list(travels.countries) + list(travels.continents)
+        )
+        badge_ids.update(
+            b
+            for count, b in COUNTRY_VISIT_BADGES.items()
+            if len(travels.countries) >= int(count)
+        )
+        badge_ids.update(
+            b
+            for count, b in CITY_VISIT_BADGES.items()
+            if travels.city_count >= int(count)
         )
-        return check
+        badge_ids.update(travels.earned_rule_badges(rules))
+        return catalogue.existing(badge_ids)
+
+    def get_qualifying_badges(self, towns, rules=SPECIAL_BADGE_RULES):
+        return self.get_queryset().filter(
+            id__in=self.get_qualifying_badge_ids(towns, rules)
+        )
+
+    def sync(self, user) -> "BadgeDelta":
+        """
+        Brings the user's badges in line with their towns, inserting only the
+        newly qualifying badges and deleting those no longer earned. Platform
+        badges are left to recalculate_platform_badges.
+        """
+        qualifying = self.get_qualifying_badge_ids(towns=user.towns)
+        through = self.model.users.through
+        current = set(
+            through.objects.filter(user=user)
+            .exclude(badge_id__in=PLATFORM_BADGE_IDS)
+            .values_list("badge_id", flat=True)
+        )
+        delta = BadgeDelta(
+            earned=frozenset(qualifying - current), lost=frozenset(current - qualifying)
+        )
+        if delta.earned:
+            through.objects.bulk_create(
+                through(user_id=user.pk, badge_id=badge_id) for badge_id in delta.earned
+            )
+        if delta.lost:
+            through.objects.filter(user=user, badge_id__in=delta.lost).delete()
+        return delta
+
+
+@dataclass(frozen=True)
+class BadgeDelta:
+    earned: FrozenSet[int] = frozenset()
+    lost: FrozenSet[int] = frozenset()
+
+    def __bool__(self):
+        return bool(self.earned or self.lost)
 
 
 class TownManager(models.Manager):
     def count_travel_score(self):
         return Travel(self).score
 
+    def visitors_by_country(self):
+        """The number of distinct users who visited each country, by ISO2 code."""
+        return dict(
+            self.model.visitors.through.objects.values_list("town__iso2")
+            .annotate(visitors=Count("user_id", distinct=True))
+            .order_by()
+        )
+
+    def within_bounds(self, south, west, north, east):
+        """Towns inside a bounding box. The box may cross the antimeridian."""
+        longitudes = Q(real_longitude__gte=west, real_longitude__lte=east)
+        if west > east:
+            longitudes = Q(real_longitude__gte=west) | Q(real_longitude__lte=east)
+        return self.filter(
+            longitudes, real_latitude__gte=south, real_latitude__lte=north
+        )
+
+    def within_radius(self, latitude, longitude, kilometres):
+        """
+        Towns within `kilometres` of a point, annotated with their great-circle
+        `distance` and nearest first. A bounding box on the indexed coordinates
+        narrows the candidates before the haversine distance is worked out.
+        """
+        angle = kilometres / EARTH_RADIUS_KM
+        south = max(latitude - math.degrees(angle), -90)
+        north = min(latitude + math.degrees(angle), 90)
+        spread = math.sin(angle) / max(math.cos(math.radians(latitude)), 1e-12)
+
+        if south == -90 or north == 90 or spread >= 1:
+            candidates = self.filter(real_latitude__gte=south, real_latitude__lte=north)
+        else:
+            lng_delta = math.degrees(math.asin(spread))
+            candidates = self.within_bounds(
+                south,
+                wrap_longitude(longitude - lng_delta),
+                north,
+                wrap_longitude(longitude + lng_delta),
+            )
+        return (
+            candidates.annotate(distance=haversine(latitude, longitude))
+            .filter(distance__lte=kilometres)
+            .order_by("distance")
+        )
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+PODIUM_SIZE = 3
+PODIUM_FIELDS = tuple(
+    f"podium_{place}_{field}"
+    for place in range(1, PODIUM_SIZE + 1)
+    for field in ("user", "score")
+)
+IN_CLAUSE_SIZE = 500
+
+
+class GroupManager(models.Manager):
+    def with_counts(self):
+        """Annotates member_count and request_count, counted in subqueries per group."""
+        annotations = {}
+        for field, alias in (
+            ("members", "member_count"),
+            ("requests", "request_count"),
+        ):
+            through = self.model._meta.get_field(field).remote_field.through
+            counts = (
+                through.objects.filter(group=OuterRef("pk"))
+                .order_by()
+                .values("group")
+                .annotate(total=Count("pk"))
+                .values("total")
+            )
+            annotations[alias] = Coalesce(
+                Subquery(counts, output_field=IntegerField()), 0
+            )
+        return self.get_queryset().annotate(**annotations)
+
+    def rank_members(self, group_ids=None):
+        """
+        The top members of each group by score, ties going to the earliest
+        user, as {group_id: [(user_id, score), ...]}. One windowed query, over
+        every group when group_ids is None.
+        """
+        if group_ids is None:
+            return self._rank_members()
+        group_ids = list(group_ids)
+        podiums = {}
+        for i in range(0, len(group_ids), IN_CLAUSE_SIZE):
+            podiums.update(self._rank_members(group_ids[i : i + IN_CLAUSE_SIZE]))
+        return podiums
+
+    def _rank_members(self, group_ids=None):
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        members = self.model.members.through._meta
+        users = self.model.members.field.related_model._meta
+        group, user = (
+            members.get_field("group").column,
+            members.get_field("user").column,
+        )
+        pk, score = users.pk.column, users.get_field("score").column
+
+        where, params = "", []
+        if group_ids is not None:
+            where = f"WHERE m.{quote(group)} IN ({', '.join(['%s'] * len(group_ids))})"
+            params = list(group_ids)
+        sql = f"""
+            SELECT group_id, user_id, score FROM (
+                SELECT
+                    m.{quote(group)} AS group_id,
+                    u.{quote(pk)} AS user_id,
+                    u.{quote(score)} AS score,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY m.{quote(group)}
+                        ORDER BY u.{quote(score)} DESC, u.{quote(pk)}
+                    ) AS position
+                FROM {quote(members.db_table)} m
+                INNER JOIN {quote(users.db_table)} u ON u.{quote(pk)} = m.{quote(user)}
+                {where}
+            ) ranked
+            WHERE position <= %s
+            ORDER BY group_id, position
+        """
+        podiums = {}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [PODIUM_SIZE])
+            for group_id, user_id, user_score in cursor.fetchall():
+                podiums.setdefault(group_id, []).append((user_id, user_score))
+        return podiums
+
+    def refresh_podiums(self, group_ids=None):
+        """
+        Ranks the members of the given groups (or of every group) and writes
+        back the podiums that changed. Returns the number of groups updated.
+        """
+        podiums = self.rank_members(group_ids)
+        groups = self.only("id", *PODIUM_FIELDS)
+        if group_ids is not None:
+            groups = groups.filter(id__in=list(group_ids))
+
+        changed = []
+        for group in groups.iterator():
+            podium = podiums.get(group.pk, [])
+            values = {}
+            for place in range(PODIUM_SIZE):
+                user_id, score = podium[place] if place < len(podium) else (None, None)
+                values[f"podium_{place + 1}_user_id"] = user_id
+                values[f"podium_{place + 1}_score"] = score
+            if any(getattr(group, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(group, field, value)
+                changed.append((group, values))
+
+        if len(changed) == 1:
+            group, values = changed[0]
+            self.filter(pk=group.pk).update(**values)
+        elif changed:
+            self.bulk_update(
+                [group for group, _ in changed],
+                PODIUM_FIELDS,
+                batch_size=IN_CLAUSE_SIZE,
+            )
+        return len(changed)
+
+    def refresh_podiums_for(self, user):
+        """
+        Refreshes the podiums a change to the user's score can affect: groups
+        they are on the podium of, or whose podium their score now reaches.
+        """
+        on_podium = (
+            Q(podium_1_user=user) | Q(podium_2_user=user) | Q(podium_3_user=user)
+        )
+        reaches_podium = Q(podium_3_score__isnull=True) | Q(
+            podium_3_score__lte=user.score
+        )
+        group_ids = list(
+            self.filter(Q(members=user) & reaches_podium | on_podium)
+            .values_list("id", flat=True)
+            .distinct()
+        )
+        if group_ids:
+            self.refresh_podiums(group_ids)
+
+
+def parse_coordinate(value) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def wrap_longitude(longitude):
+    if -180 <= longitude <= 180:
+        return longitude
+    return (longitude + 180) % 360 - 180
+
+
+def haversine(latitude, longitude):
+    """Great-circle distance in km from a point to each town's coordinates."""
+    lat_delta = Radians("real_latitude") - math.radians(latitude)
+    lng_delta = Radians("real_longitude") - math.radians(longitude)
+    chord = Power(Sin(lat_delta / 2), 2) + math.cos(math.radians(latitude)) * Cos(
+        Radians("real_latitude")
+    ) * Power(Sin(lng_delta / 2), 2)
+    # rounding can take near-antipodal points just past 1, outside asin's domain
+    chord = Least(chord, Value(1.0))
+    return ExpressionWrapper(
+        2 * EARTH_RADIUS_KM * ASin(Sqrt(chord)), output_field=FloatField()
+    )
+
 
 @dataclass
 class Travel:
@@ -92,37 +361,44 @@ class Travel:
     def stan(self):
         return self.towns.filter(country__endswith="stan").exists()
 
-    @property
-    def towns_with_coordinates(self):
-        return self.towns.annotate(
-            real_latitude=Cast(
-                Replace("latitude", Value(","), Value(".")), output_field=FloatField()
-            )
-        )
-
     @property
     def reached_north_reaches(self):
-        return self.towns_with_coordinates.filter(real_latitude__gte=66).exists()
+        return self.towns.filter(real_latitude__gte=66).exists()
 
     @property
     def includes_equatorial_region(self):
-        return self.towns_with_coordinates.filter(
-            real_latitude__gte=-1, real_latitude__lte=1
-        ).exists()
-
-
-def award_special_targets(travels):
-    ids = []
-    if travels.is_viking:
-        ids.append(208)
-    if travels.follows_columbus:
-        ids.append(209)
-    if travels.kerouac_inspired:
-        ids.append(210)
-    if travels.stan:
-        ids.append(211)
-    if travels.reached_north_reaches:
-        ids.append(212)
-    if travels.includes_equatorial_region:
-        ids.append(213)
-    return Q(id__in=ids)
+        return self.towns.filter(real_latitude__gte=-1, real_latitude__lte=1).exists()
+
+
+@dataclass
+class TravelSnapshot:
+    """
+    Per (country, continent) totals for a set of towns, including the number of
+    towns matching each badge rule predicate, loaded with a single query.
+    """
+
+    rows: List[dict]
+
+    @classmethod
+    def from_towns(cls, towns, rules=SPECIAL_BADGE_RULES):
+        return cls(list(compile_rules(towns, rules)))
+
+    @property
+    def city_count(self):
+        return sum(row["cities"] for row in self.rows)
+
+    @property
+    def countries(self):
+        return {row["country"] for row in self.rows}
+
+    @property
+    def continents(self):
+        return {row["continent"] for row in self.rows}
+
+    def earned_rule_badges(self, rules=SPECIAL_BADGE_RULES):
+        totals = {}
+        for row in self.rows:
+            for key, value in row.items():
+                if key.startswith("rule_"):
+                    totals[key] = totals.get(key, 0) + value
+        return [rule.badge_id for rule in rules if rule.is_met(totals)]
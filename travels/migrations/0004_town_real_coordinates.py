@@ -0,0 +1,44 @@
+# Generated by Django 2.2.27 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+def parse_coordinate(value):
+    try:
+        return float(str(value).replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+
+
+def populate_coordinates(apps, schema_editor):
+    Town = apps.get_model('travels', 'Town')
+    towns = list(Town.objects.only('latitude', 'longitude'))
+    for town in towns:
+        town.real_latitude = parse_coordinate(town.latitude)
+        town.real_longitude = parse_coordinate(town.longitude)
+    Town.objects.bulk_update(towns, ['real_latitude', 'real_longitude'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0003_auto_20230225_2042'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='town',
+            name='real_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='town',
+            name='real_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='town',
+            index=models.Index(fields=['real_latitude', 'real_longitude'], name='travels_tow_real_la_677de4_idx'),
+        ),
+        migrations.RunPython(populate_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.27 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0004_town_real_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['name', 'id'], name='travels_gro_name_2dac7d_idx'),
+        ),
+    ]
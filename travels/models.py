@@ -1,6 +1,6 @@
 from django.db import models
 
-from travels.managers import BadgeAssignmentManager, TownManager
+from travels.managers import BadgeAssignmentManager, GroupManager, TownManager
 from users.models import User
 
 
@@ -12,6 +12,9 @@ class Town(models.Model):
     name_ascii = models.CharField(max_length=255)
     latitude = models.CharField(max_length=255)
     longitude = models.CharField(max_length=255)
+    # numeric copies of latitude/longitude, filled in on save
+    real_latitude = models.FloatField(null=True, blank=True)
+    real_longitude = models.FloatField(null=True, blank=True)
     country = models.CharField(max_length=255)
     iso2 = models.CharField(max_length=255, null=True)
     iso3 = models.CharField(max_length=255, null=True)
@@ -21,6 +24,9 @@ class Town(models.Model):
     continent = models.CharField(max_length=255)
     visitors = models.ManyToManyField(User, related_name="towns", blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["real_latitude", "real_longitude"])]
+
     def __str__(self):
         return f"{self.name} - {self.country}"
 
@@ -50,6 +56,8 @@ class Badge(models.Model):
 
 
 class Group(models.Model):
+    objects = GroupManager()
+
     name = models.CharField(max_length=50)
     description = models.CharField(max_length=255)
     image = models.CharField(
@@ -62,7 +70,8 @@ class Group(models.Model):
     members = models.ManyToManyField(User, related_name="groups_joined", blank=True)
     # may review
     requests = models.ManyToManyField(User, related_name="groups_requested", blank=True)
-    # the rest of fields are calculated fields
+    # the rest of fields are calculated fields, kept up to date by
+    # GroupManager.refresh_podiums
     podium_1_user = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -88,6 +97,10 @@ class Group(models.Model):
     podium_2_score = models.IntegerField(null=True, blank=True)
     podium_3_score = models.IntegerField(null=True, blank=True)
 
+    class Meta:
+        # the order the group directory pages through
+        indexes = [models.Index(fields=["name", "id"])]
+
     def __str__(self):
         return f"{self.name}"
 
@@ -0,0 +1,127 @@
+import hashlib
+import threading
+import uuid
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+TOWNS = "towns"
+BADGES = "badges"
+GROUPS = "groups"
+# any change to a user or their towns, badges or groups, all of which the
+# nested user serializers show
+USERS = "users"
+
+GENERATION_KEY = "responses:generation:{}"
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+class CacheMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = Counter()
+            self.misses = Counter()
+
+    def record(self, view, hit):
+        with self._lock:
+            (self.hits if hit else self.misses)[view] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {"hits": self.hits[view], "misses": self.misses[view]}
+                for view in sorted(set(self.hits) | set(self.misses))
+            }
+
+
+cache_metrics = CacheMetrics()
+
+
+def generations(namespaces):
+    """
+    The current token of each namespace. Cached responses are keyed by them, so
+    replacing a token orphans every response built from that namespace.
+    """
+    cache = response_cache()
+    keys = [GENERATION_KEY.format(namespace) for namespace in namespaces]
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            cache.add(key, uuid.uuid4().hex, None)
+            tokens[key] = cache.get(key)
+    return [tokens[key] for key in keys]
+
+
+def _replace_generations(namespaces):
+    response_cache().set_many(
+        {
+            GENERATION_KEY.format(namespace): uuid.uuid4().hex
+            for namespace in namespaces
+        },
+        None,
+    )
+
+
+def invalidate_responses(*namespaces):
+    """
+    Replaces the tokens of `namespaces` now, for the rest of this transaction,
+    and again once it commits, since a request served in between still reads
+    the old rows and would cache them under the new token.
+    """
+    if transaction.get_connection().in_atomic_block:
+        _replace_generations(namespaces)
+    transaction.on_commit(lambda: _replace_generations(namespaces))
+
+
+def cache_response(namespaces):
+    """
+    Caches the rendered JSON of a view handler's 200 responses by path, query
+    string and auth scope until one of `namespaces` (or `namespaces(request)`)
+    is invalidated. Runs after authentication and permission checks.
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            timeout = settings.RESPONSE_CACHE_TIMEOUT
+            if not timeout or request.accepted_renderer.format != "json":
+                return handler(view, request, *args, **kwargs)
+
+            dependencies = namespaces(request) if callable(namespaces) else namespaces
+            scope = "user" if request.user and request.user.is_authenticated else "anon"
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = ":".join(("responses", *generations(dependencies), scope, path))
+            label = f"{type(view).__name__}.{handler.__name__}"
+
+            cache = response_cache()
+            cached = cache.get(key)
+            cache_metrics.record(label, hit=cached is not None)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response["X-Cache"] = "HIT"
+                return response
+
+            response = view.finalize_response(
+                request, handler(view, request, *args, **kwargs), *args, **kwargs
+            )
+            response.render()
+            if response.status_code == 200:
+                cache.set(key, (response.content, response["Content-Type"]), timeout)
+            response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
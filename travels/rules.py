@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from django.db.models import Count, Q
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """
+    Matches towns by country, continent, country suffix and/or latitude band.
+    A predicate holds when at least `min_count` of a user's towns match it.
+    """
+
+    countries: Tuple[str, ...] = ()
+    continents: Tuple[str, ...] = ()
+    country_suffix: Optional[str] = None
+    latitude_band: Optional[Tuple[Optional[float], Optional[float]]] = None
+    min_count: int = 1
+
+    def as_q(self) -> Q:
+        query = Q()
+        if self.countries:
+            query &= Q(country__in=self.countries)
+        if self.continents:
+            query &= Q(continent__in=self.continents)
+        if self.country_suffix:
+            query &= Q(country__endswith=self.country_suffix)
+        if self.latitude_band:
+            lowest, highest = self.latitude_band
+            if lowest is not None:
+                query &= Q(real_latitude__gte=lowest)
+            if highest is not None:
+                query &= Q(real_latitude__lte=highest)
+        return query
+
+
+@dataclass(frozen=True)
+class BadgeRule:
+    """A badge is earned when every one of its predicates holds."""
+
+    badge_id: int
+    name: str
+    predicates: Tuple[Predicate, ...]
+
+    def aliases(self):
+        return [f"rule_{self.badge_id}_{i}" for i in range(len(self.predicates))]
+
+    def is_met(self, totals: Dict[str, int]) -> bool:
+        return all(
+            totals.get(alias, 0) >= predicate.min_count
+            for alias, predicate in zip(self.aliases(), self.predicates)
+        )
+
+
+SCANDINAVIA = ("Denmark", "Finland", "Iceland", "Norway", "Sweden")
+
+SPECIAL_BADGE_RULES = (
+    BadgeRule(
+        208,
+        "viking",
+        (Predicate(countries=("United Kingdom",)), Predicate(countries=SCANDINAVIA)),
+    ),
+    BadgeRule(
+        209,
+        "follows columbus",
+        (
+            Predicate(countries=("Spain",)),
+            Predicate(countries=("Portugal",)),
+            Predicate(continents=("South America",)),
+        ),
+    ),
+    BadgeRule(
+        210,
+        "kerouac inspired",
+        (Predicate(countries=("United States",), min_count=6),),
+    ),
+    BadgeRule(211, "stan", (Predicate(country_suffix="stan"),)),
+    BadgeRule(212, "north reaches", (Predicate(latitude_band=(66, None)),)),
+    BadgeRule(213, "equatorial region", (Predicate(latitude_band=(-1, 1)),)),
+)
+
+
+def compile_rules(towns, rules=SPECIAL_BADGE_RULES):
+    """
+    Builds one query returning a row per visited (country, continent) with the
+    number of towns and the number of towns matching each rule predicate.
+    """
+    aggregates = {
+        alias: Count("id", filter=predicate.as_q() or None)
+        for rule in rules
+        for alias, predicate in zip(rule.aliases(), rule.predicates)
+    }
+    return (
+        towns.values("country", "continent")
+        .annotate(cities=Count("id"), **aggregates)
+        .order_by()
+    )
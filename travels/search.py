@@ -0,0 +1,116 @@
+import heapq
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from travels.models import Town
+
+SEARCH_FIELDS = (
+    "id",
+    "name",
+    "name_ascii",
+    "country",
+    "admin_name",
+    "capital",
+    "population",
+)
+
+
+def normalise(text):
+    """Lower-cases text and strips accents, so 'São' and 'sao' match."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").replace("\ufeff", ""))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return stripped.casefold().strip()
+
+
+class TownSearchIndex:
+    """
+    Prefix search over town names held in memory. Every normalised name and
+    ascii name is kept in one sorted list, so the matches for a prefix are a
+    contiguous slice found by bisection. Matches are ranked with exact names
+    first, then capitals, then by population.
+    """
+
+    cached_prefix_length = 2
+    # short prefixes are cached with their top `cached_limit` matches, which
+    # smaller limits slice, and only the most recently used are kept
+    cached_limit = 50
+    cache_size = 4096
+
+    def __init__(self, rows=()):
+        self.towns = []
+        entries = []
+        for row in rows:
+            town = dict(zip(SEARCH_FIELDS, row))
+            town["name"] = town["name"].replace("\ufeff", "")
+            position = len(self.towns)
+            self.towns.append(town)
+            for key in {normalise(town["name"]), normalise(town["name_ascii"])}:
+                if key:
+                    entries.append((key, position))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.positions = [position for _, position in entries]
+        self.ranks = [
+            (town["capital"] == "primary", town["population"] or 0)
+            for town in self.towns
+        ]
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def from_queryset(cls, towns):
+        return cls(list(towns.values_list(*SEARCH_FIELDS)))
+
+    def search(self, query, limit=10):
+        prefix = normalise(query)
+        if not prefix:
+            return []
+        if len(prefix) > self.cached_prefix_length or limit > self.cached_limit:
+            return self._search(prefix, limit)
+
+        with self._cache_lock:
+            matches = self._cache.get(prefix)
+            if matches is not None:
+                self._cache.move_to_end(prefix)
+                return matches[:limit]
+        matches = self._search(prefix, self.cached_limit)
+        if matches:
+            with self._cache_lock:
+                self._cache[prefix] = matches
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return matches[:limit]
+
+    def _search(self, prefix, limit):
+        start = bisect_left(self.keys, prefix)
+        end = bisect_right(self.keys, prefix + "\uffff", lo=start)
+        matches = {}
+        for i in range(start, end):
+            position = self.positions[i]
+            matches[position] = matches.get(position, False) or self.keys[i] == prefix
+        best = heapq.nlargest(
+            limit,
+            matches,
+            key=lambda position: (matches[position], *self.ranks[position]),
+        )
+        return [self.towns[position] for position in best]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_search_index():
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = TownSearchIndex.from_queryset(Town.objects.all())
+    return _index
+
+
+def invalidate_search_index(**kwargs):
+    global _index
+    _index = None
@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from users.models import User
 
@@ -5,6 +6,33 @@ from users.models import User
 from .models import Town, Trip, Badge, Group
 
 
+def prefetch_lookups(serializer, prefix=""):
+    """
+    The prefetch_related lookups covering every relation a serializer reads,
+    following nested serializers down the tree.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = serializer.Meta.model
+    lookups = []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*" or "." in field.source:
+            continue
+        lookup = prefix + field.source
+        if isinstance(field, serializers.ManyRelatedField):
+            relation = model._meta.get_field(field.source)
+            if relation.many_to_many:
+                # only the ids are serialised
+                related_objects = relation.related_model._default_manager.only("pk")
+                lookups.append(Prefetch(lookup, queryset=related_objects))
+            else:
+                lookups.append(lookup)
+        elif isinstance(field, serializers.BaseSerializer):
+            lookups.append(lookup)
+            lookups.extend(prefetch_lookups(field, lookup + "__"))
+    return lookups
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -52,7 +80,7 @@ class GroupSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "description", "image", "owner", "members", "requests")
         extra_kwargs = {
             "members": {"required": False},
-            "requests": {"required": False}
+            "requests": {"required": False},
             # 'podium_1_user': {'required': False},
             # 'podium_2_user': {'required': False},
             # 'podium_3_user': {'required': False},
@@ -68,7 +96,35 @@ class PopulatedGroupSerializer(GroupSerializer):
     requests = UserSerializer(many=True)
 
 
+class GroupDirectorySerializer(serializers.ModelSerializer):
+    member_count = serializers.IntegerField(read_only=True)
+    request_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Group
+        fields = (
+            "id",
+            "name",
+            "description",
+            "image",
+            "owner",
+            "member_count",
+            "request_count",
+        )
+
+
+class VisitorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ("id", "username", "first_name", "last_name", "image", "score")
+
+
 class TownSerializer(serializers.ModelSerializer):
+    # only present on radius searches
+    distance = serializers.FloatField(read_only=True)
+    # only present when requested with ?visitor_count=true
+    visitor_count = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Town
         fields = (
@@ -84,7 +140,8 @@ class TownSerializer(serializers.ModelSerializer):
             "admin_name",
             "capital",
             "population",
-            "visitors",
+            "distance",
+            "visitor_count",
         )
         extra_kwargs = {
             "iso2": {"required": False},
@@ -92,5 +149,4 @@ class TownSerializer(serializers.ModelSerializer):
             "admin_name": {"required": False},
             "capital": {"required": False},
             "population": {"required": False},
-            "visitors": {"required": False},
         }
@@ -0,0 +1,96 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from travels.badges import invalidate_badge_catalogue
+from travels.geo import invalidate_town_index
+from travels.managers import parse_coordinate
+from travels.models import Badge, Group, Town
+from travels.response_cache import BADGES, GROUPS, TOWNS, USERS, invalidate_responses
+from travels.search import invalidate_search_index
+from users.models import User
+
+
+@receiver(pre_save, sender=Town)
+def town_coordinates(sender, instance, **kwargs):
+    instance.real_latitude = parse_coordinate(instance.latitude)
+    instance.real_longitude = parse_coordinate(instance.longitude)
+
+
+@receiver(post_save, sender=Town)
+@receiver(post_delete, sender=Town)
+def town_index_invalidation(sender, **kwargs):
+    invalidate_town_index()
+    invalidate_search_index()
+    invalidate_responses(TOWNS)
+
+
+@receiver(post_save, sender=Badge)
+@receiver(post_delete, sender=Badge)
+def badge_catalogue_invalidation(sender, **kwargs):
+    invalidate_badge_catalogue()
+    invalidate_responses(BADGES)
+
+
+@receiver(post_save, sender=User)
+def podium_score_update(sender, instance, created, **kwargs):
+    if not created:
+        Group.objects.refresh_podiums_for(instance)
+
+
+@receiver(m2m_changed, sender=Group.members.through)
+def podium_membership_update(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        Group.objects.refresh_podiums([instance.pk])
+    elif action == "post_clear":
+        # the user has left every group, only podiums they were on change
+        Group.objects.refresh_podiums_for(instance)
+    else:
+        Group.objects.refresh_podiums(pk_set)
+
+
+@receiver(pre_delete, sender=User)
+def podium_departure(sender, instance, **kwargs):
+    instance._podium_group_ids = list(
+        instance.groups_joined.values_list("id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=User)
+def podium_departure_update(sender, instance, **kwargs):
+    if getattr(instance, "_podium_group_ids", None):
+        Group.objects.refresh_podiums(instance._podium_group_ids)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_response_invalidation(sender, **kwargs):
+    # users show the ids of the groups they own and are on the podium of
+    invalidate_responses(GROUPS, USERS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(m2m_changed, sender=Town.visitors.through)
+def user_response_invalidation(sender, action=None, **kwargs):
+    if action in (None, "post_add", "post_remove", "post_clear"):
+        invalidate_responses(USERS)
+
+
+@receiver(m2m_changed, sender=Badge.users.through)
+def badge_holder_response_invalidation(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_responses(BADGES, USERS)
+
+
+@receiver(m2m_changed, sender=Group.members.through)
+@receiver(m2m_changed, sender=Group.requests.through)
+def group_member_response_invalidation(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_responses(GROUPS, USERS)
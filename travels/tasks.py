@@ -0,0 +1,71 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from travels.utils import recalculate_platform_badges
+
+logger = logging.getLogger(__name__)
+
+
+class Debouncer:
+    """
+    Runs `func` on a background thread `window` seconds after it is first
+    requested. Requests arriving while a run is pending are folded into it.
+    """
+
+    def __init__(self, func, window):
+        self.func = func
+        self.window = window
+        self._lock = threading.Lock()
+        self._running = threading.Lock()
+        self._timer = None
+
+    def __call__(self):
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self._run)
+                self._timer.daemon = True
+                self._timer.start()
+
+    @property
+    def pending(self):
+        return self._timer is not None
+
+    def flush(self):
+        """Runs a pending call immediately on the current thread."""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer:
+            timer.cancel()
+            self._execute()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self._execute()
+        finally:
+            connections.close_all()
+
+    def _execute(self):
+        with self._running:
+            try:
+                self.func()
+            except Exception:
+                logger.exception("Background %s failed", self.func.__name__)
+
+
+platform_recalculation = Debouncer(
+    recalculate_platform_badges,
+    getattr(settings, "PLATFORM_BADGES_DEBOUNCE_SECONDS", 5),
+)
+
+
+def schedule_platform_recalculation() -> None:
+    mode = getattr(settings, "PLATFORM_BADGES_MODE", "async")
+    if mode == "sync":
+        recalculate_platform_badges()
+    elif mode == "async":
+        transaction.on_commit(platform_recalculation)
@@ -1,5 +1,6 @@
 import factory
 
+from travels.badges import reload_badge_catalogue
 from travels.constants import REGISTERED_COUNTRIES, CONTINENTS
 from travels.models import Town, Badge
 
@@ -31,3 +32,9 @@ class BadgeFactory(factory.django.DjangoModelFactory):
     name = factory.Faker("name")
     description = factory.Faker("text")
     image = factory.Faker("url")
+
+    @classmethod
+    def _after_postgeneration(cls, instance, create, results=None):
+        # test transactions never commit, so the save signal reloads nothing
+        if create:
+            reload_badge_catalogue()
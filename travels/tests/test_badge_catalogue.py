@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from travels.badges import VERSION_KEY, BadgeCatalogue, get_badge_catalogue
+from travels.models import Badge, Town
+from travels.tests.test_badge_filtering import SetBadgeData
+
+
+class TestBadgeCatalogue(SetBadgeData):
+    def test_lookups_by_name_and_id(self):
+        badges = [
+            Badge(id=1, name="Peru"),
+            Badge(id=2, name="Peru"),
+            Badge(id=3, name="Chile"),
+        ]
+        catalogue = BadgeCatalogue(badges)
+
+        self.assertEqual(catalogue.ids_named(["Peru", "Narnia"]), {1, 2})
+        self.assertEqual(catalogue.existing([3, 4]), {3})
+        self.assertEqual(catalogue.by_id[3].name, "Chile")
+
+    def test_evaluation_reads_only_the_towns(self):
+        towns = Town.objects.filter(id__in=[self.london.id, self.tokyo.id])
+        get_badge_catalogue()
+
+        with self.assertNumQueries(1):
+            badge_ids = Badge.objects.get_qualifying_badge_ids(towns=towns)
+
+        self.assertIn(Badge.objects.get(name="Japan").id, badge_ids)
+
+    def test_reloads_when_another_worker_bumps_the_version(self):
+        get_badge_catalogue()
+        Badge.objects.filter(name="Japan").update(name="Nippon")
+
+        clock = [10**9, 10**9 + 5]
+        with mock.patch("travels.badges.time.monotonic", side_effect=clock):
+            self.assertNotIn("Nippon", get_badge_catalogue().ids_by_name)
+            caches["versions"].set(VERSION_KEY, "bumped elsewhere")
+            self.assertIn("Nippon", get_badge_catalogue().ids_by_name)
+
+
+class TestBadgeCatalogueCommit(TransactionTestCase):
+    def test_saving_a_badge_reloads_the_catalogue(self):
+        get_badge_catalogue()
+        badge = Badge.objects.create(name="Atlantis")
+
+        self.assertEqual(get_badge_catalogue().ids_named(["Atlantis"]), {badge.id})
+
+        badge.delete()
+        self.assertEqual(get_badge_catalogue().ids_named(["Atlantis"]), set())
+
+    def test_version_is_only_bumped_once_the_change_commits(self):
+        get_badge_catalogue()
+        version = caches["versions"].get(VERSION_KEY)
+
+        with transaction.atomic():
+            Badge.objects.create(name="Atlantis")
+            self.assertEqual(caches["versions"].get(VERSION_KEY), version)
+            self.assertNotIn("Atlantis", get_badge_catalogue().ids_by_name)
+
+        self.assertNotEqual(caches["versions"].get(VERSION_KEY), version)
+        self.assertIn("Atlantis", get_badge_catalogue().ids_by_name)
+
+    def test_rolled_back_badges_are_never_loaded(self):
+        get_badge_catalogue()
+        version = caches["versions"].get(VERSION_KEY)
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Badge.objects.create(name="Atlantis")
+                get_badge_catalogue()
+                raise RuntimeError
+
+        self.assertEqual(caches["versions"].get(VERSION_KEY), version)
+        self.assertNotIn("Atlantis", get_badge_catalogue().ids_by_name)
@@ -0,0 +1,107 @@
+from django.db.models import Q
+
+from travels.badges import get_badge_catalogue
+from travels.constants import CITY_VISIT_BADGES, COUNTRY_VISIT_BADGES
+from travels.managers import Travel
+from travels.models import Badge, Town
+from travels.tests.factories import TownFactory
+from travels.tests.test_badge_filtering import SetBadgeData
+from users.tests.factories import UserFactory
+
+
+def legacy_special_targets(travels):
+    checks = [
+        travels.is_viking,
+        travels.follows_columbus,
+        travels.kerouac_inspired,
+        travels.stan,
+        travels.reached_north_reaches,
+        travels.includes_equatorial_region,
+    ]
+    return Q(id__in=[208 + i for i, passed in enumerate(checks) if passed])
+
+
+def legacy_qualifying_badge_ids(towns):
+    """The original query-per-rule evaluation, kept as the reference result."""
+    travels = Travel(towns)
+    queries = Q(
+        name__in=list(towns.values_list("country", flat=True).distinct())
+        + list(towns.values_list("continent", flat=True).distinct())
+    ) | Q(
+        id__in=[
+            b
+            for count, b in COUNTRY_VISIT_BADGES.items()
+            if towns.values_list("country", flat=True).distinct().count() >= int(count)
+        ]
+        + [b for count, b in CITY_VISIT_BADGES.items() if towns.count() >= int(count)]
+    )
+    return set(
+        Badge.objects.filter(queries | legacy_special_targets(travels)).values_list(
+            "id", flat=True
+        )
+    )
+
+
+class TestBadgeEngineEquivalence(SetBadgeData):
+    def assertSameBadges(self, towns):
+        engine_ids = set(
+            Badge.objects.get_qualifying_badges(towns=towns).values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(engine_ids, legacy_qualifying_badge_ids(towns))
+
+    def test_no_towns(self):
+        self.assertSameBadges(Town.objects.none())
+
+    def test_each_seeded_town(self):
+        for town in Town.objects.all():
+            with self.subTest(town.name):
+                self.assertSameBadges(Town.objects.filter(id=town.id))
+
+    def test_special_targets(self):
+        scenarios = {
+            "viking": [
+                TownFactory(country="Iceland"),
+                TownFactory(country="United Kingdom"),
+            ],
+            "half viking": [TownFactory(country="Sweden")],
+            "columbus": [
+                TownFactory(country="Spain"),
+                TownFactory(country="Portugal"),
+                TownFactory(continent="South America"),
+            ],
+            "kerouac": TownFactory.create_batch(6, country="United States"),
+            "almost kerouac": TownFactory.create_batch(5, country="United States"),
+            "stan": [TownFactory(country="Kazakhstan")],
+            "arctic": [TownFactory(latitude="66,5")],
+            "equator": [TownFactory(latitude="-0,75"), TownFactory(latitude="1")],
+            "tropics": [TownFactory(latitude="1.5"), TownFactory(latitude="65.99")],
+        }
+        for name, towns in scenarios.items():
+            with self.subTest(name):
+                self.assertSameBadges(
+                    Town.objects.filter(id__in=[town.id for town in towns])
+                )
+
+    def test_visit_count_thresholds(self):
+        towns = TownFactory.create_batch(210, latitude="30")
+        for size in [4, 5, 9, 10, 49, 50, 99, 100, 150, 199, 200, 210]:
+            with self.subTest(f"{size} towns"):
+                self.assertSameBadges(
+                    Town.objects.filter(id__in=[town.id for town in towns[:size]])
+                )
+
+    def test_related_manager_towns(self):
+        user = UserFactory()
+        user.towns.add(*TownFactory.create_batch(12), self.london, self.tokyo)
+
+        self.assertSameBadges(user.towns)
+
+    def test_facts_are_loaded_in_a_single_query(self):
+        towns = Town.objects.filter(
+            id__in=[town.id for town in TownFactory.create_batch(60)]
+        )
+        get_badge_catalogue()
+        with self.assertNumQueries(2):
+            list(Badge.objects.get_qualifying_badges(towns=towns))
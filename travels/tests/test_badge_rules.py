@@ -0,0 +1,52 @@
+from travels.badges import get_badge_catalogue
+from travels.models import Badge, Town
+from travels.rules import SPECIAL_BADGE_RULES, BadgeRule, Predicate
+from travels.tests.factories import BadgeFactory, TownFactory
+from travels.tests.test_badge_filtering import SetBadgeData
+
+
+class TestBadgeRuleRegistry(SetBadgeData):
+    def qualifying_ids(self, towns, rules=SPECIAL_BADGE_RULES):
+        town_queryset = Town.objects.filter(id__in=[town.id for town in towns])
+        return set(
+            Badge.objects.get_qualifying_badges(
+                towns=town_queryset, rules=rules
+            ).values_list("id", flat=True)
+        )
+
+    def test_per_country_count_must_be_reached(self):
+        towns = TownFactory.create_batch(5, country="United States")
+        self.assertNotIn(210, self.qualifying_ids(towns))
+
+        towns.append(TownFactory(country="United States"))
+        self.assertIn(210, self.qualifying_ids(towns))
+
+    def test_every_predicate_must_hold(self):
+        self.assertNotIn(209, self.qualifying_ids([TownFactory(country="Spain")]))
+
+    def test_latitude_band_accepts_comma_decimals(self):
+        self.assertIn(212, self.qualifying_ids([TownFactory(latitude="70,1")]))
+
+    def test_new_rules_do_not_add_queries(self):
+        badges = BadgeFactory.create_batch(40)
+        rules = SPECIAL_BADGE_RULES + tuple(
+            BadgeRule(
+                badge.id,
+                badge.name,
+                (
+                    Predicate(continents=("Europe",), min_count=i % 3 + 1),
+                    Predicate(latitude_band=(-90, i)),
+                ),
+            )
+            for i, badge in enumerate(badges)
+        )
+        towns = Town.objects.filter(id__in=[self.london.id, self.paris.id])
+
+        get_badge_catalogue()
+        with self.assertNumQueries(2):
+            earned = list(Badge.objects.get_qualifying_badges(towns=towns, rules=rules))
+
+        earned_ids = {badge.id for badge in earned}
+        self.assertIn(badges[24].id, earned_ids)
+        self.assertNotIn(badges[21].id, earned_ids)
+        self.assertNotIn(badges[26].id, earned_ids)
@@ -0,0 +1,63 @@
+import gzip
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from travels.tests.factories import TownFactory
+
+
+class TestTownCatalogue(APITestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(FRONTEND_DIST_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.towns = TownFactory.create_batch(5)
+
+    def export(self):
+        call_command("export_town_catalogue", stdout=StringIO())
+        return self.client.get(reverse("towns-v1-catalogue")).data
+
+    def test_snapshot_is_columnar_and_compressed(self):
+        catalogue = self.export()
+
+        response = self.client.get(
+            catalogue["url"], HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+        content = json.loads(gzip.decompress(b"".join(response)))
+
+        self.assertEqual(catalogue["count"], 5)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(content["columns"]["id"], [town.id for town in self.towns])
+
+    def test_uncompressed_snapshot_and_conditional_requests(self):
+        catalogue = self.export()
+
+        response = self.client.get(catalogue["url"])
+        cached = self.client.get(catalogue["url"], HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(json.loads(response.content)["count"], 5)
+        self.assertEqual(cached.status_code, 304)
+
+    def test_version_follows_content(self):
+        first = self.export()["version"]
+        self.assertEqual(self.export()["version"], first)
+
+        TownFactory()
+
+        self.assertNotEqual(self.export()["version"], first)
+
+    def test_no_snapshot_exported(self):
+        response = self.client.get(reverse("towns-v1-catalogue"))
+
+        self.assertEqual(response.status_code, 404)
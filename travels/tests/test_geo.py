@@ -0,0 +1,115 @@
+import math
+import random
+from unittest import mock
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+from django.test import SimpleTestCase
+
+from travels.geo import TownIndex, get_town_index
+from travels.tests.factories import TownFactory
+
+
+def great_circle(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    chord = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * 6371.0088 * math.asin(math.sqrt(chord))
+
+
+class TestTownIndex(SimpleTestCase):
+    def setUp(self) -> None:
+        rng = random.Random(7)
+        self.rows = [
+            (i, rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(2000)
+        ]
+        self.index = TownIndex(self.rows)
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(11)
+        points = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(50)]
+        points += [(89.9, 10), (-89.9, -10), (0, 179.99), (0, -179.99)]
+        for latitude, longitude in points:
+            with self.subTest(f"{latitude}, {longitude}"):
+                expected = sorted(
+                    self.rows,
+                    key=lambda row: great_circle(latitude, longitude, row[1], row[2]),
+                )[:5]
+                result = self.index.nearest(latitude, longitude, k=5)
+
+                self.assertEqual(
+                    [town_id for town_id, _ in result], [row[0] for row in expected]
+                )
+                self.assertAlmostEqual(
+                    result[0][1],
+                    great_circle(latitude, longitude, expected[0][1], expected[0][2]),
+                    places=3,
+                )
+
+    def test_k_larger_than_index(self):
+        index = TownIndex([(1, 0, 0), (2, 1, 1), (3, None, None)])
+
+        self.assertEqual([town_id for town_id, _ in index.nearest(0, 0, k=10)], [1, 2])
+        self.assertEqual(TownIndex().nearest(0, 0), [])
+
+    def test_reverse_geocode_respects_max_distance(self):
+        index = TownIndex([(1, 51.5, -0.13)])
+
+        self.assertEqual(index.reverse_geocode(51.6, -0.1), 1)
+        self.assertIsNone(index.reverse_geocode(48.8, 2.35))
+
+
+class TestNearestTownRoutes(APITestCase):
+    def setUp(self) -> None:
+        self.london = TownFactory(
+            name="London", latitude="51.5072", longitude="-0.1275"
+        )
+        self.paris = TownFactory(name="Paris", latitude="48.8566", longitude="2.3522")
+
+    def test_nearest_towns(self):
+        response = self.client.get(
+            reverse("towns-v1-nearest"), {"near": "49,2", "k": 2}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([town["name"] for town in response.data], ["Paris", "London"])
+
+    def test_reverse_geocode(self):
+        response = self.client.get(reverse("towns-v1-reverse"), {"near": "51.52,-0.1"})
+        missing = self.client.get(reverse("towns-v1-reverse"), {"near": "0,0"})
+
+        self.assertEqual(response.data["name"], "London")
+        self.assertEqual(missing.status_code, 404)
+
+    def test_index_is_rebuilt_when_towns_change(self):
+        index = get_town_index()
+        TownFactory(name="Calais", latitude="50.95", longitude="1.85")
+
+        self.assertIsNot(get_town_index(), index)
+        response = self.client.get(reverse("towns-v1-reverse"), {"near": "50.9,1.8"})
+        self.assertEqual(response.data["name"], "Calais")
+
+    def test_towns_deleted_by_another_worker_are_skipped(self):
+        # this worker's index, built before the delete it never heard of
+        index = get_town_index()
+        self.london.delete()
+
+        with mock.patch("travels.views.get_town_index", return_value=index):
+            nearest = self.client.get(
+                reverse("towns-v1-nearest"), {"near": "49,2", "k": 2}
+            )
+            missing = self.client.get(
+                reverse("towns-v1-reverse"), {"near": "51.52,-0.1"}
+            )
+
+        self.assertEqual([town["name"] for town in nearest.data], ["Paris"])
+        self.assertEqual(missing.status_code, 404)
+
+    def test_invalid_k_is_rejected(self):
+        response = self.client.get(
+            reverse("towns-v1-nearest"), {"near": "0,0", "k": "x"}
+        )
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from travels.models import Group
+from users.models import User
+from users.tests.factories import UserFactory
+
+
+class TestGroupPodiums(APITestCase):
+    def setUp(self) -> None:
+        self.users = UserFactory.create_batch(5)
+        for user, score in zip(self.users, (40, 90, 10, 90, 60)):
+            User.objects.filter(pk=user.pk).update(score=score)
+            user.score = score
+        self.group = Group.objects.create(
+            name="Ramblers", description="walks", owner=self.users[0]
+        )
+
+    def podium(self, group=None):
+        group = group or self.group
+        group.refresh_from_db()
+        return [
+            (
+                getattr(group, f"podium_{place}_user_id"),
+                getattr(group, f"podium_{place}_score"),
+            )
+            for place in (1, 2, 3)
+        ]
+
+    def test_membership_changes_rank_members_by_score(self):
+        self.group.members.add(*self.users)
+
+        # ties go to the earliest user
+        self.assertEqual(
+            self.podium(),
+            [(self.users[1].id, 90), (self.users[3].id, 90), (self.users[4].id, 60)],
+        )
+
+        self.group.members.remove(self.users[1])
+        self.assertEqual(self.podium()[2], (self.users[0].id, 40))
+
+    def test_small_groups_leave_places_empty(self):
+        self.users[2].groups_joined.add(self.group)
+
+        self.assertEqual(
+            self.podium(), [(self.users[2].id, 10), (None, None), (None, None)]
+        )
+
+    def test_score_changes_move_members_on_and_off_the_podium(self):
+        self.group.members.add(*self.users)
+
+        self.users[2].score = 100
+        self.users[2].save()
+        self.assertEqual(self.podium()[0], (self.users[2].id, 100))
+
+        self.users[2].score = 0
+        self.users[2].save()
+        self.assertNotIn(self.users[2].id, [user_id for user_id, _ in self.podium()])
+
+    def test_saves_below_the_podium_do_not_rank_the_group(self):
+        self.group.members.add(*self.users)
+
+        self.users[2].score = 11
+
+        with self.assertNumQueries(1):
+            Group.objects.refresh_podiums_for(self.users[2])
+
+    def test_refresh_is_one_windowed_query_and_one_update(self):
+        self.group.members.add(*self.users)
+        Group.objects.filter(pk=self.group.pk).update(
+            podium_1_user=None, podium_1_score=None
+        )
+
+        with self.assertNumQueries(3):
+            changed = Group.objects.refresh_podiums([self.group.pk])
+
+        self.assertEqual(changed, 1)
+        self.assertEqual(self.podium()[0], (self.users[1].id, 90))
+
+    def test_batch_refresh_covers_every_group(self):
+        other = Group.objects.create(
+            name="Sailors", description="-", owner=self.users[0]
+        )
+        self.group.members.add(*self.users[:2])
+        other.members.add(*self.users[2:])
+        Group.objects.update(podium_1_user=None, podium_1_score=None)
+
+        call_command("refresh_group_podiums", stdout=StringIO())
+
+        self.assertEqual(self.podium()[0], (self.users[1].id, 90))
+        self.assertEqual(self.podium(other)[0], (self.users[3].id, 90))
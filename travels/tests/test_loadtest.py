@@ -0,0 +1,36 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import LiveServerTestCase
+
+from users.models import User
+
+
+class TestLoadTestCommand(LiveServerTestCase):
+    def test_routes_are_loaded_and_the_user_removed(self):
+        output = os.path.join(tempfile.mkdtemp(), "loadtest.json")
+        stdout = StringIO()
+
+        call_command(
+            "loadtest",
+            url=self.live_server_url,
+            duration=0.2,
+            concurrency=2,
+            route=["/api/badges/", "/api/profile"],
+            output=output,
+            stdout=stdout,
+        )
+
+        with open(output) as file:
+            results = json.load(file)
+        self.assertEqual(
+            [result["path"] for result in results], ["/api/badges/", "/api/profile"]
+        )
+        for result in results:
+            self.assertGreater(result["requests"], 0)
+            self.assertEqual(result["failures"], {})
+        self.assertIn("req/s", stdout.getvalue())
+        self.assertFalse(User.objects.filter(username="loadtest").exists())
@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from rest_framework.reverse import reverse
+
+from travels.models import Group
+from travels.response_cache import GROUPS, cache_metrics, generations, response_cache
+from travels.tests.test_views import BaseTownData
+from users.tests.factories import UserFactory
+
+
+class TestResponseCache(BaseTownData):
+    def setUp(self) -> None:
+        response_cache().clear()
+        cache_metrics.reset()
+        super().setUp()
+        self.group = Group.objects.create(
+            name="Ramblers", description="walks", owner=self.first_user
+        )
+
+    def get_twice(self, client, url):
+        first = client.get(url)
+        with self.assertNumQueries(0):
+            second = client.get(url)
+        return first, second
+
+    def test_repeated_requests_are_served_from_the_cache(self):
+        first, second = self.get_twice(self.client, reverse("towns-v1-list"))
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(
+            cache_metrics.snapshot()["TownViewSet.list"], {"hits": 1, "misses": 1}
+        )
+
+    def test_query_string_and_auth_scope_are_part_of_the_key(self):
+        url = reverse("towns-v1-list")
+        self.client.get(url)
+
+        self.assertEqual(self.client.get(f"{url}?limit=1")["X-Cache"], "MISS")
+        self.assertEqual(self.auth_client.get(url)["X-Cache"], "MISS")
+
+    def test_saving_a_town_invalidates_town_responses(self):
+        url = reverse("towns-v1-detail", [self.uk_towns[0].id])
+        self.client.get(url)
+        self.uk_towns[0].name = "Renamed"
+        self.uk_towns[0].save()
+
+        response = self.client.get(url)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["name"], "Renamed")
+
+    def test_visits_only_invalidate_visitor_counts(self):
+        url = reverse("towns-v1-list")
+        self.client.get(url)
+        self.client.get(f"{url}?visitor_count=true")
+
+        self.first_user.add_visits(self.uk_towns[0])
+
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+        counted = self.client.get(f"{url}?visitor_count=true")
+        self.assertEqual(counted["X-Cache"], "MISS")
+        self.assertIn(1, [town["visitor_count"] for town in counted.data["results"]])
+
+    def test_awarding_a_badge_invalidates_badge_responses(self):
+        url = reverse("badges-v1-detail", [self.random_badges[0].id])
+        self.auth_client.get(url)
+
+        self.random_badges[0].users.add(self.users[1])
+
+        response = self.auth_client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["users"][0]["id"], self.users[1].id)
+
+    def test_membership_requests_invalidate_group_responses(self):
+        url = f"/api/groups/{self.group.id}/"
+        self.auth_client.get(url)
+        self.auth_client.get("/api/groups/")
+
+        requester = self.client_class()
+        requester.force_authenticate(self.users[2])
+        requester.get(f"/api/groups/{self.group.id}/membership/")
+
+        response = self.auth_client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["requests"][0]["id"], self.users[2].id)
+        self.assertEqual(self.auth_client.get("/api/groups/")["X-Cache"], "MISS")
+
+    def test_unauthorised_requests_are_not_cached(self):
+        self.client.get(reverse("badges-v1-list"))
+
+        self.assertEqual(self.client.get(reverse("badges-v1-list")).status_code, 401)
+        self.assertEqual(cache_metrics.snapshot(), {})
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_a_zero_timeout_disables_the_cache(self):
+        self.client.get(reverse("towns-v1-list"))
+
+        self.assertNotIn("X-Cache", self.client.get(reverse("towns-v1-list")))
+
+
+class TestInvalidationCommit(TransactionTestCase):
+    def test_generation_is_replaced_again_once_the_change_commits(self):
+        owner = UserFactory()
+        with transaction.atomic():
+            Group.objects.create(name="Ramblers", description="walks", owner=owner)
+            # what a request served before the commit would have cached under
+            generation = generations([GROUPS])
+
+        self.assertNotEqual(generations([GROUPS]), generation)
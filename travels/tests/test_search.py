@@ -0,0 +1,72 @@
+from django.test import SimpleTestCase
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from travels.search import TownSearchIndex
+from travels.tests.factories import TownFactory
+
+
+def town_row(town_id, name, name_ascii=None, capital=None, population=0):
+    return (town_id, name, name_ascii or name, "Country", "Region", capital, population)
+
+
+class TestTownSearchIndex(SimpleTestCase):
+    def setUp(self) -> None:
+        self.index = TownSearchIndex(
+            [
+                town_row(1, "Lisbon", capital="primary", population=500_000),
+                town_row(2, "Lisburn", population=45_000),
+                town_row(3, "Lisieux", population=20_000),
+                town_row(4, "São Paulo", "Sao Paulo", population=12_000_000),
+                town_row(5, "Zürich", "Zurich", population=400_000),
+                town_row(6, "Lis", population=10),
+                town_row(7, "﻿Tokyo", capital="primary", population=35_000_000),
+            ]
+        )
+
+    def ids(self, query, limit=10):
+        return [town["id"] for town in self.index.search(query, limit)]
+
+    def test_prefix_ranked_by_exact_match_capital_then_population(self):
+        self.assertEqual(self.ids("Lis"), [6, 1, 2, 3])
+        self.assertEqual(self.ids("lisb"), [1, 2])
+
+    def test_accent_insensitive_in_both_directions(self):
+        self.assertEqual(self.ids("sao p"), [4])
+        self.assertEqual(self.ids("SÃO"), [4])
+        self.assertEqual(self.ids("zür"), [5])
+
+    def test_byte_order_marks_are_ignored(self):
+        self.assertEqual(self.index.search("tok")[0]["name"], "Tokyo")
+
+    def test_limit_and_empty_queries(self):
+        self.assertEqual(self.ids("l", limit=2), [1, 2])
+        self.assertEqual(self.ids("   "), [])
+        self.assertEqual(self.ids("xyz"), [])
+
+    def test_short_prefix_cache_is_bounded(self):
+        self.index.cache_size = 2
+        for query in ["li", "l", "li", "ts", "to", "zz", "xy"]:
+            self.ids(query, limit=1)
+
+        # one entry per prefix whatever the limit, none for empty results
+        self.assertEqual(list(self.index._cache), ["li", "to"])
+        self.assertEqual(self.ids("li", limit=3), [1, 2, 3])
+
+
+class TestTownSearchRoute(APITestCase):
+    def test_search_route(self):
+        TownFactory(name="Lisbon", name_ascii="Lisbon", capital="primary")
+        TownFactory(name="Madrid", name_ascii="Madrid")
+
+        response = self.client.get(reverse("towns-v1-search"), {"q": "lis"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([town["name"] for town in response.data], ["Lisbon"])
+
+    def test_invalid_limit(self):
+        response = self.client.get(
+            reverse("towns-v1-search"), {"q": "lis", "limit": 500}
+        )
+
+        self.assertEqual(response.status_code, 400)
@@ -1,6 +1,10 @@
+import math
+
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase
 
+from travels.managers import EARTH_RADIUS_KM, haversine
+from travels.models import Group, Town
 from travels.tests.factories import TownFactory, BadgeFactory
 from users.tests.factories import UserFactory
 
@@ -31,7 +35,9 @@ class TestTownsRoute(BaseTownData):
         returned_data = response.data
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(set(res['id'] for res in returned_data.get("results")), created_town_ids)
+        self.assertEqual(
+            set(res["id"] for res in returned_data.get("results")), created_town_ids
+        )
 
     def test_other_methods_not_allowed(self):
         other_methods = ("post", "put", "patch", "delete")
@@ -54,12 +60,16 @@ class TestBadgesRoute(BaseTownData):
         returned_data = response.data
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(set(res['id'] for res in returned_data.get("results")), created_badge_ids)
+        self.assertEqual(
+            set(res["id"] for res in returned_data.get("results")), created_badge_ids
+        )
 
     def test_retrieve_single_badge_from_get_route(self):
         query_id = self.random_badges[0].id
 
-        response = self.auth_client.get(reverse("badges-v1-detail", kwargs={'pk': query_id}))
+        response = self.auth_client.get(
+            reverse("badges-v1-detail", kwargs={"pk": query_id})
+        )
         returned_data = response.data
 
         self.assertEqual(response.status_code, 200)
@@ -71,3 +81,170 @@ class TestBadgesRoute(BaseTownData):
             with self.subTest(f"making a {method} request"):
                 response = getattr(self.auth_client, method)(reverse("badges-v1-list"))
                 self.assertEqual(response.status_code, 405)
+
+
+class TestTownSpatialLookups(APITestCase):
+    def setUp(self) -> None:
+        self.london = TownFactory(
+            name="London", latitude="51,5072", longitude="-0,1275"
+        )
+        self.paris = TownFactory(name="Paris", latitude="48.8566", longitude="2.3522")
+        self.suva = TownFactory(name="Suva", latitude="-18.1416", longitude="178.4419")
+        self.apia = TownFactory(name="Apia", latitude="-13.8333", longitude="-171.75")
+
+    def returned_names(self, params):
+        response = self.client.get(reverse("towns-v1-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return [town["name"] for town in response.data["results"]]
+
+    def test_coordinates_are_stored_as_numbers(self):
+        self.assertEqual(Town.objects.get(pk=self.london.pk).real_latitude, 51.5072)
+
+    def test_bounding_box(self):
+        self.assertEqual(self.returned_names({"bbox": "50,-1,52,1"}), ["London"])
+
+    def test_bounding_box_across_antimeridian(self):
+        names = self.returned_names({"bbox": "-20,170,-10,-170"})
+
+        self.assertEqual(set(names), {"Suva", "Apia"})
+
+    def test_radius_orders_by_distance(self):
+        response = self.client.get(
+            reverse("towns-v1-list"), {"near": "50.8,1.6", "radius": 300}
+        )
+        results = response.data["results"]
+
+        self.assertEqual([town["name"] for town in results], ["London", "Paris"])
+        self.assertAlmostEqual(results[0]["distance"], 146, delta=3)
+
+    def test_radius_across_antimeridian(self):
+        names = self.returned_names({"near": "-16,179.9", "radius": 1500})
+
+        self.assertEqual(names, ["Suva", "Apia"])
+
+    def test_distance_to_an_antipode(self):
+        town = Town.objects.get(name="London")
+        antipode = haversine(-town.real_latitude, town.real_longitude + 180)
+
+        distance = Town.objects.annotate(distance=antipode).get(pk=town.pk).distance
+
+        self.assertAlmostEqual(distance, math.pi * EARTH_RADIUS_KM, delta=1)
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in [
+            {"bbox": "1,2,3"},
+            {"bbox": "a,b,c,d"},
+            {"near": "91,0"},
+            {"near": "nan,0"},
+            {"near": "0,inf"},
+            {"near": "0,0", "radius": "-5"},
+        ]:
+            with self.subTest(params):
+                response = self.client.get(reverse("towns-v1-list"), params)
+                self.assertEqual(response.status_code, 400)
+
+
+class TestTownVisitors(BaseTownData):
+    def setUp(self) -> None:
+        super().setUp()
+        self.town = self.uk_towns[0]
+        self.town.visitors.add(*self.users)
+
+    def test_town_list_leaves_out_visitors(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("towns-v1-list"))
+
+        self.assertNotIn("visitors", response.data["results"][0])
+        self.assertNotIn("visitor_count", response.data["results"][0])
+
+    def test_visitor_count_on_request(self):
+        response = self.client.get(reverse("towns-v1-list"), {"visitor_count": "true"})
+
+        counts = {
+            town["id"]: town["visitor_count"] for town in response.data["results"]
+        }
+        self.assertEqual(counts[self.town.id], 3)
+        self.assertEqual(counts[self.uk_towns[1].id], 0)
+
+    def test_distinct_visitors_by_country(self):
+        Town.objects.filter(pk__in=[town.pk for town in self.uk_towns]).update(
+            iso2="GB"
+        )
+        self.uk_towns[1].visitors.add(self.first_user)
+        TownFactory(iso2="ZZ").visitors.add(self.first_user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("towns-v1-countries"))
+
+        self.assertEqual(response.data, {"GB": 3, "ZZ": 1})
+
+    def test_visitors_are_paginated(self):
+        response = self.client.get(
+            reverse("towns-v1-visitors", kwargs={"pk": self.town.id}), {"limit": 2}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(
+            [user["id"] for user in response.data["results"]],
+            [user.id for user in self.users[:2]],
+        )
+
+    def test_visitors_of_unknown_town(self):
+        response = self.client.get(reverse("towns-v1-visitors", kwargs={"pk": 0}))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class TestGroupDirectory(BaseTownData):
+    def setUp(self) -> None:
+        super().setUp()
+        for name in ("Walkers", "Sailors", "Cyclists", "Sail club"):
+            group = Group.objects.create(
+                name=name, description="-", owner=self.first_user
+            )
+            group.members.add(*self.users)
+            group.requests.add(self.users[1])
+
+    def test_unauthenticated_cannot_browse_groups(self):
+        self.assertEqual(self.client.get("/api/groups/").status_code, 401)
+
+    def test_groups_are_listed_with_counts_instead_of_users(self):
+        # the session, the user and one query for the page with its counts
+        with self.assertNumQueries(3):
+            response = self.auth_client.get("/api/groups/")
+
+        self.assertEqual(
+            [group["name"] for group in response.data["results"]],
+            ["Cyclists", "Sail club", "Sailors", "Walkers"],
+        )
+        group = response.data["results"][0]
+        self.assertEqual(group["member_count"], 3)
+        self.assertEqual(group["request_count"], 1)
+        self.assertEqual(group["owner"], self.first_user.id)
+        self.assertNotIn("members", group)
+
+    def test_cursor_pagination(self):
+        first = self.auth_client.get("/api/groups/", {"page_size": 3})
+        second = self.auth_client.get(first.data["next"])
+
+        self.assertEqual(len(first.data["results"]), 3)
+        self.assertEqual(
+            [group["name"] for group in second.data["results"]], ["Walkers"]
+        )
+        self.assertIsNone(second.data["next"])
+
+    def test_search_by_name(self):
+        response = self.auth_client.get("/api/groups/", {"search": "sail"})
+
+        self.assertEqual(
+            [group["name"] for group in response.data["results"]],
+            ["Sail club", "Sailors"],
+        )
+
+    def test_individual_group_keeps_the_populated_users(self):
+        group = Group.objects.get(name="Walkers")
+        response = self.auth_client.get(f"/api/groups/{group.id}/")
+
+        self.assertEqual(len(response.data["members"]), 3)
+        self.assertEqual(response.data["owner"]["id"], self.first_user.id)
@@ -1,25 +1,51 @@
-from travels.constants import MOST_AWARDS_ID, MOST_CAPITALS_VISITED_ID, MOST_CITIES_VISITED_ID, \
-    MOST_COUNTRIES_VISITED_ID
+from travels.constants import (
+    MOST_AWARDS_ID,
+    MOST_CAPITALS_VISITED_ID,
+    MOST_CITIES_VISITED_ID,
+    MOST_COUNTRIES_VISITED_ID,
+)
+from travels.badges import get_badge_catalogue
 from travels.models import Badge
 from users.models import User
 
 
 def recalculate_platform_badges() -> None:
-    def assign_badge(badge_id, user, criteria):
-        award = Badge.objects.get(id=badge_id)
-        if user and (
-            not award.users.last()
-            or getattr(user, criteria) > getattr(award.users.last(), criteria)
-        ):
-            award.users.clear()
-            award.users.add(user)
-
-    special_scenarios = {
-        (MOST_COUNTRIES_VISITED_ID, User.travellers.get_leader_by_country(), "countries_visited"),
-        (MOST_CITIES_VISITED_ID, User.travellers.get_leader_by_city(), "visited_cities"),
-        (MOST_CAPITALS_VISITED_ID, User.travellers.get_leader_by_capital(), "visited_cities"),
+    special_scenarios = (
+        (
+            MOST_COUNTRIES_VISITED_ID,
+            User.travellers.get_leader_by_country(),
+            "countries_visited",
+        ),
+        (
+            MOST_CITIES_VISITED_ID,
+            User.travellers.get_leader_by_city(),
+            "visited_cities",
+        ),
+        (
+            MOST_CAPITALS_VISITED_ID,
+            User.travellers.get_leader_by_capital(),
+            "capitals_visited",
+        ),
         (MOST_AWARDS_ID, User.objects.get_leader_of_leaders(), "awards"),
-    }
+    )
+    badge_ids = [detail[0] for detail in special_scenarios]
+    awards = get_badge_catalogue().by_id
+
+    # ordered by user so the holder kept matches award.users.last()
+    holders = dict(
+        Badge.users.through.objects.filter(badge_id__in=badge_ids)
+        .order_by("user_id")
+        .values_list("badge_id", "user_id")
+    )
+
+    def assign_badge(badge_id, user, criteria):
+        award = awards.get(badge_id)
+        holder_id = holders.get(badge_id)
+        if not award or not user or holder_id == user.id:
+            return
+        holder = User.travellers.filter(pk=holder_id).first() if holder_id else None
+        if not holder or getattr(user, criteria) > (getattr(holder, criteria) or 0):
+            award.users.set([user])
 
     for detail in special_scenarios:
-        assign_badge(detail[0], detail[1], detail[2])
+        assign_badge(*detail)
@@ -1,32 +1,180 @@
-from rest_framework import viewsets
+import math
+
+from django.db.models import Count
+from rest_framework import generics, viewsets
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.filters import SearchFilter
 from rest_framework.status import (
     HTTP_201_CREATED,
     HTTP_422_UNPROCESSABLE_ENTITY,
     HTTP_204_NO_CONTENT,
     HTTP_401_UNAUTHORIZED,
     HTTP_202_ACCEPTED,
+    HTTP_404_NOT_FOUND,
 )
 from rest_framework.permissions import IsAuthenticated
 from users.models import User
 
+from .catalogue import current_catalogue
+from .geo import get_town_index
 from .models import Town, Badge, Trip, Group
+from .pagination import GroupDirectoryPagination
+from .response_cache import BADGES, GROUPS, TOWNS, USERS, cache_response
+from .search import get_search_index
 from .serializers import (
     TripSerializer,
     PopulatedGroupSerializer,
     GroupSerializer,
+    GroupDirectorySerializer,
     PopulatedBadgeSerializer,
     PopulatedTripSerializer,
     TownSerializer,
+    VisitorSerializer,
+    prefetch_lookups,
 )
 
 
+def counts_visitors(request):
+    return request.query_params.get("visitor_count") in ("1", "true")
+
+
+def town_cache_namespaces(request):
+    # visitor counts change with every visit, town rows almost never
+    if counts_visitors(request):
+        return TOWNS, USERS
+    return (TOWNS,)
+
+
 class TownViewSet(viewsets.ModelViewSet):
     serializer_class = TownSerializer
     queryset = Town.objects.all()
     http_method_names = ["get"]
 
+    # /towns?bbox=south,west,north,east
+    # /towns?near=lat,lng&radius=km (radius defaults to 50km)
+    # /towns?visitor_count=true adds the number of visitors to each town
+    def get_queryset(self):
+        params = self.request.query_params
+        towns = super().get_queryset()
+        if "bbox" in params:
+            south, west, north, east = self.parse_coordinates("bbox", 4)
+            towns = Town.objects.within_bounds(south, west, north, east)
+        elif "near" in params:
+            latitude, longitude = self.parse_coordinates("near", 2)
+            try:
+                radius = float(params.get("radius", 50))
+            except ValueError:
+                radius = -1
+            if not 0 < radius <= 20000:
+                raise ValidationError(
+                    {"radius": "Expected a distance in km up to 20000"}
+                )
+            towns = Town.objects.within_radius(latitude, longitude, radius)
+        if counts_visitors(self.request):
+            towns = towns.annotate(visitor_count=Count("visitors"))
+        return towns
+
+    @cache_response(town_cache_namespaces)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(town_cache_namespaces)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    # /towns/countries
+    @action(detail=False)
+    @cache_response((USERS,))
+    def countries(self, request):
+        return Response(Town.objects.visitors_by_country())
+
+    # /towns/pk/visitors
+    @action(detail=True)
+    def visitors(self, request, pk=None):
+        town = self.get_object()
+        page = self.paginate_queryset(town.visitors.order_by("id"))
+        return self.get_paginated_response(VisitorSerializer(page, many=True).data)
+
+    # /towns/nearest?near=lat,lng&k=5
+    @action(detail=False)
+    def nearest(self, request):
+        latitude, longitude = self.parse_coordinates("near", 2)
+        try:
+            k = int(request.query_params.get("k", 1))
+        except ValueError:
+            k = 0
+        if not 0 < k <= 100:
+            raise ValidationError({"k": "Expected a number of towns up to 100"})
+
+        distances = dict(get_town_index().nearest(latitude, longitude, k))
+        towns = Town.objects.in_bulk(list(distances))
+        # the index may still hold towns another worker has deleted
+        nearest = [town_id for town_id in distances if town_id in towns]
+        for town_id in nearest:
+            towns[town_id].distance = distances[town_id]
+        serializer = self.get_serializer(
+            [towns[town_id] for town_id in nearest], many=True
+        )
+        return Response(serializer.data)
+
+    # /towns/catalogue
+    @action(detail=False)
+    def catalogue(self, request):
+        manifest = current_catalogue()
+        if not manifest:
+            return Response(status=HTTP_404_NOT_FOUND)
+        return Response(
+            {
+                "version": manifest["version"],
+                "count": manifest["count"],
+                "url": f"/{manifest['filename']}",
+            }
+        )
+
+    # /towns/search?q=lis&limit=10
+    @action(detail=False)
+    def search(self, request):
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= 50:
+            raise ValidationError({"limit": "Expected a number of towns up to 50"})
+        return Response(
+            get_search_index().search(request.query_params.get("q", ""), limit)
+        )
+
+    # /towns/reverse?near=lat,lng
+    @action(detail=False, url_path="reverse", url_name="reverse")
+    def reverse_geocode(self, request):
+        latitude, longitude = self.parse_coordinates("near", 2)
+        town_id = get_town_index().reverse_geocode(latitude, longitude)
+        town = Town.objects.filter(pk=town_id).first() if town_id is not None else None
+        if town is None:
+            return Response(status=HTTP_404_NOT_FOUND)
+        return Response(self.get_serializer(town).data)
+
+    def parse_coordinates(self, param, count):
+        values = self.request.query_params.get(param, "").split(",")
+        try:
+            values = [float(value) for value in values]
+        except ValueError:
+            values = []
+        latitudes, longitudes = values[0::2], values[1::2]
+        if (
+            len(values) != count
+            or not all(math.isfinite(value) for value in values)
+            or any(abs(latitude) > 90 for latitude in latitudes)
+            or any(abs(longitude) > 180 for longitude in longitudes)
+        ):
+            raise ValidationError(
+                {param: f"Expected {count} comma separated latitude/longitude values"}
+            )
+        return values
+
 
 class BadgeViewSet(viewsets.ModelViewSet):
     serializer_class = PopulatedBadgeSerializer
@@ -34,6 +182,21 @@ class BadgeViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     http_method_names = ["get"]
 
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .prefetch_related(*prefetch_lookups(self.get_serializer()))
+        )
+
+    @cache_response((BADGES, USERS))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response((BADGES, USERS))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 # TripsView
 # /trips
@@ -88,18 +251,24 @@ class IndividualTripView(APIView):
 
 # GroupsView
 # /groups
-# GET all groups: overview of all groups (for search)
+# GET all groups: paginated directory of groups with member counts (for search)
 # POST all groups: user posts a new group and becomes owner
 
 
-class GroupsView(APIView):
+class GroupsView(generics.ListAPIView):
     permission_classes = (IsAuthenticated,)
+    serializer_class = GroupDirectorySerializer
+    pagination_class = GroupDirectoryPagination
+    filter_backends = [SearchFilter]
+    search_fields = ["name"]
 
-    def get(self, request):
-        groups = Group.objects.all()
-        serializer = PopulatedGroupSerializer(groups, many=True)
+    # /groups?search=name&page_size=20, followed by the next/previous cursors
+    def get_queryset(self):
+        return Group.objects.with_counts()
 
-        return Response(serializer.data)
+    @cache_response((GROUPS,))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def post(self, request):
         request.data["owner"] = request.user.id
@@ -120,8 +289,10 @@ class GroupsView(APIView):
 class IndividualGroupView(APIView):
     permission_classes = (IsAuthenticated,)
 
+    @cache_response((GROUPS, USERS))
     def get(self, request, pk):
-        group = Group.objects.get(pk=pk)
+        serializer = PopulatedGroupSerializer()
+        group = Group.objects.prefetch_related(*prefetch_lookups(serializer)).get(pk=pk)
         serializer = PopulatedGroupSerializer(group)
 
         return Response(serializer.data)
@@ -155,15 +326,17 @@ class GroupMembershipView(APIView):
     permission_classes = (IsAuthenticated,)
 
     def get(self, request, pk):
-        requester = User.objects.get(pk=request.user.id)
         group = Group.objects.get(pk=pk)
 
-        if requester in group.members.all():
+        if group.members.filter(pk=request.user.id).exists():
             return Response(
                 "User already a member", status=HTTP_422_UNPROCESSABLE_ENTITY
             )
+        # a token can outlive its user, who is only known here by id
+        if not User.objects.filter(pk=request.user.id).exists():
+            raise PermissionDenied({"message": "No such subject"})
 
-        group.requests.add(requester)
+        group.requests.add(request.user.id)
         group.save()
         return Response(status=HTTP_202_ACCEPTED)
 
@@ -184,14 +357,13 @@ class GroupMembershipView(APIView):
         return Response(status=HTTP_202_ACCEPTED)
 
     def delete(self, request, pk):
-        requester = User.objects.get(pk=request.user.id)
         group = Group.objects.get(pk=pk)
         deletee = User.objects.get(pk=request.data["id"])
 
         if (
-            (group.owner.id != request.user.id)
-            and (requester.id != deletee.id)
-            and (requester not in group.members.all())
+            (group.owner_id != request.user.id)
+            and (request.user.id != deletee.id)
+            and not group.members.filter(pk=request.user.id).exists()
         ):
             return Response(status=HTTP_401_UNAUTHORIZED)
 
@@ -1,11 +1,48 @@
+from django.utils.functional import SimpleLazyObject
 from rest_framework.authentication import BasicAuthentication
 from rest_framework.exceptions import PermissionDenied
 from users.models import User
+from users.tokens import ACCESS, decode_token
+from users.user_cache import get_cached_user
 
 from django.conf import settings
 import jwt
 
 
+def load_user(user_id):
+    try:
+        return get_cached_user(user_id)
+    except User.DoesNotExist:
+        raise PermissionDenied({"message": "No such subject"})
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    Stands in for the token's user, answering `id`, `pk` and the auth checks
+    from the claims and only loading the user (from the per-worker user cache)
+    once any other attribute is used.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        self.__dict__["_user_id"] = user_id
+        super().__init__(lambda: load_user(user_id))
+
+    @property
+    def pk(self):
+        return self.__dict__["_user_id"]
+
+    id = pk
+
+    def __bool__(self):
+        return True
+
+    def __hash__(self):
+        return hash(self.pk)
+
+
 class JWTAuthentication(BasicAuthentication):
     def authenticate(self, request):
         header = request.headers.get("Authorization")
@@ -19,9 +56,13 @@ class JWTAuthentication(BasicAuthentication):
         token = header.replace("Bearer ", "")
 
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            payload = decode_token(token, ACCESS)
+            if settings.JWT_LAZY_USER:
+                return LazyUser(int(payload["sub"])), token
             user = User.objects.get(pk=payload.get("sub"))
-        except jwt.exceptions.InvalidTokenError:
+        except jwt.exceptions.ExpiredSignatureError:
+            raise PermissionDenied({"message": "Token expired"})
+        except (jwt.exceptions.InvalidTokenError, KeyError, TypeError, ValueError):
             raise PermissionDenied({"message": "Invalid token"})
         except User.DoesNotExist:
             raise PermissionDenied({"message": "No such subject"})
@@ -0,0 +1,72 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import APIException
+
+
+class HashingPoolFull(APIException):
+    status_code = 503
+    default_detail = "Too many logins in progress, try again shortly."
+    default_code = "hashing_pool_full"
+
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    The worker's hashing threads, and a semaphore with a slot for each password
+    being hashed or waiting for a thread. PBKDF2 releases the GIL, so the
+    threads hash in parallel while the pool caps how many cores logins take.
+    """
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = settings.PASSWORD_HASH_WORKERS
+            _executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hash")
+            _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_QUEUE)
+        return _executor, _slots
+
+
+def reset_pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = _slots = None
+
+
+def _verify(password, encoded):
+    if encoded is None:
+        # an unknown account costs as much as a wrong password
+        hashers.make_password(password)
+        return False, None
+    valid = hashers.check_password(password, encoded)
+    if valid and hashers.identify_hasher(encoded).must_update(encoded):
+        return True, hashers.make_password(password)
+    return valid, None
+
+
+def check_password(user, password):
+    """
+    Checks `password` for `user` (None for an unknown account) on the hashing
+    pool, upgrading the stored hash when the hasher settings have changed.
+    Raises HashingPoolFull when every slot is taken.
+    """
+    executor, slots = get_pool()
+    if not slots.acquire(blocking=False):
+        raise HashingPoolFull
+    try:
+        encoded = user.password if user is not None else None
+        valid, upgraded = executor.submit(_verify, password, encoded).result()
+    finally:
+        slots.release()
+
+    if upgraded:
+        user.password = upgraded
+        user.save(update_fields=["password"])
+    return valid
@@ -0,0 +1,121 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from users.authentication import JWTAuthentication
+from users.models import RevokedToken, User
+from users.revocation import get_revocation_list, is_revoked, reset_revocation_list
+from users.tokens import issue_tokens
+from users.user_cache import clear_user_cache
+
+BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Times authenticating a request from a JWT, with the user loaded on "
+        "every request, lazily with a cold user cache and lazily with a warm "
+        "one, both for views that only use the user's id and views that read "
+        "the whole user, and the revocation check against a list of --revoked "
+        "tokens. The synthetic user and revocations are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=1000)
+        parser.add_argument("--revoked", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options["samples"])
+                self.run_revocation(options["samples"], options["revoked"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, samples):
+        user = User.objects.create(
+            username="benchmark-auth", email="benchmark-auth@example.com", password="!"
+        )
+        token = issue_tokens(user.id)["token"]
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        get_revocation_list()
+
+        def id_only(user):
+            return user.id
+
+        def whole_user(user):
+            return user.email
+
+        modes = (
+            ("eager", False, False),
+            ("lazy cold", True, True),
+            ("lazy warm", True, False),
+        )
+        self.stdout.write(f"{samples} samples per request")
+        for view, use in (("id only", id_only), ("whole user", whole_user)):
+            for label, lazy, cold in modes:
+                with override_settings(JWT_LAZY_USER=lazy):
+                    timings, queries = self.measure(request, use, cold, samples)
+                self.stdout.write(
+                    f"{view:>10}, {label:<9}: p50 {statistics.median(timings) * 1e6:.1f}us, "
+                    f"max {max(timings) * 1e6:.1f}us, {queries / samples:.2f} queries"
+                )
+
+    def run_revocation(self, samples, count):
+        expires = timezone.now() + timedelta(hours=1)
+        revoked = [uuid.uuid4().hex for _ in range(count)]
+        for i in range(0, count, BATCH_SIZE):
+            RevokedToken.objects.bulk_create(
+                RevokedToken(jti=jti, expires=expires)
+                for jti in revoked[i : i + BATCH_SIZE]
+            )
+
+        reset_revocation_list()
+        start = time.perf_counter()
+        get_revocation_list()
+        build = time.perf_counter() - start
+
+        self.stdout.write(
+            f"revocation list of {count} tokens built in {build * 1000:.1f}ms"
+        )
+        unknown = [uuid.uuid4().hex for _ in range(samples)]
+        for label, jtis in (
+            ("unknown jti", unknown),
+            ("revoked jti", revoked[:samples]),
+        ):
+            timings = []
+            for jti in jtis:
+                start = time.perf_counter()
+                is_revoked(jti)
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(
+                f"{label:>21}: p50 {statistics.median(timings) * 1e6:.2f}us, "
+                f"max {max(timings) * 1e6:.1f}us"
+            )
+
+    @staticmethod
+    def measure(request, use, cold, samples):
+        authentication = JWTAuthentication()
+        clear_user_cache()
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(samples):
+                if cold:
+                    clear_user_cache()
+                start = time.perf_counter()
+                user, _ = authentication.authenticate(request)
+                use(user)
+                timings.append(time.perf_counter() - start)
+        return timings, len(queries)
@@ -0,0 +1,252 @@
+import json
+import os
+import platform
+import random
+import time
+from collections import Counter
+
+import django
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from travels.constants import PLATFORM_BADGE_IDS
+from travels.managers import Travel
+from travels.models import Badge, Town
+from travels.utils import recalculate_platform_badges
+from users.models import TravelCounter, TravellerStats, User
+
+BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def bulk_create(manager, objs):
+    """
+    Inserts in chunks, leaving each backend to pick its own batch size, since
+    an explicit batch_size is not capped to SQLite's limits.
+    """
+    objs = list(objs)
+    for i in range(0, len(objs), BATCH_SIZE):
+        manager.bulk_create(objs[i : i + BATCH_SIZE])
+
+
+def visit_score(towns):
+    """The score Travel.score gives a list of (country, continent, capital) rows."""
+    return (
+        len(towns) * 5
+        + sum(capital == "Primary" for _, _, capital in towns) * 10
+        + len({country for country, _, _ in towns}) * 20
+        + len({continent for _, continent, _ in towns}) * 50
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds a synthetic population of travellers over the world towns and "
+        "times the badge and scoring hot paths, writing a JSON report of "
+        "ops/sec, p50/p95 latency and query counts that can be diffed between "
+        "commits. Everything is rolled back afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=1000, help="e.g. 1000, 10000 or 100000"
+        )
+        parser.add_argument(
+            "--visits", type=int, default=20, help="mean towns per user"
+        )
+        parser.add_argument("--samples", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="write the report here, not stdout")
+        parser.add_argument("--keep", action="store_true")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                dataset = self.build_dataset(options["users"], options["visits"])
+                report = {
+                    "meta": {
+                        **dataset,
+                        "database": connection.vendor,
+                        "samples": options["samples"],
+                        "seed": options["seed"],
+                        "python": platform.python_version(),
+                        "django": django.get_version(),
+                    },
+                    "benchmarks": self.run_benchmarks(options["samples"]),
+                }
+                if not options["keep"]:
+                    raise Rollback
+        except Rollback:
+            pass
+
+        content = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(content + "\n")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(content)
+
+    def build_dataset(self, user_count, mean_visits):
+        if not Town.objects.exists():
+            call_command(
+                "loaddata",
+                os.path.join(
+                    apps.get_app_config("travels").path, "db", "towns_badges_seeds.json"
+                ),
+                verbosity=0,
+            )
+        towns = list(Town.objects.values_list("id", "country", "continent", "capital"))
+        # platform badges have a single holder, chosen by recalculate_platform_badges
+        badge_ids = list(
+            Badge.objects.exclude(id__in=PLATFORM_BADGE_IDS).values_list(
+                "id", flat=True
+            )
+        )
+        if not towns or not badge_ids:
+            raise CommandError("The benchmark needs towns and badges to work with")
+
+        start = time.perf_counter()
+        last_id = User.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        bulk_create(
+            User.objects,
+            (
+                User(
+                    username=f"benchmark{last_id + i}",
+                    email=f"benchmark{last_id + i}@example.com",
+                    password="!",
+                    first_name="Bench",
+                    last_name=str(i),
+                )
+                for i in range(user_count)
+            ),
+        )
+        # not every backend sets primary keys on bulk inserts
+        users = list(User.objects.filter(id__gt=last_id).order_by("id"))
+
+        visits, awards, counters = [], [], []
+        for user in users:
+            count = min(self.rng.randint(1, 2 * mean_visits - 1), len(towns))
+            visited = self.rng.sample(towns, count)
+            visits.extend(
+                User.towns.through(user_id=user.pk, town_id=town[0]) for town in visited
+            )
+            awards.extend(
+                User.badges.through(user_id=user.pk, badge_id=badge_id)
+                for badge_id in self.rng.sample(badge_ids, self.rng.randint(0, 5))
+            )
+            rows = [town[1:] for town in visited]
+            for kind, index in (
+                (TravelCounter.COUNTRY, 0),
+                (TravelCounter.CONTINENT, 1),
+            ):
+                counters.extend(
+                    TravelCounter(user_id=user.pk, kind=kind, name=name, towns=total)
+                    for name, total in Counter(row[index] for row in rows).items()
+                )
+            user.score = visit_score(rows)
+
+        User.objects.bulk_update(users, ["score"], batch_size=BATCH_SIZE)
+        bulk_create(User.towns.through.objects, visits)
+        bulk_create(User.badges.through.objects, awards)
+        bulk_create(TravelCounter.objects, counters)
+        for i in range(0, len(users), BATCH_SIZE):
+            TravellerStats.objects.refresh(
+                user.pk for user in users[i : i + BATCH_SIZE]
+            )
+
+        self.user_ids = [user.pk for user in users]
+        self.town_ids = [town[0] for town in towns]
+        return {
+            "users": User.objects.count(),
+            "towns": len(towns),
+            "visits": User.towns.through.objects.count(),
+            "awards": User.badges.through.objects.count(),
+            "build_seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def run_benchmarks(self, samples):
+        def random_user():
+            return User.objects.get(pk=self.rng.choice(self.user_ids))
+
+        def add_visits():
+            user = random_user()
+            return lambda: user.add_visits(*self.rng.sample(self.town_ids, 3))
+
+        def qualifying_badges():
+            user = random_user()
+            return lambda: list(
+                Badge.objects.get_qualifying_badges(towns=user.towns.all())
+            )
+
+        def travel_score():
+            user = random_user()
+            return lambda: Travel(user.towns.all()).score
+
+        def leader(method):
+            return lambda: method
+
+        benchmarks = {
+            "user.add_visits": (add_visits, samples),
+            "badges.get_qualifying_badges": (qualifying_badges, samples),
+            "travel.score": (travel_score, samples),
+            "recalculate_platform_badges": (
+                lambda: recalculate_platform_badges,
+                max(samples // 5, 1),
+            ),
+            "leader.by_country": (
+                leader(User.travellers.get_leader_by_country),
+                samples,
+            ),
+            "leader.by_city": (leader(User.travellers.get_leader_by_city), samples),
+            "leader.by_capital": (
+                leader(User.travellers.get_leader_by_capital),
+                samples,
+            ),
+            "leader.of_leaders": (leader(User.objects.get_leader_of_leaders), samples),
+        }
+        with override_settings(PLATFORM_BADGES_MODE="off"):
+            return {
+                name: self.measure(prepare, count)
+                for name, (prepare, count) in benchmarks.items()
+            }
+
+    def measure(self, prepare, samples):
+        """
+        Times `samples` calls of the operation `prepare` returns, each inside
+        a rolled back savepoint so every sample sees the same dataset.
+        """
+        timings, query_counts = [], []
+        for _ in range(samples):
+            operation = prepare()
+            try:
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        operation()
+                        timings.append(time.perf_counter() - start)
+                    query_counts.append(len(queries))
+                    raise Rollback
+            except Rollback:
+                pass
+
+        return {
+            "samples": samples,
+            "ops_per_sec": round(samples / sum(timings), 2),
+            "p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+            "queries": {"p50": percentile(query_counts, 0.5), "max": max(query_counts)},
+        }
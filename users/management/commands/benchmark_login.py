@@ -0,0 +1,119 @@
+import secrets
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.password_validation import validate_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from users.hashing import reset_pool
+from users.models import User
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires concurrent logins at /api/login and reports throughput, latency "
+        "and response codes. Passwords go through AUTH_PASSWORD_VALIDATORS "
+        "before being set. The synthetic users are committed so every thread "
+        "can see them, and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--workers", type=int, help="PASSWORD_HASH_WORKERS")
+        parser.add_argument("--queue", type=int, help="PASSWORD_HASH_QUEUE")
+        parser.add_argument("--iterations", type=int, help="PASSWORD_HASH_ITERATIONS")
+        parser.add_argument(
+            "--throttled", action="store_true", help="keep the login throttles on"
+        )
+
+    def handle(self, *args, **options):
+        overrides = {
+            setting: options[option]
+            for setting, option in (
+                ("PASSWORD_HASH_WORKERS", "workers"),
+                ("PASSWORD_HASH_QUEUE", "queue"),
+                ("PASSWORD_HASH_ITERATIONS", "iterations"),
+            )
+            if options[option] is not None
+        }
+        if not options["throttled"]:
+            overrides["LOGIN_THROTTLE_RATES"] = {}
+
+        with override_settings(**overrides):
+            reset_pool()
+            credentials = self.create_users(options["users"])
+            try:
+                self.run(credentials, options["requests"], options["concurrency"])
+            finally:
+                User.objects.filter(username__startswith="benchmark-login-").delete()
+                reset_pool()
+
+    @staticmethod
+    def create_users(count):
+        credentials = []
+        for i in range(count):
+            user = User(
+                username=f"benchmark-login-{i}",
+                email=f"benchmark-login-{i}@example.com",
+                first_name="Bench",
+                last_name=str(i),
+            )
+            password = secrets.token_urlsafe(12)
+            validate_password(password, user)
+            user.set_password(password)
+            user.save()
+            credentials.append({"email": user.email, "password": password})
+        return credentials
+
+    def run(self, credentials, requests, concurrency):
+        url = reverse("login")
+
+        def login(i):
+            client = Client(REMOTE_ADDR=f"10.0.{i // 250 % 250}.{i % 250 + 1}")
+            start = time.perf_counter()
+            response = client.post(url, credentials[i % len(credentials)])
+            return response.status_code, time.perf_counter() - start
+
+        def worker(indexes):
+            try:
+                return [login(i) for i in indexes]
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = [
+                result
+                for batch in executor.map(
+                    worker,
+                    [range(n, requests, concurrency) for n in range(concurrency)],
+                )
+                for result in batch
+            ]
+        elapsed = time.perf_counter() - start
+
+        timings = [timing for _, timing in results]
+        statuses = Counter(status for status, _ in results)
+        self.stdout.write(
+            f"{requests} logins from {concurrency} clients in {elapsed:.2f}s: "
+            f"{requests / elapsed:.1f}/s, p50 {percentile(timings, 0.5) * 1000:.1f}ms, "
+            f"p95 {percentile(timings, 0.95) * 1000:.1f}ms, "
+            f"max {max(timings) * 1000:.1f}ms, mean {statistics.mean(timings) * 1000:.1f}ms"
+        )
+        self.stdout.write(
+            "responses: "
+            + ", ".join(f"{code}: {n}" for code, n in sorted(statuses.items()))
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import TravelCounter, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds every user's country/continent counters from their towns and "
+        "checks the score they imply against count_travel_score."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix-scores",
+            action="store_true",
+            help="Overwrite stored scores that differ from the recomputed score.",
+        )
+
+    def handle(self, *args, **options):
+        mismatches = []
+        stale_scores = 0
+
+        for user in User.objects.iterator():
+            TravelCounter.objects.rebuild(user)
+            expected = user.towns.count_travel_score()
+            counted = TravelCounter.objects.score_for(user)
+
+            if counted != expected:
+                mismatches.append(user)
+                self.stderr.write(
+                    f"{user.username}: counters give {counted}, expected {expected}"
+                )
+            if user.score != expected:
+                stale_scores += 1
+                if options["fix_scores"]:
+                    User.objects.filter(pk=user.pk).update(score=expected)
+
+        self.stdout.write(
+            f"Rebuilt counters for {User.objects.count()} users, "
+            f"{stale_scores} stored scores out of date"
+            + (" (fixed)" if options["fix_scores"] and stale_scores else "")
+        )
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} users failed the score check")
@@ -1,35 +1,54 @@
-from django.db import models
-from django.db.models import Count, Max, F
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
 
 from travels.constants import MOST_AWARDS_ID
 
+IN_CLAUSE_SIZE = 500
+
+
+def chunked(ids, size=IN_CLAUSE_SIZE):
+    """Splits ids into lists short enough for an IN clause on any backend."""
+    ids = list(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i : i + size]
+
 
 class VisitorManager(models.Manager):
     def get_queryset(self):
         return (
             super()
             .get_queryset()
-            .prefetch_related("towns")
-            .filter(towns__isnull=False)
-            .prefetch_related("badges")
+            .select_related("stats")
             .annotate(
-                countries_visited=Count(F("towns__country"), distinct=True),
-                visited_cities=Count(F("towns")),
-                awards=Count(F("badges")),
+                countries_visited=F("stats__countries"),
+                visited_cities=F("stats__cities"),
+                capitals_visited=F("stats__capitals"),
+                awards=F("stats__awards"),
             )
         )
 
     def get_leader_by_country(self):
-        return self.get_queryset().order_by("-countries_visited").first()
+        return (
+            self.get_queryset()
+            .filter(stats__countries__gt=0)
+            .order_by("-stats__countries", "id")
+            .first()
+        )
 
     def get_leader_by_city(self):
-        return self.get_queryset().order_by("-visited_cities").first()
+        return (
+            self.get_queryset()
+            .filter(stats__cities__gt=0)
+            .order_by("-stats__cities", "id")
+            .first()
+        )
 
     def get_leader_by_capital(self):
         return (
             self.get_queryset()
-            .filter(towns__capital="primary")
-            .order_by("-visited_cities")
+            .filter(stats__capitals__gt=0)
+            .order_by("-stats__capitals", "id")
             .first()
         )
 
@@ -43,4 +62,163 @@ class CustomUserManager(models.Manager):
         )
 
     def get_leader_of_leaders(self):
-        return self.with_badges().exclude(id=MOST_AWARDS_ID).order_by("-awards", "date_joined").first()
+        return (
+            self.select_related("stats")
+            .filter(stats__awards__gt=0)
+            .exclude(id=MOST_AWARDS_ID)
+            .annotate(awards=F("stats__awards"))
+            .order_by("-stats__awards", "date_joined")
+            .first()
+        )
+
+
+class TravellerStatsManager(models.Manager):
+    def refresh(self, user_ids):
+        """Recomputes the stats rows of the given users from their towns and badges."""
+        user_model = self.model._meta.get_field("user").related_model
+        user_ids = set(user_ids)
+        town_totals = {
+            row["user_id"]: row
+            for row in user_model.towns.through.objects.filter(user_id__in=user_ids)
+            .values("user_id")
+            .annotate(
+                cities=Count("town_id"),
+                countries=Count("town__country", distinct=True),
+                continents=Count("town__continent", distinct=True),
+                capitals=Count("town_id", filter=Q(town__capital="primary")),
+            )
+            .order_by()
+        }
+        awards = dict(
+            user_model.badges.through.objects.filter(user_id__in=user_ids)
+            .values("user_id")
+            .annotate(awards=Count("badge_id"))
+            .order_by()
+            .values_list("user_id", "awards")
+        )
+        scores = user_model.objects.filter(id__in=user_ids).values_list("id", "score")
+
+        rows = []
+        for user_id, score in scores:
+            totals = town_totals.get(user_id, {})
+            rows.append(
+                self.model(
+                    user_id=user_id,
+                    cities=totals.get("cities", 0),
+                    countries=totals.get("countries", 0),
+                    continents=totals.get("continents", 0),
+                    capitals=totals.get("capitals", 0),
+                    awards=awards.get(user_id, 0),
+                    score=score,
+                )
+            )
+        with transaction.atomic():
+            self.filter(user_id__in=user_ids).delete()
+            self.bulk_create(rows)
+        return rows
+
+    def record_score(self, user):
+        if not self.filter(user=user).update(score=user.score):
+            self.refresh([user.pk])
+
+
+def count_travels(counter_model, visits):
+    """
+    Unsaved `counter_model` rows counting the towns in `visits` (rows of the
+    user/town through table) per user and country or continent.
+    """
+    return [
+        counter_model(
+            user_id=row["user_id"],
+            kind=kind,
+            name=row[f"town__{kind}"],
+            towns=row["towns"],
+        )
+        for kind in ("country", "continent")
+        for row in visits.values("user_id", f"town__{kind}")
+        .annotate(towns=Count("town_id"))
+        .order_by()
+    ]
+
+
+class TravelCounterManager(models.Manager):
+    def record_visits(self, user, visits) -> int:
+        """
+        Updates the user's counters for newly visited (country, continent, capital)
+        rows and returns the resulting score increase.
+        """
+        names = {
+            name for country, continent, _ in visits for name in (country, continent)
+        }
+        counters = {
+            (counter.kind, counter.name): counter
+            for counter in self.filter(user=user, name__in=names)
+        }
+        created, updated = [], set()
+        delta = 0
+
+        for country, continent, capital in visits:
+            delta += 5
+            if capital == "Primary":
+                delta += 10
+            for kind, name, points in (
+                (self.model.COUNTRY, country, 20),
+                (self.model.CONTINENT, continent, 50),
+            ):
+                counter = counters.get((kind, name))
+                if counter is None:
+                    counter = self.model(user=user, kind=kind, name=name)
+                    counters[(kind, name)] = counter
+                    created.append(counter)
+                elif counter.pk:
+                    updated.add(counter)
+                if not counter.towns:
+                    delta += points
+                counter.towns += 1
+
+        self.bulk_create(created)
+        self.bulk_update(updated, ["towns"])
+        return delta
+
+    def rebuild(self, user):
+        self.filter(user=user).delete()
+        visits = user.towns.through.objects.filter(user=user)
+        return self.bulk_create(count_travels(self.model, visits))
+
+    def score_for(self, user) -> int:
+        """The travel score implied by the user's counters."""
+        totals = {
+            row["kind"]: row
+            for row in self.filter(user=user)
+            .values("kind")
+            .annotate(regions=Count("id"), towns=Sum("towns"))
+            .order_by()
+        }
+        country = totals.get(self.model.COUNTRY, {"regions": 0, "towns": 0})
+        continent = totals.get(self.model.CONTINENT, {"regions": 0})
+        capitals = user.towns.filter(capital="Primary").count()
+        return (
+            country["towns"] * 5
+            + capitals * 10
+            + country["regions"] * 20
+            + continent["regions"] * 50
+        )
+
+
+class RevokedTokenManager(models.Manager):
+    def active(self):
+        """Revocations of tokens that have not expired yet."""
+        return self.filter(expires__gt=timezone.now())
+
+    def revoke(self, jti, expires):
+        """
+        Revokes `jti`, returning False when it was revoked already. The primary
+        key decides, so of two concurrent revocations only one gets True.
+        """
+        self.filter(expires__lte=timezone.now()).delete()
+        try:
+            with transaction.atomic():
+                self.create(jti=jti, expires=expires)
+        except IntegrityError:
+            return False
+        return True
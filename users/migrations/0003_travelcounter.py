@@ -0,0 +1,28 @@
+# Generated by Django 2.2.27 on 2026-10-18 15:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_auto_20230225_2042'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('country', 'Country'), ('continent', 'Continent')], max_length=10)),
+                ('name', models.CharField(max_length=255)),
+                ('towns', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='travel_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'kind', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 2.2.27 on 2026-10-18 15:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def populate_stats(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    TravellerStats = apps.get_model('users', 'TravellerStats')
+    Town = apps.get_model('travels', 'Town')
+    Badge = apps.get_model('travels', 'Badge')
+
+    town_totals = {
+        row['user_id']: row
+        for row in Town.visitors.through.objects.values('user_id').annotate(
+            cities=Count('town_id'),
+            countries=Count('town__country', distinct=True),
+            continents=Count('town__continent', distinct=True),
+            capitals=Count('town_id', filter=Q(town__capital='primary')),
+        ).order_by()
+    }
+    awards = dict(
+        Badge.users.through.objects.values('user_id').annotate(
+            awards=Count('badge_id')
+        ).order_by().values_list('user_id', 'awards')
+    )
+    TravellerStats.objects.bulk_create(
+        TravellerStats(
+            user_id=user_id,
+            cities=town_totals.get(user_id, {}).get('cities', 0),
+            countries=town_totals.get(user_id, {}).get('countries', 0),
+            continents=town_totals.get(user_id, {}).get('continents', 0),
+            capitals=town_totals.get(user_id, {}).get('capitals', 0),
+            awards=awards.get(user_id, 0),
+            score=score,
+        )
+        for user_id, score in User.objects.values_list('id', 'score')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_travelcounter'),
+        ('travels', '0003_auto_20230225_2042'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravellerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('cities', models.IntegerField(default=0)),
+                ('countries', models.IntegerField(default=0)),
+                ('capitals', models.IntegerField(default=0)),
+                ('continents', models.IntegerField(default=0)),
+                ('awards', models.IntegerField(default=0)),
+                ('score', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='travellerstats',
+            index=models.Index(fields=['-cities', 'user'], name='users_trave_cities_a50d94_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travellerstats',
+            index=models.Index(fields=['-countries', 'user'], name='users_trave_countri_0b9489_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travellerstats',
+            index=models.Index(fields=['-capitals', 'user'], name='users_trave_capital_7935f7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travellerstats',
+            index=models.Index(fields=['-continents', 'user'], name='users_trave_contine_580cae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travellerstats',
+            index=models.Index(fields=['-awards', 'user'], name='users_trave_awards_94244e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travellerstats',
+            index=models.Index(fields=['-score', 'user'], name='users_trave_score_8a227e_idx'),
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.27 on 2026-10-18 16:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_travellerstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('jti', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('expires', models.DateTimeField(db_index=True)),
+                ('revoked', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
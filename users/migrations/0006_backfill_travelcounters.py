@@ -0,0 +1,45 @@
+# Generated by Django 2.2.27 on 2026-10-18 18:05
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def count_travels(counter_model, visits):
+    # a frozen copy of users.managers.count_travels, so later changes to the
+    # manager cannot change what this migration writes
+    return [
+        counter_model(
+            user_id=row['user_id'],
+            kind=kind,
+            name=row[f'town__{kind}'],
+            towns=row['towns'],
+        )
+        for kind in ('country', 'continent')
+        for row in visits.values('user_id', f'town__{kind}')
+        .annotate(towns=Count('town_id'))
+        .order_by()
+    ]
+
+
+def backfill_counters(apps, schema_editor):
+    TravelCounter = apps.get_model('users', 'TravelCounter')
+    Town = apps.get_model('travels', 'Town')
+
+    # add_visits only scores first visits correctly once a user has counters
+    TravelCounter.objects.all().delete()
+    TravelCounter.objects.bulk_create(
+        count_travels(TravelCounter, Town.visitors.through.objects.all()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_revokedtoken'),
+        ('travels', '0004_town_real_coordinates'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
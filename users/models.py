@@ -1,7 +1,16 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 
-from users.managers import VisitorManager, CustomUserManager
+from travels.managers import BadgeDelta
+
+from users.managers import (
+    chunked,
+    VisitorManager,
+    CustomUserManager,
+    RevokedTokenManager,
+    TravelCounterManager,
+    TravellerStatsManager,
+)
 
 
 class User(AbstractUser):
@@ -20,14 +29,128 @@ class User(AbstractUser):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
 
-    def add_visits(self, *objs) -> None:
-        self.towns.add(*objs)
-        self.add_awards()
-
-    def add_awards(self) -> None:
-        awarded_badges = self.badges.model.objects.get_qualifying_badges(
-            towns=self.towns
+    @transaction.atomic
+    def add_visits(self, *objs) -> BadgeDelta:
+        town_ids = [getattr(obj, "pk", obj) for obj in objs]
+        new_visits = list(
+            self.towns.model.objects.filter(id__in=town_ids)
+            .exclude(visitors=self)
+            .values_list("country", "continent", "capital")
         )
-        self.badges.add(*awarded_badges)
+        self.towns.add(*town_ids)
+        self.score += TravelCounter.objects.record_visits(self, new_visits)
+        delta = self.award_badges()
+        self.save()
+        return delta
+
+    @transaction.atomic
+    def update_visits(self, add=(), remove=()) -> BadgeDelta:
+        """
+        Adds and removes visited towns by id straight through the m2m table, then
+        re-evaluates badges, score and stats once, all or nothing. Returns the
+        badge changes.
+        """
+        through = self.towns.through
+        for town_ids in chunked(remove):
+            through.objects.filter(user=self, town_id__in=town_ids).delete()
+        for town_ids in chunked(add):
+            existing = set(
+                through.objects.filter(user=self, town_id__in=town_ids).values_list(
+                    "town_id", flat=True
+                )
+            )
+            through.objects.bulk_create(
+                through(user=self, town_id=town_id)
+                for town_id in town_ids
+                if town_id not in existing
+            )
+
+        delta = self.add_awards()
+        # the through table writes bypass the m2m_changed stats refresh
+        TravellerStats.objects.refresh([self.pk])
+        return delta
+
+    def add_awards(self) -> BadgeDelta:
+        delta = self.award_badges()
         self.score = self.towns.count_travel_score()
+        TravelCounter.objects.rebuild(self)
         self.save()
+        return delta
+
+    def award_badges(self) -> BadgeDelta:
+        delta = self.badges.model.objects.sync(self)
+        if delta:
+            # the badge rows are written without sending m2m_changed
+            TravellerStats.objects.refresh([self.pk])
+        return delta
+
+
+class TravelCounter(models.Model):
+    """Number of towns a user has visited in one country or continent."""
+
+    objects = TravelCounterManager()
+
+    COUNTRY = "country"
+    CONTINENT = "continent"
+    KINDS = (
+        (COUNTRY, "Country"),
+        (CONTINENT, "Continent"),
+    )
+
+    user = models.ForeignKey(
+        User, related_name="travel_counters", on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    name = models.CharField(max_length=255)
+    towns = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "kind", "name")
+
+    def __str__(self):
+        return f"{self.user} - {self.name}: {self.towns}"
+
+
+class TravellerStats(models.Model):
+    """
+    Leaderboard totals for a user, kept in step with their towns, badges and
+    score by the signals in users/signals.py.
+    """
+
+    objects = TravellerStatsManager()
+
+    user = models.OneToOneField(
+        User, related_name="stats", on_delete=models.CASCADE, primary_key=True
+    )
+    cities = models.IntegerField(default=0)
+    countries = models.IntegerField(default=0)
+    capitals = models.IntegerField(default=0)
+    continents = models.IntegerField(default=0)
+    awards = models.IntegerField(default=0)
+    score = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-cities", "user"]),
+            models.Index(fields=["-countries", "user"]),
+            models.Index(fields=["-capitals", "user"]),
+            models.Index(fields=["-continents", "user"]),
+            models.Index(fields=["-awards", "user"]),
+            models.Index(fields=["-score", "user"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.score}"
+
+
+class RevokedToken(models.Model):
+    """A token, by its jti claim, that is no longer accepted before it expires."""
+
+    objects = RevokedTokenManager()
+
+    jti = models.CharField(max_length=32, primary_key=True)
+    expires = models.DateTimeField(db_index=True)
+    revoked = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,144 @@
+import math
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from users.models import RevokedToken
+
+VERSION_KEY = "users:revocation-list-version"
+# how long a worker trusts its list before re-reading the shared version
+VERSION_CHECK_SECONDS = 1.0
+# how often the list is rebuilt to drop revocations of expired tokens
+REBUILD_SECONDS = 3600
+# revocations committed this long before a sync are fetched again, in case
+# they were written in a transaction still open at the previous sync
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """
+    A bit array that answers "maybe present" or "certainly absent". jtis are
+    random hex, so the bit positions are taken from the jti itself rather than
+    from a hash of it.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        try:
+            value = int(key, 16)
+        except ValueError:
+            value = hash(key)
+        first, second = value & 0xFFFFFFFFFFFFFFFF, (value >> 64) | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevocationList:
+    """
+    The jtis of revoked tokens that have not expired. The bloom filter turns
+    away almost every jti that was never revoked, so authenticating a request
+    rarely gets past it, and the set settles the rest.
+    """
+
+    def __init__(self, jtis=(), capacity=None):
+        self.jtis = set(jtis)
+        self.capacity = max(capacity or 2 * len(self.jtis), 1024)
+        self.bloom = BloomFilter(self.capacity)
+        for jti in self.jtis:
+            self.bloom.add(jti)
+
+    def __len__(self):
+        return len(self.jtis)
+
+    def __contains__(self, jti):
+        return jti in self.bloom and jti in self.jtis
+
+    def add(self, jti):
+        if len(self.jtis) >= self.capacity:
+            # past its capacity the filter lets too much through, so resize it
+            resized = RevocationList(self.jtis | {jti}, 2 * self.capacity)
+            self.bloom, self.jtis, self.capacity = (
+                resized.bloom,
+                resized.jtis,
+                resized.capacity,
+            )
+        else:
+            self.jtis.add(jti)
+            self.bloom.add(jti)
+
+
+_list = None
+_version = None
+_checked = 0.0
+_built = 0.0
+_synced = None
+_lock = threading.Lock()
+
+
+def get_revocation_list():
+    """
+    This worker's revocation list, built from the database once and then kept
+    up to date by fetching only the revocations made since the last sync
+    whenever the version stamp in the shared cache changes.
+    """
+    global _list, _version, _checked, _built, _synced
+    now = time.monotonic()
+    if _list is not None and now - _checked < VERSION_CHECK_SECONDS:
+        return _list
+
+    version = caches[settings.VERSION_CACHE].get(VERSION_KEY)
+    with _lock:
+        if _list is None or now - _built >= REBUILD_SECONDS:
+            _synced = timezone.now()
+            _list = RevocationList(
+                RevokedToken.objects.active().values_list("jti", flat=True)
+            )
+            _built, _version = now, version
+        elif version != _version:
+            since, _synced = _synced - SYNC_OVERLAP, timezone.now()
+            for jti in RevokedToken.objects.filter(revoked__gte=since).values_list(
+                "jti", flat=True
+            ):
+                _list.add(jti)
+            _version = version
+        _checked = now
+    return _list
+
+
+def is_revoked(jti):
+    return jti in get_revocation_list()
+
+
+def revoke(jti, expires):
+    """Revokes `jti`, returning False when another request revoked it first."""
+    created = RevokedToken.objects.revoke(jti, expires)
+    revoked = get_revocation_list()
+    with _lock:
+        revoked.add(jti)
+    if created:
+        caches[settings.VERSION_CACHE].set(VERSION_KEY, uuid.uuid4().hex, None)
+    return created
+
+
+def reset_revocation_list():
+    global _list
+    _list = None
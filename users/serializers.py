@@ -5,7 +5,9 @@ from travels.serializers import (
     BadgeSerializer,
     GroupSerializer,
 )
-from users.models import User
+from travels.models import Town
+from users.managers import chunked
+from users.models import TravellerStats, User
 
 import django.contrib.auth.password_validation as validations
 from django.contrib.auth.hashers import make_password
@@ -111,3 +113,50 @@ class PopulatedUserSerializer(serializers.ModelSerializer):
             "groups_podium2",
             "groups_podium3",
         )
+
+
+class BulkVisitsSerializer(serializers.Serializer):
+    add = serializers.ListField(child=serializers.IntegerField(), default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(), default=list)
+
+    def validate(self, data):
+        add, remove = set(data["add"]), set(data["remove"])
+        if add & remove:
+            raise serializers.ValidationError(
+                {"remove": f"Towns both added and removed: {sorted(add & remove)}"}
+            )
+
+        known = set()
+        for town_ids in chunked(add):
+            known.update(
+                Town.objects.filter(id__in=town_ids).values_list("id", flat=True)
+            )
+        if add - known:
+            raise serializers.ValidationError(
+                {"add": f"Unknown towns: {sorted(add - known)}"}
+            )
+        return {"add": add, "remove": remove}
+
+
+class LeaderboardSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="user.id")
+    username = serializers.CharField(source="user.username")
+    first_name = serializers.CharField(source="user.first_name")
+    last_name = serializers.CharField(source="user.last_name")
+    image = serializers.CharField(source="user.image")
+
+    class Meta:
+        model = TravellerStats
+        fields = (
+            "id",
+            "username",
+            "first_name",
+            "last_name",
+            "image",
+            "score",
+            "cities",
+            "countries",
+            "capitals",
+            "continents",
+            "awards",
+        )
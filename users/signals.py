@@ -1,10 +1,50 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
-from models import User
-from travels.utils import recalculate_platform_badges
+from users.models import TravellerStats, User
+from users.user_cache import invalidate_cached_user
+from travels.models import Badge, Town
+from travels.tasks import schedule_platform_recalculation
+
+
+@receiver(post_save, sender=User)
+def stats_score_update(sender, instance, **kwargs):
+    TravellerStats.objects.record_score(instance)
 
 
 @receiver(post_save, sender=User)
 def platform_recalculation(sender, **kwargs):
-    # TODO: Test view behaviour, possible optimisation here
-    recalculate_platform_badges()
+    schedule_platform_recalculation()
+
+
+@receiver(m2m_changed, sender=Town.visitors.through)
+@receiver(m2m_changed, sender=Badge.users.through)
+def stats_refresh(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and not reverse:
+        # the cleared users are only known before the rows go
+        instance._cleared_user_ids = list(
+            sender.objects.filter(
+                **{
+                    sender._meta.get_field(
+                        instance._meta.model_name
+                    ).attname: instance.pk
+                }
+            ).values_list("user_id", flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if reverse:
+        user_ids = [instance.pk]
+    elif action == "post_clear":
+        user_ids = getattr(instance, "_cleared_user_ids", [])
+    else:
+        user_ids = pk_set
+    if user_ids:
+        TravellerStats.objects.refresh(user_ids)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_cache_invalidation(sender, instance, **kwargs):
+    invalidate_cached_user(instance=instance)
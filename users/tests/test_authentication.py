@@ -1,14 +1,36 @@
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
 from django.urls import reverse, reverse_lazy
-from rest_framework.exceptions import ErrorDetail
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import ErrorDetail, PermissionDenied
+from rest_framework.test import APIRequestFactory, APITestCase
 
+from travels.models import Group
+from users.authentication import JWTAuthentication, LazyUser
+from users.hashing import get_pool, reset_pool
+from users.models import RevokedToken, User
+from users.revocation import (
+    RevocationList,
+    VERSION_KEY,
+    get_revocation_list,
+    reset_revocation_list,
+)
 from users.tests.factories import UserFactory
+from users.tokens import issue_tokens
+from users.user_cache import clear_user_cache
 
 
 class AuthTestData(APITestCase):
     route_name = "register"
 
     def setUp(self) -> None:
+        # login throttle buckets
+        caches["throttle"].clear()
         self.first_user = UserFactory()
         self.password = "amazingpassword1"
         self.first_user.set_password(self.password)
@@ -100,3 +122,327 @@ class TestLogin(AuthTestData):
         )
         self.assertIsNone(response.data.get("token"))
         self.assertEqual(response.status_code, 401)
+
+
+class TestLoginLoad(AuthTestData):
+    route_name = "login"
+
+    def setUp(self) -> None:
+        super().setUp()
+        reset_pool()
+        self.addCleanup(reset_pool)
+
+    def login(self, email=None, password=None, **extra):
+        return self.client.post(
+            reverse(self.route_name),
+            data={
+                "email": email or self.first_user.email,
+                "password": password or self.password,
+            },
+            **extra,
+        )
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_hashes_are_upgraded_to_the_configured_cost(self):
+        self.assertEqual(self.login().status_code, 200)
+
+        self.first_user.refresh_from_db()
+        self.assertTrue(self.first_user.password.startswith("pbkdf2_sha256$1000$"))
+        self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+    def test_logins_are_refused_while_the_hashing_pool_is_full(self):
+        _, slots = get_pool()
+        slots.acquire()
+        response = self.login()
+        slots.release()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(LOGIN_THROTTLE_RATES={"ip": None, "email": "2/min"})
+    def test_attempts_are_limited_per_email(self):
+        statuses = [self.login(password="wrongpassword").status_code for _ in range(3)]
+        other = self.login(email="someone@example.com")
+
+        self.assertEqual(statuses, [401, 401, 429])
+        self.assertEqual(other.status_code, 401)
+
+    @override_settings(LOGIN_THROTTLE_RATES={"ip": "2/min", "email": None})
+    def test_attempts_are_limited_per_ip(self):
+        statuses = [self.login().status_code for _ in range(3)]
+        elsewhere = self.login(REMOTE_ADDR="10.0.0.2")
+
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(elsewhere.status_code, 200)
+
+    @override_settings(LOGIN_THROTTLE_RATES={"ip": "2/min", "email": None})
+    def test_forwarded_for_header_does_not_reset_the_ip_bucket(self):
+        statuses = [
+            self.login(HTTP_X_FORWARDED_FOR=f"10.0.0.{i}").status_code for i in range(3)
+        ]
+
+        self.assertEqual(statuses, [200, 200, 429])
+
+    @override_settings(LOGIN_THROTTLE_RATES={"ip": "3/min", "email": None})
+    def test_filling_the_response_cache_keeps_the_buckets(self):
+        statuses = [self.login(password="wrongpassword").status_code for _ in range(2)]
+        # more distinct anonymous responses than the response cache holds
+        for i in range(400):
+            self.client.get(reverse("towns-v1-list"), {"x": i})
+        statuses += [self.login(password="wrongpassword").status_code for _ in range(2)]
+
+        self.assertEqual(statuses, [401, 401, 401, 429])
+
+    @override_settings(LOGIN_THROTTLE_RATES={"ip": "2/min", "email": None})
+    def test_bucket_refills_steadily(self):
+        with mock.patch("users.throttling.time.time", return_value=1000.0):
+            self.login(), self.login()
+            response = self.login()
+        with mock.patch("users.throttling.time.time", return_value=1030.0):
+            refilled = [self.login().status_code for _ in range(2)]
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertEqual(refilled, [200, 429])
+
+
+class TestJWTAuthentication(APITestCase):
+    def setUp(self) -> None:
+        self.first_user = UserFactory()
+        clear_user_cache()
+        reset_revocation_list()
+        # built once per worker
+        get_revocation_list()
+        self.token = issue_tokens(self.first_user.id)["token"]
+
+    def authenticate(self, token=None):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {token or self.token}"
+        )
+        user, _ = JWTAuthentication().authenticate(request)
+        return user
+
+    def test_id_and_auth_checks_need_no_query(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertTrue(user and user.is_authenticated)
+            self.assertEqual(user.id, self.first_user.id)
+            self.assertEqual(user.pk, self.first_user.id)
+
+    def test_user_is_loaded_once_and_then_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().email, self.first_user.email)
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual(user.email, self.first_user.email)
+            self.assertIsInstance(user, User)
+
+    def test_requests_do_not_share_the_cached_user(self):
+        user = self.authenticate()
+        user.first_name = "changed"
+
+        self.assertEqual(self.authenticate().first_name, self.first_user.first_name)
+
+    def test_saving_the_user_drops_it_from_the_cache(self):
+        self.authenticate().email
+        self.first_user.first_name = "renamed"
+        self.first_user.save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().first_name, "renamed")
+
+    def test_deleted_user_is_denied_once_loaded(self):
+        self.first_user.delete()
+        user = self.authenticate()
+
+        with self.assertRaises(PermissionDenied):
+            user.email
+
+    def test_profile_writes_do_not_save_a_stale_cached_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.client.get(reverse("profile-v1"))
+        # changed by another worker, whose save can't clear this worker's cache
+        User.objects.filter(pk=self.first_user.pk).update(score=999, password="changed")
+        data = {
+            "username": self.first_user.username,
+            "first_name": "Token",
+            "last_name": self.first_user.last_name,
+        }
+
+        response = self.client.put(reverse("profile-v1"), data=data, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.first_user.refresh_from_db()
+        self.assertEqual(self.first_user.first_name, "Token")
+        self.assertEqual(self.first_user.score, 999)
+        self.assertEqual(self.first_user.password, "changed")
+
+    def test_deleted_user_cannot_request_membership(self):
+        group = Group.objects.create(name="Travellers", owner=UserFactory())
+        self.first_user.delete()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+        response = self.client.get(f"/api/groups/{group.id}/membership/")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(group.requests.exists())
+
+    def test_invalid_token_is_denied(self):
+        with self.assertRaises(PermissionDenied):
+            self.authenticate("not.a.token")
+
+    def test_tokens_without_expiry_are_denied(self):
+        token = jwt.encode(
+            {"sub": self.first_user.id}, settings.SECRET_KEY, algorithm="HS256"
+        )
+
+        with self.assertRaises(PermissionDenied):
+            self.authenticate(token.decode())
+
+    def test_refresh_token_cannot_be_used_for_access(self):
+        with self.assertRaises(PermissionDenied):
+            self.authenticate(issue_tokens(self.first_user.id)["refresh"])
+
+    @override_settings(JWT_ACCESS_TOKEN_SECONDS=-60)
+    def test_expired_token_is_denied(self):
+        with self.assertRaisesMessage(PermissionDenied, "Token expired"):
+            self.authenticate(issue_tokens(self.first_user.id)["token"])
+
+    @override_settings(JWT_LAZY_USER=False)
+    def test_eager_mode_loads_the_user(self):
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+
+        self.assertNotIsInstance(user, LazyUser)
+        self.assertEqual(user, self.first_user)
+
+    def test_profile_can_be_read_and_updated_with_a_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        data = {
+            "username": self.first_user.username,
+            "first_name": "Token",
+            "last_name": self.first_user.last_name,
+        }
+
+        response = self.client.put(reverse("profile-v1"), data=data, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.get(reverse("profile-v1")).data["first_name"], "Token"
+        )
+        self.first_user.refresh_from_db()
+        self.assertEqual(self.first_user.first_name, "Token")
+
+
+class TestTokenLifecycle(APITestCase):
+    def setUp(self) -> None:
+        caches["throttle"].clear()
+        self.user = UserFactory()
+        self.user.set_password("amazingpassword1")
+        self.user.save()
+        clear_user_cache()
+        reset_revocation_list()
+        response = self.client.post(
+            reverse("login"),
+            data={"email": self.user.email, "password": "amazingpassword1"},
+        )
+        self.token, self.refresh = response.data["token"], response.data["refresh"]
+
+    def get_profile(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return self.client.get(reverse("profile-v1"))
+
+    def test_login_returns_access_and_refresh_tokens(self):
+        payload = jwt.decode(self.token, settings.SECRET_KEY, algorithms=["HS256"])
+
+        self.assertEqual(payload["sub"], self.user.id)
+        self.assertEqual(payload["type"], "access")
+        self.assertEqual(
+            payload["exp"] - payload["iat"], settings.JWT_ACCESS_TOKEN_SECONDS
+        )
+        self.assertEqual(self.get_profile(self.token).status_code, 200)
+
+    def test_refresh_issues_new_tokens_once(self):
+        response = self.client.post(
+            reverse("token-refresh"), data={"refresh": self.refresh}
+        )
+        replayed = self.client.post(
+            reverse("token-refresh"), data={"refresh": self.refresh}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data["refresh"], self.refresh)
+        self.assertEqual(self.get_profile(response.data["token"]).status_code, 200)
+        self.assertEqual(replayed.status_code, 401)
+
+    def test_refresh_replayed_on_another_worker_is_refused(self):
+        payload = jwt.decode(self.refresh, settings.SECRET_KEY, algorithms=["HS256"])
+        # used on another worker, whose revocation this worker has not synced
+        RevokedToken.objects.create(
+            jti=payload["jti"], expires=datetime.now() + timedelta(days=1)
+        )
+
+        response = self.client.post(
+            reverse("token-refresh"), data={"refresh": self.refresh}
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_for_deleted_user_is_refused(self):
+        self.user.delete()
+
+        response = self.client.post(
+            reverse("token-refresh"), data={"refresh": self.refresh}
+        )
+
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn("token", response.data)
+
+    def test_access_token_cannot_refresh(self):
+        response = self.client.post(
+            reverse("token-refresh"), data={"refresh": self.token}
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_revokes_both_tokens(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        response = self.client.post(reverse("logout"), data={"refresh": self.refresh})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_profile(self.token).status_code, 403)
+        self.client.credentials()
+        refreshed = self.client.post(
+            reverse("token-refresh"), data={"refresh": self.refresh}
+        )
+        self.assertEqual(refreshed.status_code, 401)
+
+    def test_revocations_by_other_workers_are_synced(self):
+        self.assertEqual(self.get_profile(self.token).status_code, 200)
+        payload = jwt.decode(self.token, settings.SECRET_KEY, algorithms=["HS256"])
+        RevokedToken.objects.create(
+            jti=payload["jti"], expires=datetime.now() + timedelta(hours=1)
+        )
+        caches["versions"].set(VERSION_KEY, "another worker")
+
+        with mock.patch("users.revocation.VERSION_CHECK_SECONDS", 0):
+            self.assertEqual(self.get_profile(self.token).status_code, 403)
+
+
+class TestRevocationList(APITestCase):
+    def test_bloom_filter_never_misses_a_revoked_jti(self):
+        jtis = [uuid.uuid4().hex for _ in range(3000)]
+        revoked = RevocationList(jtis[:1000])
+        for jti in jtis[1000:2000]:
+            revoked.add(jti)
+
+        self.assertTrue(all(jti in revoked for jti in jtis[:2000]))
+        self.assertFalse(any(jti in revoked for jti in jtis[2000:]))
+        self.assertGreaterEqual(revoked.capacity, 2000)
+
+    def test_bloom_filter_turns_away_most_unknown_jtis(self):
+        revoked = RevocationList(uuid.uuid4().hex for _ in range(1000))
+        unknown = [uuid.uuid4().hex for _ in range(10000)]
+
+        self.assertLess(sum(jti in revoked.bloom for jti in unknown), 300)
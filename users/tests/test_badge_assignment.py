@@ -1,7 +1,16 @@
-from travels.constants import MOST_CAPITALS_VISITED_ID, MOST_CITIES_VISITED_ID, MOST_COUNTRIES_VISITED_ID, \
-    MOST_AWARDS_ID
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from travels.constants import (
+    MOST_CAPITALS_VISITED_ID,
+    MOST_CITIES_VISITED_ID,
+    MOST_COUNTRIES_VISITED_ID,
+    MOST_AWARDS_ID,
+)
 from travels.models import Badge
 from travels.tests.factories import BadgeFactory, TownFactory
+from travels.tasks import Debouncer
 from travels.tests.test_badge_filtering import SetBadgeData
 from travels.utils import recalculate_platform_badges
 from users.tests.factories import UserFactory
@@ -100,3 +109,60 @@ class TestPlatformBadges(SetBadgeData):
 
         mega_badge = Badge.objects.get(id=MOST_AWARDS_ID)
         self.assertEqual(mega_badge.users.get().id, self.first_user.id)
+
+    def test_holder_keeps_badge_until_overtaken(self):
+        towns = TownFactory.create_batch(8, country="United Kingdom")
+        second_user = self.users[1]
+        self.first_user.towns.add(*towns[:2])
+        second_user.towns.add(*towns[2:4])
+
+        recalculate_platform_badges()
+        second_user.towns.add(*towns[4:])
+        recalculate_platform_badges()
+
+        most_cities_badge = Badge.objects.get(id=MOST_CITIES_VISITED_ID)
+        self.assertEqual(most_cities_badge.users.get().id, second_user.id)
+
+    @override_settings(PLATFORM_BADGES_MODE="sync")
+    def test_saving_user_recalculates_in_sync_mode(self):
+        self.first_user.towns.add(*TownFactory.create_batch(2))
+
+        self.first_user.save()
+
+        most_cities_badge = Badge.objects.get(id=MOST_CITIES_VISITED_ID)
+        self.assertEqual(most_cities_badge.users.get().id, self.first_user.id)
+
+    def test_saving_user_defers_recalculation_by_default(self):
+        self.first_user.towns.add(*TownFactory.create_batch(2))
+
+        self.first_user.save()
+
+        self.assertFalse(Badge.objects.get(id=MOST_CITIES_VISITED_ID).users.exists())
+
+
+class TestDebouncer(SimpleTestCase):
+    def test_calls_within_window_run_once(self):
+        calls = []
+        done = threading.Event()
+
+        def task():
+            calls.append(1)
+            done.set()
+
+        debouncer = Debouncer(task, 0.05)
+        for _ in range(10):
+            debouncer()
+
+        self.assertTrue(done.wait(2))
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(debouncer.pending)
+
+    def test_flush_runs_pending_call_immediately(self):
+        calls = []
+        debouncer = Debouncer(lambda: calls.append(1), 60)
+        debouncer()
+
+        debouncer.flush()
+
+        self.assertEqual(calls, [1])
+        self.assertFalse(debouncer.pending)
@@ -1,5 +1,17 @@
+import json
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import IntegrityError
+
+from travels.constants import MOST_CITIES_VISITED_ID
 from travels.tests.factories import TownFactory
 from travels.tests.test_badge_filtering import SetBadgeData
+from travels.models import Badge
+from users.models import TravelCounter, TravellerStats, User
 from users.tests.factories import UserFactory
 
 
@@ -21,3 +33,188 @@ class TestAddingTowns(SetBadgeData):
 
         self.assertEqual(self.test_user.badges.count(), 2)
         self.assertEqual(self.test_user.score, 85)
+
+    def test_failed_add_leaves_visits_unchanged(self):
+        with mock.patch.object(User, "award_badges", side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.test_user.add_visits(self.london)
+
+        self.assertFalse(self.test_user.towns.exists())
+        self.assertFalse(TravelCounter.objects.filter(user=self.test_user).exists())
+
+    def test_add_awards_revokes_badges_no_longer_earned(self):
+        self.test_user.add_visits(self.london, self.tokyo)
+        self.test_user.towns.remove(self.tokyo)
+
+        delta = self.test_user.add_awards()
+
+        japan, asia = Badge.objects.get(name="Japan"), Badge.objects.get(name="Asia")
+        self.assertEqual(delta.earned, set())
+        self.assertEqual(delta.lost, {japan.id, asia.id})
+        self.assertFalse(self.test_user.badges.filter(id__in=delta.lost).exists())
+        self.assertEqual(self.test_user.stats.awards, self.test_user.badges.count())
+
+    def test_add_awards_only_writes_changes(self):
+        self.test_user.add_visits(self.london)
+
+        delta = self.test_user.award_badges()
+
+        self.assertFalse(delta)
+        self.assertEqual(self.test_user.badges.count(), 2)
+
+    def test_platform_badges_are_not_revoked(self):
+        self.test_user.badges.add(MOST_CITIES_VISITED_ID)
+
+        delta = self.test_user.add_awards()
+
+        self.assertEqual(delta.lost, set())
+        self.assertTrue(
+            self.test_user.badges.filter(id=MOST_CITIES_VISITED_ID).exists()
+        )
+
+
+class TestIncrementalScore(SetBadgeData):
+    def setUp(self) -> None:
+        super().setUp()
+        self.test_user = UserFactory()
+
+    def test_score_matches_full_recalculation_across_visits(self):
+        batches = [
+            [self.london, self.paris],
+            TownFactory.create_batch(3, country="France", continent="Europe"),
+            [self.tokyo, TownFactory(country="Japan", capital="Primary")],
+            [self.sao_paolo, self.cape_town],
+        ]
+        for batch in batches:
+            self.test_user.add_visits(*batch)
+            self.assertEqual(
+                self.test_user.score, self.test_user.towns.count_travel_score()
+            )
+
+    def test_revisiting_towns_does_not_add_points(self):
+        self.test_user.add_visits(self.london, self.paris)
+        score = self.test_user.score
+
+        self.test_user.add_visits(self.paris, self.london.id)
+
+        self.assertEqual(self.test_user.score, score)
+        self.assertEqual(
+            TravelCounter.objects.get(
+                user=self.test_user, kind=TravelCounter.COUNTRY, name="France"
+            ).towns,
+            1,
+        )
+
+    def test_rebuild_command_fixes_stale_scores(self):
+        self.test_user.add_visits(self.london, self.tokyo)
+        User.objects.filter(pk=self.test_user.pk).update(score=0)
+        TravelCounter.objects.all().delete()
+
+        call_command("rebuild_travel_counters", "--fix-scores", stdout=StringIO())
+
+        self.test_user.refresh_from_db()
+        self.assertEqual(self.test_user.score, 150)
+        self.assertEqual(TravelCounter.objects.score_for(self.test_user), 150)
+
+    def test_backfilled_counters_keep_revisits_from_scoring(self):
+        self.test_user.add_visits(self.london, self.tokyo)
+        score = self.test_user.score
+        # users who visited towns before the counters existed
+        TravelCounter.objects.all().delete()
+        migration = import_module("users.migrations.0006_backfill_travelcounters")
+
+        migration.backfill_counters(apps, None)
+        self.test_user.add_visits(TownFactory(country="Japan", continent="Asia"))
+
+        self.assertEqual(self.test_user.score, score + 5)
+        self.assertEqual(
+            self.test_user.score, self.test_user.towns.count_travel_score()
+        )
+
+
+class TestTravellerStats(SetBadgeData):
+    def setUp(self) -> None:
+        super().setUp()
+        self.test_user = UserFactory()
+
+    def test_stats_follow_town_and_badge_changes(self):
+        capital = TownFactory(country="Japan", continent="Asia", capital="primary")
+        self.test_user.towns.add(self.london, self.paris, capital)
+        self.test_user.badges.add(*Badge.objects.filter(id__in=[1, 2, 3]))
+
+        stats = TravellerStats.objects.get(user=self.test_user)
+        self.assertEqual(
+            (
+                stats.cities,
+                stats.countries,
+                stats.continents,
+                stats.capitals,
+                stats.awards,
+            ),
+            (3, 3, 2, 1, 3),
+        )
+
+        self.paris.visitors.remove(self.test_user)
+        capital.visitors.clear()
+
+        stats.refresh_from_db()
+        self.assertEqual((stats.cities, stats.countries, stats.capitals), (1, 1, 0))
+
+    def test_stats_follow_score(self):
+        self.test_user.add_visits(self.london)
+
+        self.assertEqual(self.test_user.stats.score, 75)
+
+    def test_leader_lookup_is_a_single_query(self):
+        self.test_user.towns.add(self.london, self.paris)
+        UserFactory().towns.add(self.tokyo)
+
+        with self.assertNumQueries(1):
+            leader = User.travellers.get_leader_by_city()
+
+        self.assertEqual(leader, self.test_user)
+        self.assertEqual(leader.visited_cities, 2)
+
+
+class TestBenchmarkCommand(SetBadgeData):
+    def run_benchmark(self, *args):
+        output = StringIO()
+        call_command(
+            "benchmark_badge_pipeline",
+            "--users",
+            "20",
+            "--samples",
+            "2",
+            *args,
+            stdout=output
+        )
+        return json.loads(output.getvalue())
+
+    def test_report_covers_every_hot_path_and_rolls_back(self):
+        report = self.run_benchmark()
+
+        self.assertEqual(report["meta"]["users"], 20)
+        self.assertEqual(User.objects.count(), 0)
+        self.assertEqual(
+            set(report["benchmarks"]),
+            {
+                "user.add_visits",
+                "badges.get_qualifying_badges",
+                "travel.score",
+                "recalculate_platform_badges",
+                "leader.by_country",
+                "leader.by_city",
+                "leader.by_capital",
+                "leader.of_leaders",
+            },
+        )
+        for result in report["benchmarks"].values():
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+            self.assertGreater(result["queries"]["max"], 0)
+
+    def test_synthetic_users_are_scored_like_real_ones(self):
+        self.run_benchmark("--keep")
+
+        user = User.objects.first()
+        self.assertEqual(user.score, user.towns.count_travel_score())
+        self.assertEqual(user.stats.cities, user.towns.count())
@@ -1,7 +1,12 @@
+from unittest import mock
+
+from django.db import IntegrityError
 from rest_framework.reverse import reverse
 from rest_framework.test import APITestCase
 
+from travels.models import Badge, Group
 from travels.tests.factories import TownFactory, BadgeFactory
+from travels.tests.test_badge_filtering import SetBadgeData
 from users.models import User
 from users.tests.factories import UserFactory
 
@@ -137,3 +142,142 @@ class TestEditUserRoutes(BaseUserData):
         response = self.auth_client.put(reverse("profile-v1-town"), data)
 
         self.assertEqual(response.status_code, 400)
+
+
+class TestLeaderboardRoute(BaseUserData):
+    def test_users_ranked_by_requested_ordering(self):
+        towns = TownFactory.create_batch(3)
+        self.users[1].towns.add(*towns)
+        self.users[2].towns.add(towns[0])
+        User.objects.filter(pk=self.users[2].pk).update(score=500)
+        self.users[2].refresh_from_db()
+        self.users[2].save()
+
+        by_cities = self.client.get(reverse("leaderboard-v1"), {"ordering": "cities"})
+        by_score = self.client.get(reverse("leaderboard-v1"))
+
+        self.assertEqual(by_cities.status_code, 200)
+        self.assertEqual(
+            [row["id"] for row in by_cities.data["results"]][:2],
+            [self.users[1].id, self.users[2].id],
+        )
+        self.assertEqual(by_score.data["results"][0]["id"], self.users[2].id)
+
+    def test_unknown_ordering_is_rejected(self):
+        response = self.client.get(reverse("leaderboard-v1"), {"ordering": "password"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TestUserListQueries(BaseUserData):
+    def populate(self, users):
+        towns = TownFactory.create_batch(3)
+        badges = Badge.objects.filter(id__in=[1, 2])
+        for user in users:
+            user.towns.add(*towns)
+            user.badges.add(*badges)
+            group = Group.objects.create(
+                name="group", description="-", owner=user, podium_1_user=user
+            )
+            group.members.add(*users[:2])
+            group.requests.add(users[-1])
+
+    def test_query_count_does_not_grow_with_users(self):
+        self.populate(self.users)
+        with self.assertNumQueries(21):
+            self.client.get(reverse("users-v1-list"))
+
+        self.populate(UserFactory.create_batch(12))
+        with self.assertNumQueries(21):
+            response = self.client.get(reverse("users-v1-list"))
+
+        self.assertEqual(len(response.data["results"]), 15)
+        self.assertEqual(len(response.data["results"][-1]["groups_owned"]), 1)
+
+
+class TestBulkTownsRoute(SetBadgeData):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = UserFactory()
+        self.client.force_authenticate(self.user)
+        self.uk_badge = Badge.objects.get(name="United Kingdom")
+
+    def test_unauthenticated_cannot_access_route(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(reverse("profile-v1-towns-bulk"), {"add": []})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_adds_and_removes_towns_and_reports_earned_badges(self):
+        self.user.add_visits(self.tokyo)
+        towns = TownFactory.create_batch(600)
+
+        response = self.client.post(
+            reverse("profile-v1-towns-bulk"),
+            {
+                "add": [self.london.id] + [town.id for town in towns],
+                "remove": [self.tokyo.id],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            {"id": self.uk_badge.id, "name": "United Kingdom"}, response.data["earned"]
+        )
+        self.assertEqual(self.user.towns.count(), 601)
+        self.assertFalse(self.user.towns.filter(id=self.tokyo.id).exists())
+        self.user.refresh_from_db()
+        self.assertEqual(response.data["score"], self.user.towns.count_travel_score())
+        self.assertEqual(self.user.stats.cities, 601)
+        self.assertEqual(self.user.stats.awards, self.user.badges.count())
+
+    def test_removing_towns_reports_lost_badges(self):
+        self.user.add_visits(self.london, self.paris)
+
+        response = self.client.post(
+            reverse("profile-v1-towns-bulk"),
+            {"remove": [self.london.id]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["lost"], [{"id": self.uk_badge.id, "name": "United Kingdom"}]
+        )
+        self.assertFalse(self.user.badges.filter(id=self.uk_badge.id).exists())
+
+    def test_adding_visited_towns_again_is_ignored(self):
+        self.user.add_visits(self.london)
+
+        response = self.client.post(
+            reverse("profile-v1-towns-bulk"), {"add": [self.london.id]}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["earned"], [])
+        self.assertEqual(self.user.towns.count(), 1)
+
+    def test_failed_update_leaves_visits_unchanged(self):
+        self.user.add_visits(self.tokyo)
+
+        with mock.patch.object(User, "add_awards", side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.user.update_visits(add=[self.london.id], remove=[self.tokyo.id])
+
+        self.assertEqual(list(self.user.towns.all()), [self.tokyo])
+
+    def test_unknown_or_conflicting_towns_are_rejected(self):
+        unknown = self.client.post(
+            reverse("profile-v1-towns-bulk"), {"add": [0]}, format="json"
+        )
+        conflicting = self.client.post(
+            reverse("profile-v1-towns-bulk"),
+            {"add": [self.london.id], "remove": [self.london.id]},
+            format="json",
+        )
+
+        self.assertEqual(unknown.status_code, 400)
+        self.assertIn("add", unknown.data)
+        self.assertEqual(conflicting.status_code, 400)
+        self.assertFalse(self.user.towns.exists())
@@ -0,0 +1,67 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    A bucket of `capacity` tokens per key, refilled at `capacity` tokens per
+    period, with each request taking one. Unlike a fixed window, a client that
+    has used its burst gets requests back steadily rather than all at once.
+    Buckets are kept in LOGIN_THROTTLE_CACHE; with a shared cache, concurrent
+    requests for the same key on different workers may both take the last token.
+    """
+
+    scope = None
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError
+
+    def get_rate(self):
+        rate = settings.LOGIN_THROTTLE_RATES.get(self.scope)
+        if not rate:
+            return None, None
+        # the "<requests>/<s|min|hour|day>" format of DRF's throttle rates
+        capacity, period = rate.split("/")
+        return int(capacity), {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+
+    def allow_request(self, request, view):
+        capacity, period = self.get_rate()
+        key = self.get_cache_key(request, view)
+        if capacity is None or key is None:
+            return True
+
+        cache = caches[settings.LOGIN_THROTTLE_CACHE]
+        cache_key = f"throttle:{self.scope}:{hashlib.md5(key.encode()).hexdigest()}"
+        now = time.time()
+        tokens, updated = cache.get(cache_key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * capacity / period)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # the bucket is forgotten once it would have refilled
+        cache.set(cache_key, (tokens, now), period)
+        self.wait_seconds = 0 if allowed else (1 - tokens) * period / capacity
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    scope = "ip"
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginEmailThrottle(TokenBucketThrottle):
+    scope = "email"
+
+    def get_cache_key(self, request, view):
+        email = request.data.get("email")
+        return email.strip().lower() if isinstance(email, str) and email else None
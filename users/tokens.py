@@ -0,0 +1,61 @@
+import time
+import uuid
+from datetime import datetime
+
+import jwt
+from django.conf import settings
+
+from users.revocation import is_revoked, revoke
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+class RevokedTokenError(jwt.exceptions.InvalidTokenError):
+    pass
+
+
+def encode_token(user_id, token_type):
+    lifetime = {
+        ACCESS: settings.JWT_ACCESS_TOKEN_SECONDS,
+        REFRESH: settings.JWT_REFRESH_TOKEN_SECONDS,
+    }[token_type]
+    issued = int(time.time())
+    token = jwt.encode(
+        {
+            "sub": user_id,
+            "type": token_type,
+            "jti": uuid.uuid4().hex,
+            "iat": issued,
+            "exp": issued + lifetime,
+        },
+        settings.SECRET_KEY,
+        algorithm="HS256",
+    )
+    return token.decode() if isinstance(token, bytes) else token
+
+
+def issue_tokens(user_id):
+    return {
+        "token": encode_token(user_id, ACCESS),
+        "refresh": encode_token(user_id, REFRESH),
+    }
+
+
+def decode_token(token, token_type):
+    """
+    The claims of a token of `token_type`. Raises jwt's InvalidTokenError for
+    bad, expired (ExpiredSignatureError) or revoked (RevokedTokenError) tokens.
+    """
+    payload = jwt.decode(
+        token, settings.SECRET_KEY, algorithms=["HS256"], options={"require_exp": True}
+    )
+    if payload.get("type") != token_type or not payload.get("jti"):
+        raise jwt.exceptions.InvalidTokenError("Not a valid token of this type")
+    if is_revoked(payload["jti"]):
+        raise RevokedTokenError("Token has been revoked")
+    return payload
+
+
+def revoke_token(payload):
+    return revoke(payload["jti"], datetime.fromtimestamp(payload["exp"]))
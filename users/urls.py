@@ -1,12 +1,21 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from .views import RegisterView, LoginView, UserViewSet, ProfileViewSet
+from .views import (
+    RegisterView,
+    LoginView,
+    LogoutView,
+    TokenRefreshView,
+    UserViewSet,
+    ProfileViewSet,
+    LeaderboardView,
+)
 
 profile_detail = ProfileViewSet.as_view(
     {"get": "retrieve", "put": "update", "delete": "destroy"}
 )
 profile_town_detail = ProfileViewSet.as_view({"put": "town_update"})
+profile_towns_bulk = ProfileViewSet.as_view({"post": "towns_bulk"})
 
 router = DefaultRouter()
 router.register(r"users", UserViewSet, basename="users-v1")
@@ -14,6 +23,10 @@ router.register(r"users", UserViewSet, basename="users-v1")
 urlpatterns = [
     path("register", RegisterView.as_view(), name="register"),
     path("login", LoginView.as_view(), name="login"),
+    path("token/refresh", TokenRefreshView.as_view(), name="token-refresh"),
+    path("logout", LogoutView.as_view(), name="logout"),
     path("profile", profile_detail, name="profile-v1"),
     path("profile/town", profile_town_detail, name="profile-v1-town"),
+    path("profile/towns/bulk", profile_towns_bulk, name="profile-v1-towns-bulk"),
+    path("leaderboard", LeaderboardView.as_view(), name="leaderboard-v1"),
 ] + router.urls
@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router
+
+from users.models import User
+
+# the most users a worker keeps, least recently used go first
+MAX_USERS = 10000
+
+_users = OrderedDict()
+_lock = threading.Lock()
+
+
+def _fields():
+    return [field.attname for field in User._meta.concrete_fields]
+
+
+def get_cached_user(user_id):
+    """
+    The user with `user_id`, read from this worker's cache when it was loaded
+    less than USER_CACHE_SECONDS ago. Each call builds a new instance from the
+    cached row, so requests never share (or mutate) the same object. Raises
+    User.DoesNotExist like User.objects.get.
+    """
+    ttl = settings.USER_CACHE_SECONDS
+    now = time.monotonic()
+    with _lock:
+        entry = _users.get(user_id)
+        if entry is not None and now - entry[0] < ttl:
+            _users.move_to_end(user_id)
+            return User.from_db(router.db_for_read(User), _fields(), entry[1])
+
+    fields = _fields()
+    row = User.objects.filter(pk=user_id).values_list(*fields).first()
+    if row is None:
+        raise User.DoesNotExist
+    if ttl > 0:
+        with _lock:
+            _users[user_id] = (now, row)
+            _users.move_to_end(user_id)
+            while len(_users) > MAX_USERS:
+                _users.popitem(last=False)
+    return User.from_db(router.db_for_read(User), fields, row)
+
+
+def invalidate_cached_user(sender=None, instance=None, **kwargs):
+    with _lock:
+        _users.pop(instance.pk, None)
+
+
+def clear_user_cache():
+    with _lock:
+        _users.clear()
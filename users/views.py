@@ -2,19 +2,31 @@ from typing import Optional
 
 import jwt
 
-from django.conf import settings
 from django.http import Http404
-from rest_framework import viewsets
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, viewsets
 from rest_framework.request import Request
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.exceptions import AuthenticationFailed
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 
-from .models import User
+from travels.badges import get_badge_catalogue
+from travels.serializers import prefetch_lookups
+
+from .hashing import check_password
+from .models import TravellerStats, User
+from .throttling import LoginEmailThrottle, LoginIPThrottle
+from .tokens import ACCESS, REFRESH, decode_token, issue_tokens, revoke_token
 from .permissions import ListOnly
-from .serializers import ValidateSerializer, UserSerializer, PopulatedUserSerializer
+from .serializers import (
+    ValidateSerializer,
+    UserSerializer,
+    PopulatedUserSerializer,
+    LeaderboardSerializer,
+    BulkVisitsSerializer,
+)
 
 
 class RegisterView(APIView):
@@ -28,16 +40,19 @@ class RegisterView(APIView):
 
 
 class LoginView(APIView):
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
     def post(self, request: Request) -> Response:
         email = request.data.get("email")
         password = request.data.get("password")
         user = self.get_user(email)
 
-        if not user or user and not user.check_password(password):
+        if not check_password(user, password):
             raise AuthenticationFailed()
 
-        token = jwt.encode({"sub": user.id}, settings.SECRET_KEY, algorithm="HS256")
-        return Response({"token": token, "detail": f"Welcome {user.first_name}!"})
+        return Response(
+            {**issue_tokens(user.id), "detail": f"Welcome {user.first_name}!"}
+        )
 
     @staticmethod
     def get_user(email) -> Optional[User]:
@@ -47,15 +62,53 @@ class LoginView(APIView):
             return None
 
 
+class TokenRefreshView(APIView):
+    def post(self, request: Request) -> Response:
+        try:
+            payload = decode_token(request.data.get("refresh", ""), REFRESH)
+        except jwt.exceptions.InvalidTokenError:
+            raise AuthenticationFailed("Invalid or expired refresh token")
+
+        if not User.objects.filter(pk=payload["sub"]).exists():
+            raise AuthenticationFailed("Invalid or expired refresh token")
+        # each refresh token is used once: the request that revokes it gets
+        # the new pair and a replay, even a concurrent one, is refused
+        if not revoke_token(payload):
+            raise AuthenticationFailed("Invalid or expired refresh token")
+        return Response(issue_tokens(payload["sub"]))
+
+
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request: Request) -> Response:
+        for token, token_type in (
+            (request.auth, ACCESS),
+            (request.data.get("refresh"), REFRESH),
+        ):
+            try:
+                revoke_token(decode_token(token, token_type))
+            except (jwt.exceptions.InvalidTokenError, AttributeError):
+                # not a token of ours, e.g. a session login, or already expired
+                pass
+        return Response({"detail": "Logged out"})
+
+
 class ProfileViewSet(viewsets.ModelViewSet):
     serializer_class = PopulatedUserSerializer
     permission_classes = [IsAuthenticated]
-    http_method_names = ["get", "put", "delete"]
+    http_method_names = ["get", "post", "put", "delete"]
 
     def get_object(self):
         if not self.request.user or not self.request.user.id:
             raise Http404
-        return self.request.user
+        # the authenticated user can come from a per-worker cache up to
+        # USER_CACHE_SECONDS old, so writes start from the current row rather
+        # than saving stale fields (score, password) back over newer ones
+        users = User.objects.all()
+        if self.request.method in SAFE_METHODS:
+            users = users.prefetch_related(*prefetch_lookups(self.get_serializer()))
+        return get_object_or_404(users, pk=self.request.user.id)
 
     def _update_object(self, data, partial=False):
         instance = self.get_object()
@@ -74,9 +127,49 @@ class ProfileViewSet(viewsets.ModelViewSet):
 
         return Response(UserSerializer(updated_user).data)
 
+    def towns_bulk(self, request, *args, **kwargs):
+        serializer = BulkVisitsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user = self.get_object()
+        delta = user.update_visits(**serializer.validated_data)
+        badges = get_badge_catalogue().by_id
+
+        return Response(
+            {
+                "score": user.score,
+                "earned": [
+                    {"id": i, "name": badges[i].name} for i in sorted(delta.earned)
+                ],
+                "lost": [{"id": i, "name": badges[i].name} for i in sorted(delta.lost)],
+            }
+        )
+
 
 class UserViewSet(viewsets.ModelViewSet):
     serializer_class = PopulatedUserSerializer
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated | ListOnly]
     http_method_names = ["get"]
+
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .prefetch_related(*prefetch_lookups(self.get_serializer()))
+        )
+
+
+class LeaderboardView(generics.ListAPIView):
+    serializer_class = LeaderboardSerializer
+    orderings = ("score", "cities", "countries", "capitals", "continents", "awards")
+
+    def get_queryset(self):
+        ordering = self.request.query_params.get("ordering", "score")
+        if ordering not in self.orderings:
+            raise ValidationError(
+                {"ordering": f"Choose one of {', '.join(self.orderings)}"}
+            )
+        return TravellerStats.objects.select_related("user").order_by(
+            f"-{ordering}", "user"
+        )